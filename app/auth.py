@@ -1,11 +1,10 @@
 # app/auth.py
 from datetime import datetime, timedelta, timezone
 from jose import JWTError, jwt
-from passlib.context import CryptContext
-from app.schemas.token import Token, TokenData
+from app.schemas.token import RefreshTokenData, Token, TokenData
 from app.common.config import settings
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from app.common.hashing import pwd_context
+from app.common.metrics import jwt_duration_seconds
 
 def verify_password(plain_password, hashed_password):
     """
@@ -39,7 +38,64 @@ def create_access_token(data: dict):
     # Use timezone-aware datetime
     expire = datetime.now(timezone.utc) + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+    with jwt_duration_seconds.time("encode"):
+        return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+def create_refresh_token(username: str, user_id: int, jti: str, family: str, expires_at: int):
+    """
+    Create a refresh token for a token stored by `async_crud.create_refresh_token`.
+
+    Args:
+        username (str): Username of the token's user.
+        user_id (int): ID of the token's user.
+        jti (str): ID of the stored token.
+        family (str): Family (login session) of the token.
+        expires_at (int): Expiry as Unix time.
+
+    Returns:
+        str: The refresh token as a JSON Web Token (JWT).
+    """
+    to_encode = {
+        "sub": username,
+        "uid": user_id,
+        "jti": jti,
+        "fam": family,
+        "exp": expires_at,
+        "type": "refresh",
+    }
+    with jwt_duration_seconds.time("encode"):
+        return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+def decode_refresh_token(token: str):
+    """
+    Decode and verify the signature and expiry of a refresh token.
+
+    Args:
+        token (str): The refresh token to decode.
+
+    Returns:
+        RefreshTokenData: The decoded claims.
+
+    Raises:
+        ValueError: If the token is invalid, expired or not a refresh token.
+    """
+    try:
+        with jwt_duration_seconds.time("decode"):
+            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        raise ValueError("Invalid token")
+    if payload.get("type") != "refresh":
+        raise ValueError("Not a refresh token")
+    try:
+        return RefreshTokenData(
+            username=payload["sub"],
+            user_id=payload["uid"],
+            jti=payload["jti"],
+            family=payload["fam"],
+            exp=payload["exp"]
+        )
+    except (KeyError, ValueError):
+        raise ValueError("Invalid token")
 
 def decode_access_token(token: str):
     """
@@ -49,7 +105,8 @@ def decode_access_token(token: str):
         token (str): The access token to decode.
 
     Returns:
-        TokenData: The decoded data.
+        TokenData: The decoded data (username, role, expiry and, for tokens
+        issued by `/login`, user ID and token version).
 
     Raises:
         ValueError: If the token is invalid or does not contain a username.
@@ -60,10 +117,19 @@ def decode_access_token(token: str):
         which should be the username of the user that the token represents.
     """
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        with jwt_duration_seconds.time("decode"):
+            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         username: str = payload.get("sub")
         if username is None:
             raise ValueError("Token does not contain username")
-        return TokenData(username=username)
+        if payload.get("type") == "refresh":
+            raise ValueError("Refresh tokens cannot be used for authorization")
+        return TokenData(
+            username=username,
+            role=payload.get("role"),
+            exp=payload.get("exp"),
+            user_id=payload.get("uid"),
+            token_version=payload.get("tv")
+        )
     except JWTError:
         raise ValueError("Invalid token")
\ No newline at end of file
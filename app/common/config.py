@@ -1,13 +1,101 @@
+from typing import Dict, Optional
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     SECRET_KEY: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 30
     DATABASE_URL: str
     RATE_LIMIT_MAX_REQUESTS: int
     RATE_LIMIT_WINDOW: int
     ALGORITHM: str
 
+    # Rate limiter backend ("memory", "shm" or "redis") and memory bounds
+    RATE_LIMIT_BACKEND: str = "memory"
+    RATE_LIMIT_REDIS_URL: str = "redis://localhost:6379/0"
+    RATE_LIMIT_MAX_CLIENTS: int = 100000
+    RATE_LIMIT_SWEEP_INTERVAL: int = 60
+
+    # Production server (app.server): pre-forked workers (0 = one per CPU core)
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    SERVER_WORKERS: int = 0
+    SERVER_BACKLOG: int = 2048
+    SERVER_GRACEFUL_TIMEOUT: int = 30
+
+    # GET /metrics: needs an admin token, or this token as a bearer token in
+    # the Authorization header (for scrapers). With several worker processes,
+    # each writes its metrics to the snapshot directory every interval and a
+    # scrape merges them; app.server uses a temporary directory if none is set
+    METRICS_TOKEN: Optional[str] = None
+    METRICS_MULTIPROC_DIR: Optional[str] = None
+    METRICS_SNAPSHOT_INTERVAL: float = 1.0
+
+    # Database connection pool
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_RECYCLE: int = -1
+    DB_POOL_PRE_PING: bool = False
+
+    # SQLite tuning profile, applied on every new connection
+    SQLITE_TUNING: bool = True
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_CACHE_SIZE: int = -64000
+    SQLITE_MMAP_SIZE: int = 268435456
+
+    # Pagination of GET /users
+    USERS_PAGE_DEFAULT_LIMIT: int = 100
+    USERS_PAGE_MAX_LIMIT: int = 1000
+    USERS_STREAM_CHUNK_SIZE: int = 1000
+
+    # Bulk import: users validated, hashed and inserted per transaction
+    USERS_IMPORT_BATCH_SIZE: int = 1000
+
+    # Logging: rotating JSON file and per-level sampling of high-volume messages
+    LOG_LEVEL: str = "INFO"
+    LOG_FILE_PATH: Optional[str] = None
+    LOG_MAX_BYTES: int = 10485760
+    LOG_BACKUP_COUNT: int = 5
+    LOG_SAMPLE_RATES: Dict[str, float] = {}
+
+    # Password hashing policy: scheme ("bcrypt" or "argon2") and its cost.
+    # A non-zero target makes startup calibrate the cost of the scheme to
+    # about that many milliseconds per hash on the host
+    PASSWORD_HASH_SCHEME: str = "bcrypt"
+    PASSWORD_BCRYPT_ROUNDS: int = 12
+    PASSWORD_ARGON2_TIME_COST: int = 3
+    PASSWORD_ARGON2_MEMORY_COST: int = 65536
+    PASSWORD_ARGON2_PARALLELISM: int = 4
+    PASSWORD_HASH_TARGET_MS: int = 0
+
+    # Password hashing worker pool (0 workers = one per CPU core)
+    PASSWORD_HASH_WORKERS: int = 0
+    PASSWORD_HASH_QUEUE_SIZE: int = 64
+
+    # Verified-token cache used by get_current_user (0 entries = disabled).
+    # Updates and deletions invalidate it in every app.server worker through
+    # per-user counters in shared memory; the TTL bounds changes made outside
+    # the app, or by workers not forked by app.server
+    TOKEN_CACHE_MAX_SIZE: int = 10000
+    TOKEN_CACHE_TTL_SECONDS: int = 60
+    TOKEN_CACHE_EPOCH_SLOTS: int = 65536
+
+    # Stateless authorization: trust the uid/role claims of access tokens whose
+    # token version matches the user's, checked against an in-memory map of
+    # user versions instead of loading the user. Changes made through the app
+    # revoke tokens at once in every app.server worker; the TTL bounds others
+    AUTH_STATELESS: bool = False
+    TOKEN_VERSION_CACHE_SIZE: int = 100000
+    TOKEN_VERSION_TTL_SECONDS: int = 30
+
+    # Admin account created together with the schema. The password is given as
+    # a bcrypt hash so that startup never hashes; the default is "strongpass123"
+    ADMIN_USERNAME: str = "admin"
+    ADMIN_EMAIL: str = "admin@example.com"
+    ADMIN_PASSWORD_HASH: str = "$2b$12$LwqM1qmj3RfGgE0wijC8uuskcozP2XCun00.zrSBubnPB8lZGwdT2"
+
     class Config:
         env_file = ".env"
 
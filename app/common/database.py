@@ -1,23 +1,158 @@
-from sqlalchemy import create_engine
+import asyncio
+from contextlib import AsyncExitStack
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from app.common.config import settings
+from app.common.config import Settings, settings
+from app.common.metrics import instrument_engine
 
-engine = create_engine(settings.DATABASE_URL, connect_args={"check_same_thread": False})
+# Async drivers used when DATABASE_URL names a sync one
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+}
+
+def to_async_url(database_url: str) -> str:
+    """
+    Translate a database URL to the equivalent URL for an async driver.
+
+    Args:
+        database_url (str): A SQLAlchemy database URL, e.g. `sqlite:///./test.db`.
+
+    Returns:
+        str: The URL with an async driver, e.g. `sqlite+aiosqlite:///./test.db`.
+        URLs that already name a driver are returned unchanged.
+    """
+    url = make_url(database_url)
+    if url.drivername in ASYNC_DRIVERS:
+        url = url.set(drivername=ASYNC_DRIVERS[url.drivername])
+    return url.render_as_string(hide_password=False)
+
+def engine_options(database_url: str, config: Settings = settings, sync: bool = True) -> dict:
+    """
+    Build the `create_engine` keyword arguments for a database URL.
+
+    `check_same_thread` is only passed to the sync SQLite driver, and pool
+    sizing only applies to databases that use a connection queue (in-memory
+    SQLite uses a single shared connection instead).
+
+    Args:
+        database_url (str): The SQLAlchemy database URL.
+        config (Settings): Settings providing the pool configuration.
+        sync (bool): Whether the options are for the sync engine.
+
+    Returns:
+        dict: Keyword arguments for `create_engine` / `create_async_engine`.
+    """
+    url = make_url(database_url)
+    options = {}
+    if url.get_backend_name() == "sqlite":
+        if sync:
+            options["connect_args"] = {"check_same_thread": False}
+        if url.database in (None, "", ":memory:"):
+            return options
+    options.update(
+        pool_size=config.DB_POOL_SIZE,
+        max_overflow=config.DB_MAX_OVERFLOW,
+        pool_recycle=config.DB_POOL_RECYCLE,
+        pool_pre_ping=config.DB_POOL_PRE_PING,
+    )
+    return options
+
+def sqlite_pragmas(config: Settings = settings) -> list:
+    """
+    Return the PRAGMA statements of the SQLite tuning profile.
+
+    Args:
+        config (Settings): Settings providing the pragma values.
+
+    Returns:
+        list: PRAGMA statements, empty when SQLITE_TUNING is disabled.
+    """
+    if not config.SQLITE_TUNING:
+        return []
+    return [
+        f"PRAGMA journal_mode={config.SQLITE_JOURNAL_MODE}",
+        f"PRAGMA synchronous={config.SQLITE_SYNCHRONOUS}",
+        f"PRAGMA busy_timeout={int(config.SQLITE_BUSY_TIMEOUT_MS)}",
+        f"PRAGMA cache_size={int(config.SQLITE_CACHE_SIZE)}",
+        f"PRAGMA mmap_size={int(config.SQLITE_MMAP_SIZE)}",
+    ]
+
+def configure_sqlite(engine: Engine, config: Settings = settings):
+    """
+    Apply the SQLite tuning profile to every new connection of an engine.
+
+    WAL lets readers proceed while a writer commits, `synchronous=NORMAL` is
+    safe under WAL and avoids an fsync per commit, and `busy_timeout` makes
+    writers wait for the lock instead of failing with "database is locked".
+    Engines for other databases are left untouched.
+
+    Args:
+        engine (Engine): A sync engine, or the `sync_engine` of an async one.
+        config (Settings): Settings providing the pragma values.
+    """
+    pragmas = sqlite_pragmas(config)
+    if engine.dialect.name != "sqlite" or not pragmas:
+        return
+
+    @event.listens_for(engine, "connect")
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+# Sync engine, used by scripts and one-off maintenance tasks
+engine = create_engine(settings.DATABASE_URL, **engine_options(settings.DATABASE_URL))
+configure_sqlite(engine)
+instrument_engine(engine, "sync")
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Async engine, used by the request path
+async_engine = create_async_engine(
+    to_async_url(settings.DATABASE_URL),
+    **engine_options(settings.DATABASE_URL, sync=False)
+)
+configure_sqlite(async_engine.sync_engine)
+instrument_engine(async_engine.sync_engine, "async")
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
-def get_db():
+async def get_db():
     """
-    Provides a database session for the duration of a request. 
+    Provides an async database session for the duration of a request.
 
     Yields:
-        Session: A SQLAlchemy database session.
+        AsyncSession: A SQLAlchemy async database session.
 
     Closes the session after the request is complete.
     """
-    db = SessionLocal()
-    try:
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+async def warm_pool(engine: AsyncEngine = async_engine, connections: int = settings.DB_POOL_SIZE) -> int:
+    """
+    Open pool connections ahead of the first requests.
+
+    The connections are opened concurrently (applying the SQLite pragmas),
+    each runs a trivial query and they are returned to the pool, so the first
+    requests of a new worker do not pay for connecting.
+
+    Args:
+        engine (AsyncEngine): The engine whose pool is warmed.
+        connections (int): Number of connections to open.
+
+    Returns:
+        int: Number of connections opened.
+    """
+    async with AsyncExitStack() as stack:
+        opened = await asyncio.gather(*(stack.enter_async_context(engine.connect()) for _ in range(connections)))
+        await asyncio.gather(*(connection.execute(text("SELECT 1")) for connection in opened))
+    return connections
@@ -0,0 +1,48 @@
+import hashlib
+from typing import Optional
+from fastapi import Response, status
+
+# Weak ETags for conditional GETs. A weak validator is enough: the responses
+# are compared for semantic equality, and clients only use them in If-None-Match.
+
+def make_etag(*parts) -> str:
+    """
+    Build a weak ETag from version components, e.g. `W/"3-7"`.
+    """
+    return 'W/"' + "-".join(str(part) for part in parts) + '"'
+
+def variant(**params) -> str:
+    """
+    Short digest of the parameters that select a representation, e.g. the
+    fieldset or the page and filters of a listing.
+
+    Two requests get the same ETag only if they ask for the same
+    representation; parameters that are None are left out, so a default
+    and an omitted parameter are the same.
+    """
+    normalized = "&".join(f"{name}={value}" for name, value in sorted(params.items()) if value is not None)
+    return hashlib.blake2b(normalized.encode(), digest_size=6).hexdigest()
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Whether an If-None-Match header matches `etag`, using weak comparison.
+
+    Args:
+        if_none_match (str, optional): The raw header value, a list of ETags or `*`.
+        etag (str): The current ETag of the resource.
+
+    Returns:
+        bool: True if the client's copy is current.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in if_none_match.split(","))
+
+def not_modified(etag: str) -> Response:
+    """
+    An empty 304 response carrying the current ETag.
+    """
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
@@ -0,0 +1,80 @@
+import csv
+import io
+import json
+import zlib
+from enum import Enum
+from typing import AsyncIterable, AsyncIterator, Sequence
+
+# Serializers for streamed user exports. Rows are tuples of column values in
+# the order of `fields`; output is emitted one chunk per batch of rows.
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+CSV_MEDIA_TYPE = "text/csv"
+
+def _plain(value):
+    return value.value if isinstance(value, Enum) else value
+
+async def to_ndjson(rows: AsyncIterable[Sequence], fields: Sequence[str], chunk_size: int) -> AsyncIterator[bytes]:
+    """
+    Serialize rows as NDJSON, one object per line.
+
+    Args:
+        rows (AsyncIterable[Sequence]): Column values per row.
+        fields (Sequence[str]): Field names, in column order.
+        chunk_size (int): Number of rows per emitted chunk.
+
+    Yields:
+        bytes: Consecutive chunks of the NDJSON document.
+    """
+    lines = []
+    async for row in rows:
+        lines.append(json.dumps({field: _plain(value) for field, value in zip(fields, row)}))
+        if len(lines) >= chunk_size:
+            yield ("\n".join(lines) + "\n").encode()
+            lines = []
+    if lines:
+        yield ("\n".join(lines) + "\n").encode()
+
+async def to_csv(rows: AsyncIterable[Sequence], fields: Sequence[str], chunk_size: int) -> AsyncIterator[bytes]:
+    """
+    Serialize rows as CSV with a header row.
+
+    Args:
+        rows (AsyncIterable[Sequence]): Column values per row.
+        fields (Sequence[str]): Field names, in column order.
+        chunk_size (int): Number of rows per emitted chunk.
+
+    Yields:
+        bytes: Consecutive chunks of the CSV document.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(fields)
+    pending = 0
+    async for row in rows:
+        writer.writerow([_plain(value) for value in row])
+        pending += 1
+        if pending >= chunk_size:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+async def gzip_stream(chunks: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+    """
+    Compress a byte stream into a single gzip member, chunk by chunk.
+
+    Args:
+        chunks (AsyncIterable[bytes]): The uncompressed chunks.
+
+    Yields:
+        bytes: The compressed chunks.
+    """
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
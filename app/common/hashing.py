@@ -0,0 +1,116 @@
+import math
+import time
+from passlib.context import CryptContext
+from passlib.hash import argon2, bcrypt
+from app.common.config import Settings, settings
+from app.common.logging_config import logger
+
+# The password hashing policy. The scheme and its cost come from Settings;
+# the other supported scheme is still accepted, so that switching schemes
+# needs no migration: its hashes are flagged by `needs_update` and replaced
+# with the current scheme on the user's next login.
+
+SCHEMES = ("bcrypt", "argon2")
+
+# Calibration never picks a cost below these
+MIN_BCRYPT_ROUNDS = 10
+MIN_ARGON2_TIME_COST = 1
+
+# Cost the calibration hashes are measured at
+CALIBRATION_BCRYPT_ROUNDS = 8
+
+def context_options(config: Settings = settings) -> dict:
+    """
+    Build the `CryptContext` configuration of the hashing policy.
+
+    Args:
+        config (Settings): Settings providing the scheme and its cost.
+
+    Returns:
+        dict: Keyword arguments for `CryptContext`; only plain values, so the
+        policy can be handed to the password hashing worker processes.
+
+    Raises:
+        ValueError: If PASSWORD_HASH_SCHEME is not a supported scheme.
+    """
+    if config.PASSWORD_HASH_SCHEME not in SCHEMES:
+        raise ValueError(f"Unknown password hash scheme: {config.PASSWORD_HASH_SCHEME}")
+    others = [scheme for scheme in SCHEMES if scheme != config.PASSWORD_HASH_SCHEME]
+    return {
+        "schemes": [config.PASSWORD_HASH_SCHEME, *others],
+        "deprecated": others,
+        "bcrypt__rounds": config.PASSWORD_BCRYPT_ROUNDS,
+        "argon2__time_cost": config.PASSWORD_ARGON2_TIME_COST,
+        "argon2__memory_cost": config.PASSWORD_ARGON2_MEMORY_COST,
+        "argon2__parallelism": config.PASSWORD_ARGON2_PARALLELISM,
+    }
+
+pwd_context = CryptContext(**context_options())
+
+def load_policy(options: dict):
+    """
+    Replace the policy of `pwd_context`, e.g. in a worker process.
+
+    Args:
+        options (dict): The output of `context_options`.
+    """
+    pwd_context.load(options)
+
+def _measure(handler, repeat: int = 3) -> float:
+    # Best of a few runs, in seconds
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        handler.hash("calibration")
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+def calibrate(target_ms: float, config: Settings = settings) -> dict:
+    """
+    Pick the cost of the configured scheme that takes about `target_ms` to hash on this machine.
+
+    bcrypt doubles its work with every round, so the rounds are extrapolated
+    from one cheap measurement; argon2 is linear in its time cost, measured at
+    a time cost of 1 with the configured memory cost and parallelism. The
+    chosen cost is the highest whose estimate does not exceed the target.
+
+    Args:
+        target_ms (float): Target duration of one hash, in milliseconds.
+        config (Settings): Settings providing the scheme and its fixed parameters.
+
+    Returns:
+        dict: The Settings fields to update, e.g. `{"PASSWORD_BCRYPT_ROUNDS": 11}`.
+    """
+    target = target_ms / 1000
+    if config.PASSWORD_HASH_SCHEME == "bcrypt":
+        elapsed = _measure(bcrypt.using(rounds=CALIBRATION_BCRYPT_ROUNDS))
+        rounds = CALIBRATION_BCRYPT_ROUNDS + math.floor(math.log2(target / elapsed))
+        return {"PASSWORD_BCRYPT_ROUNDS": min(max(rounds, MIN_BCRYPT_ROUNDS), 31)}
+    elapsed = _measure(argon2.using(
+        time_cost=1,
+        memory_cost=config.PASSWORD_ARGON2_MEMORY_COST,
+        parallelism=config.PASSWORD_ARGON2_PARALLELISM
+    ))
+    return {"PASSWORD_ARGON2_TIME_COST": max(math.floor(target / elapsed), MIN_ARGON2_TIME_COST)}
+
+def apply_calibration(config: Settings = settings) -> bool:
+    """
+    Calibrate the cost for PASSWORD_HASH_TARGET_MS and apply it to `config` and `pwd_context`.
+
+    Runs once per process tree: workers forked after the calibration inherit
+    its result, and the target is cleared once it has been applied.
+
+    Args:
+        config (Settings): Settings to update.
+
+    Returns:
+        bool: True if a calibration ran.
+    """
+    if not config.PASSWORD_HASH_TARGET_MS:
+        return False
+    for field, value in calibrate(config.PASSWORD_HASH_TARGET_MS, config).items():
+        setattr(config, field, value)
+        logger.info("Password hashing calibrated to %s=%s for %d ms", field, value, config.PASSWORD_HASH_TARGET_MS)
+    config.PASSWORD_HASH_TARGET_MS = 0
+    load_policy(context_options(config))
+    return True
@@ -0,0 +1,82 @@
+import codecs
+import csv
+import json
+from typing import AsyncIterable, AsyncIterator, Tuple
+
+# Parsers for streamed user imports. Each yields (line number, row) pairs,
+# where a row is a dict of raw field values or an error message when the line
+# cannot be parsed at all.
+
+NDJSON_MEDIA_TYPES = {"application/x-ndjson", "application/ndjson", "application/jsonl"}
+CSV_MEDIA_TYPES = {"text/csv", "application/csv"}
+
+async def iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[str]:
+    """
+    Split a stream of UTF-8 byte chunks into lines without buffering the whole body.
+
+    Args:
+        chunks (AsyncIterable[bytes]): The body chunks, e.g. `request.stream()`.
+
+    Yields:
+        str: Each line, without its line terminator.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+async def parse_ndjson(lines: AsyncIterable[str]) -> AsyncIterator[Tuple[int, object]]:
+    """
+    Parse NDJSON, one JSON object per line. Blank lines are skipped.
+
+    Args:
+        lines (AsyncIterable[str]): The body lines.
+
+    Yields:
+        Tuple[int, object]: The line number and the parsed object, or an error message.
+    """
+    line_number = 0
+    async for line in lines:
+        line_number += 1
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            yield line_number, f"Invalid JSON: {exc}"
+            continue
+        if not isinstance(row, dict):
+            yield line_number, "Expected a JSON object"
+            continue
+        yield line_number, row
+
+async def parse_csv(lines: AsyncIterable[str]) -> AsyncIterator[Tuple[int, object]]:
+    """
+    Parse CSV with a header row, one record per line. Blank lines are skipped.
+
+    Args:
+        lines (AsyncIterable[str]): The body lines.
+
+    Yields:
+        Tuple[int, object]: The line number and the record as a dict, or an error message.
+    """
+    header = None
+    line_number = 0
+    async for line in lines:
+        line_number += 1
+        if not line.strip():
+            continue
+        values = next(csv.reader([line]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        if len(values) != len(header):
+            yield line_number, f"Expected {len(header)} fields, got {len(values)}"
+            continue
+        yield line_number, dict(zip(header, values))
@@ -1,55 +1,183 @@
-from sqlalchemy.orm import Session
-from app.models.users_models import User, UserRole
-from app.common.database import SessionLocal
-from passlib.hash import bcrypt
+import hashlib
+from sqlalchemy import MetaData, delete, insert, inspect, or_, select
+from sqlalchemy.engine import Connection, Dialect
+from sqlalchemy.exc import IntegrityError, OperationalError, ProgrammingError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+from sqlalchemy.schema import CreateColumn, CreateIndex, CreateTable
+from app.common.config import Settings, settings
+from app.common.database import Base, async_engine
+from app.common.logging_config import logger
+from app.models.schema_models import SchemaVersion
+# Imported for its table: the schema covers every model, not just the ones used here
+from app.models.token_models import RefreshToken
+from app.models.users_models import CollectionVersion, User, UserRole
 
-def create_admin_user(db: Session):
+# Attempts at updating the schema while other workers do the same
+SCHEMA_UPDATE_ATTEMPTS = 3
+
+def schema_version(metadata: MetaData, dialect: Dialect) -> str:
+    """
+    Fingerprint of the DDL the models would emit.
+
+    Any change to a table, column or index of the models changes the version,
+    which makes the next startup run `create_all` again.
+
+    Args:
+        metadata (MetaData): The models' metadata.
+        dialect (Dialect): Dialect the DDL is compiled for.
+
+    Returns:
+        str: A short hex digest of the compiled CREATE TABLE/INDEX statements.
+    """
+    ddl = []
+    for table in metadata.sorted_tables:
+        ddl.append(str(CreateTable(table).compile(dialect=dialect)))
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            ddl.append(str(CreateIndex(index).compile(dialect=dialect)))
+    return hashlib.sha256("\n".join(ddl).encode()).hexdigest()[:16]
+
+def add_missing_columns(connection: Connection):
+    """
+    Add the columns of the models that existing tables lack, e.g. `users.version`.
+
+    `create_all` skips tables that already exist, so columns added to a model
+    would otherwise never be created. A new NOT NULL column needs a server
+    default, which also fills it in for the existing rows.
+
+    Args:
+        connection (Connection): Connection of the schema update transaction.
+    """
+    inspector = inspect(connection)
+    for table in Base.metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                ddl = CreateColumn(column).compile(dialect=connection.dialect)
+                connection.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {ddl}")
+                logger.info("Column %s.%s added", table.name, column.name)
+
+def create_tables_and_indexes(connection: Connection):
+    """
+    Create the missing tables, columns and indexes.
+
+    `create_all` only creates indexes together with their table, so indexes
+    added to an existing model would otherwise never be created.
+
+    Args:
+        connection (Connection): Connection of the schema update transaction.
+    """
+    Base.metadata.create_all(connection)
+    add_missing_columns(connection)
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            # IF NOT EXISTS rather than checkfirst: reflection skips expression indexes
+            connection.execute(CreateIndex(index, if_not_exists=True))
+
+async def get_schema_version(engine: AsyncEngine):
     """
-    Creates an admin user if one does not exist.
+    Read the schema version recorded by the last successful startup.
 
     Args:
-        db (Session): The SQLAlchemy session to use.
+        engine (AsyncEngine): The database engine.
 
     Returns:
-        None
-    """
-    admin_email = "admin@example.com"
-    admin_username = "admin"
-    admin_password = "strongpass123"
-    admin_role = UserRole.admin
-
-    # Check if an admin user already exists
-    admin_user = db.query(User).filter(User.email == admin_email).first()
-    if not admin_user:
-        # Create admin user if not found
-        new_admin = User(
-            email=admin_email,
-            username=admin_username,
-            password=bcrypt.hash(admin_password),  # Securely hash the password
-            role=admin_role
-        )
-        db.add(new_admin)
-        db.commit()
-        print("Admin user created.")
-    else:
-        print("Admin user already exists.")
-
-def initialize_database():
-    """
-    Initializes the database by creating an admin user if one does not exist.
-
-    This function creates a local database session and calls create_admin_user to
-    create an admin user if one does not exist. Finally, it closes the database
-    session.
+        str or None: The recorded version, or None for a database that has none.
+    """
+    async with engine.connect() as connection:
+        try:
+            return await connection.scalar(select(SchemaVersion.version).where(SchemaVersion.id == 1))
+        except (OperationalError, ProgrammingError):
+            # The schema_version table itself does not exist yet
+            return None
+
+async def create_collection_versions(connection: AsyncConnection):
+    """
+    Add the missing `collection_versions` rows.
+
+    The row is inserted together with its table, but a database whose table
+    predates the row, or lost it, would otherwise serve listings without an
+    ETag counter.
 
     Args:
-        None
+        connection (AsyncConnection): Connection of the schema update transaction.
+    """
+    existing = await connection.scalar(
+        select(CollectionVersion.name).where(CollectionVersion.name == "users")
+    )
+    if existing is None:
+        await connection.execute(insert(CollectionVersion).values(name="users", version=1))
+
+async def create_admin_user(connection: AsyncConnection, config: Settings = settings):
+    """
+    Creates the admin user if no user has its username or email.
+
+    The password is stored as the pre-computed `ADMIN_PASSWORD_HASH`, so this
+    never runs bcrypt.
+
+    Args:
+        connection (AsyncConnection): Connection of the schema update transaction.
+        config (Settings): Settings providing the admin account.
 
     Returns:
-        None
+        bool: True if the admin user was created.
     """
-    db = SessionLocal()
-    try:
-        create_admin_user(db)
-    finally:
-        db.close()
+    existing = await connection.scalar(
+        select(User.id).where(or_(User.username == config.ADMIN_USERNAME, User.email == config.ADMIN_EMAIL))
+    )
+    if existing is not None:
+        return False
+    await connection.execute(insert(User).values(
+        username=config.ADMIN_USERNAME,
+        email=config.ADMIN_EMAIL,
+        password=config.ADMIN_PASSWORD_HASH,
+        role=UserRole.admin
+    ))
+    return True
+
+async def initialize_database(engine: AsyncEngine = async_engine, config: Settings = settings):
+    """
+    Brings the database schema up to date and creates the admin user.
+
+    When the recorded schema version matches the models this is a single
+    SELECT. Otherwise the missing tables, columns, indexes and triggers are
+    created, the admin user is created if absent and the new version is
+    recorded, all in one transaction. Columns are only ever added: changing or
+    dropping a column still needs a migration.
+
+    If several workers start at once, only one of them can record the version;
+    the others see the conflict, re-read the version and carry on. SQLite
+    commits each CREATE on its own, so a worker can also trip over a table
+    another one created before that one recorded the version; it then tries
+    again, skipping the tables that now exist.
+
+    Args:
+        engine (AsyncEngine): The database engine.
+        config (Settings): Settings providing the admin account.
+
+    Returns:
+        bool: True if the schema had to be updated.
+    """
+    expected = schema_version(Base.metadata, engine.dialect)
+    if await get_schema_version(engine) == expected:
+        logger.info("Database schema is current (version %s)", expected)
+        return False
+
+    for attempt in range(SCHEMA_UPDATE_ATTEMPTS):
+        try:
+            async with engine.begin() as connection:
+                await connection.run_sync(create_tables_and_indexes)
+                await create_collection_versions(connection)
+                if await create_admin_user(connection, config):
+                    logger.info("Admin user %s created", config.ADMIN_USERNAME)
+                await connection.execute(delete(SchemaVersion))
+                await connection.execute(insert(SchemaVersion).values(id=1, version=expected))
+            break
+        except (IntegrityError, OperationalError, ProgrammingError):
+            if await get_schema_version(engine) == expected:
+                logger.info("Database schema was updated by another worker (version %s)", expected)
+                return False
+            if attempt == SCHEMA_UPDATE_ATTEMPTS - 1:
+                raise
+
+    logger.info("Database schema updated to version %s", expected)
+    return True
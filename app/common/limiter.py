@@ -1,41 +1,326 @@
+import asyncio
+import hashlib
+import multiprocessing
+import struct
 import time
+from collections import OrderedDict
+from multiprocessing.shared_memory import SharedMemory
+from typing import Optional
 from fastapi import HTTPException, Request, status
-from collections import defaultdict
 from app.common.config import settings
 
 # Rate limit configurations
 RATE_LIMIT = settings.RATE_LIMIT_MAX_REQUESTS
 RATE_LIMIT_PERIOD = settings.RATE_LIMIT_WINDOW
 
-# Dictionary to store IP request timestamps
-request_times = defaultdict(list)
+class SlidingWindowLimiter:
+    """
+    Sliding-window counter rate limiter with a bounded number of tracked clients.
+
+    Each client keeps only three numbers: the index of its current fixed
+    window and the request counts of the current and previous windows. The
+    request rate over the sliding window is estimated by weighting the
+    previous window's count by how much of it still overlaps, so every check
+    is O(1) regardless of the limit.
+
+    Clients are kept in least-recently-seen order: when `max_clients` is
+    reached the stalest client is evicted, and `sweep` drops idle clients from
+    the front without scanning the active ones.
+    """
+
+    def __init__(self, limit: int, window: float, max_clients: int):
+        self.limit = limit
+        self.window = window
+        self.max_clients = max_clients
+        # key -> [window index, current window count, previous window count]
+        self._clients: "OrderedDict[str, list]" = OrderedDict()
+
+    def hit(self, key: str, now: Optional[float] = None) -> bool:
+        """
+        Record a request for `key` if it is within the limit.
+
+        Args:
+            key (str): Client identifier, e.g. its IP address.
+            now (float, optional): Current time in seconds, defaults to `time.time()`.
+
+        Returns:
+            bool: True if the request is allowed, False if the limit is exceeded.
+        """
+        if now is None:
+            now = time.time()
+        index = int(now // self.window)
+        state = self._clients.get(key)
+        if state is None:
+            if len(self._clients) >= self.max_clients:
+                self._clients.popitem(last=False)
+            state = self._clients[key] = [index, 0, 0]
+        else:
+            self._clients.move_to_end(key)
+            if state[0] != index:
+                state[2] = state[1] if state[0] == index - 1 else 0
+                state[1] = 0
+                state[0] = index
+
+        overlap = 1.0 - (now % self.window) / self.window
+        if state[2] * overlap + state[1] >= self.limit:
+            return False
+        state[1] += 1
+        return True
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """
+        Evict clients that sent no request during the current or previous window.
+
+        Args:
+            now (float, optional): Current time in seconds, defaults to `time.time()`.
+
+        Returns:
+            int: Number of evicted clients.
+        """
+        if now is None:
+            now = time.time()
+        index = int(now // self.window)
+        evicted = 0
+        while self._clients:
+            key, state = next(iter(self._clients.items()))
+            if state[0] >= index - 1:
+                break
+            del self._clients[key]
+            evicted += 1
+        return evicted
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+class LimiterBackend:
+    """
+    Storage backend of the rate limiter.
+
+    Backends are selected with the RATE_LIMIT_BACKEND setting. The in-memory
+    backend is per process; shared backends enforce one limit across every
+    worker and node.
+    """
+
+    async def hit(self, key: str) -> bool:
+        """
+        Record a request for `key` if it is within the limit.
+
+        Args:
+            key (str): Client identifier, e.g. its IP address.
+
+        Returns:
+            bool: True if the request is allowed, False if the limit is exceeded.
+        """
+        raise NotImplementedError
+
+    async def sweep(self) -> int:
+        """
+        Evict idle clients, for backends that need it.
+
+        Returns:
+            int: Number of evicted clients.
+        """
+        return 0
+
+    async def close(self):
+        """
+        Release the resources held by the backend.
+        """
+
+class MemoryLimiterBackend(LimiterBackend):
+    """
+    Per-process backend built on `SlidingWindowLimiter`.
+    """
+
+    def __init__(self, limit: int, window: float, max_clients: int):
+        self.limiter = SlidingWindowLimiter(limit, window, max_clients)
+
+    async def hit(self, key: str) -> bool:
+        return self.limiter.hit(key)
+
+    async def sweep(self) -> int:
+        return self.limiter.sweep()
+
+class SharedMemoryLimiterBackend(LimiterBackend):
+    """
+    Backend shared by the worker processes of one host through a shared-memory
+    segment, for the pre-forked workers of `app.server`.
+
+    The segment is a fixed-size open-addressing hash table: each slot holds an
+    8-byte fingerprint of the client key, the index of its current window and
+    the request counts of the current and previous windows, i.e. the same
+    sliding-window counter as `SlidingWindowLimiter`. A key lives in one of
+    `PROBES` consecutive slots; slots idle for two windows are reused in place
+    and, when all of them are busy, the stalest one is evicted, so memory is
+    bounded by `max_clients` and no sweep is needed.
 
-def rate_limiter(request: Request):
+    The segment and its lock are created by the process that builds the
+    backend and inherited by the workers it forks; each check holds the lock
+    for a handful of struct reads and writes.
+    """
+
+    SLOT = struct.Struct("<QqII")
+    PROBES = 8
+
+    def __init__(self, limit: int, window: float, max_clients: int):
+        self.limit = limit
+        self.window = window
+        self.slots = max(max_clients, self.PROBES)
+        self._shm = SharedMemory(create=True, size=self.slots * self.SLOT.size)
+        self._shm.buf[:] = bytes(len(self._shm.buf))
+        self._lock = multiprocessing.Lock()
+
+    def _fingerprint(self, key: str) -> int:
+        # Not hash(): it is salted per process unless the workers are forked
+        fingerprint = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little")
+        return fingerprint or 1
+
+    def _hit(self, fingerprint: int, index: int, overlap: float) -> bool:
+        buf = self._shm.buf
+        size = self.SLOT.size
+        start = fingerprint % self.slots
+        found = free = stalest = None
+        for probe in range(self.PROBES):
+            offset = (start + probe) % self.slots * size
+            slot_fingerprint, slot_index, _, _ = self.SLOT.unpack_from(buf, offset)
+            if slot_fingerprint == fingerprint:
+                found = offset
+                break
+            if free is None and (slot_fingerprint == 0 or slot_index < index - 1):
+                free = offset
+            if stalest is None or slot_index < stalest[1]:
+                stalest = (offset, slot_index)
+
+        if found is None:
+            offset = free if free is not None else stalest[0]
+            state = [index, 0, 0]
+        else:
+            offset = found
+            _, slot_index, current, previous = self.SLOT.unpack_from(buf, offset)
+            if slot_index == index:
+                state = [index, current, previous]
+            else:
+                state = [index, 0, current if slot_index == index - 1 else 0]
+
+        allowed = state[2] * overlap + state[1] < self.limit
+        if allowed:
+            state[1] += 1
+        self.SLOT.pack_into(buf, offset, fingerprint, *state)
+        return allowed
+
+    async def hit(self, key: str, now: Optional[float] = None) -> bool:
+        if now is None:
+            now = time.time()
+        index = int(now // self.window)
+        overlap = 1.0 - (now % self.window) / self.window
+        fingerprint = self._fingerprint(key)
+        with self._lock:
+            return self._hit(fingerprint, index, overlap)
+
+    async def close(self):
+        self._shm.close()
+
+    def unlink(self):
+        """
+        Remove the segment; called once by the process that created it, after its workers exited.
+        """
+        self._shm.close()
+        self._shm.unlink()
+
+# Same sliding-window counter as SlidingWindowLimiter, evaluated atomically
+# inside Redis. KEYS: current and previous window counters.
+# ARGV: limit, window length, seconds elapsed in the current window.
+SLIDING_WINDOW_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local elapsed = tonumber(ARGV[3])
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+if previous * (1 - elapsed / window) + current >= limit then
+    return 0
+end
+redis.call('INCR', KEYS[1])
+redis.call('EXPIRE', KEYS[1], math.ceil(window * 2))
+return 1
+"""
+
+class RedisLimiterBackend(LimiterBackend):
+    """
+    Backend shared by every worker through Redis (or any server speaking the
+    Redis protocol). Each check is a single EVALSHA round-trip; counters expire
+    on their own, so no sweep is needed.
+    """
+
+    def __init__(self, client, limit: int, window: float, prefix: str = "rate_limit"):
+        self.client = client
+        self.limit = limit
+        self.window = window
+        self.prefix = prefix
+        self._script = client.register_script(SLIDING_WINDOW_SCRIPT)
+
+    @classmethod
+    def from_url(cls, url: str, limit: int, window: float, prefix: str = "rate_limit"):
+        try:
+            from redis import asyncio as aioredis
+        except ImportError:
+            import aioredis
+        return cls(aioredis.from_url(url), limit, window, prefix)
+
+    async def hit(self, key: str, now: Optional[float] = None) -> bool:
+        if now is None:
+            now = time.time()
+        index = int(now // self.window)
+        keys = [f"{self.prefix}:{key}:{index}", f"{self.prefix}:{key}:{index - 1}"]
+        allowed = await self._script(keys=keys, args=[self.limit, self.window, now % self.window])
+        return bool(int(allowed))
+
+    async def close(self):
+        await self.client.aclose()
+
+def create_backend() -> LimiterBackend:
+    """
+    Build the limiter backend selected by the RATE_LIMIT_BACKEND setting.
+
+    Returns:
+        LimiterBackend: The configured backend.
+
+    Raises:
+        ValueError: If the backend name is unknown.
+    """
+    if settings.RATE_LIMIT_BACKEND == "memory":
+        return MemoryLimiterBackend(RATE_LIMIT, RATE_LIMIT_PERIOD, settings.RATE_LIMIT_MAX_CLIENTS)
+    if settings.RATE_LIMIT_BACKEND == "shm":
+        return SharedMemoryLimiterBackend(RATE_LIMIT, RATE_LIMIT_PERIOD, settings.RATE_LIMIT_MAX_CLIENTS)
+    if settings.RATE_LIMIT_BACKEND == "redis":
+        return RedisLimiterBackend.from_url(settings.RATE_LIMIT_REDIS_URL, RATE_LIMIT, RATE_LIMIT_PERIOD)
+    raise ValueError(f"Unknown rate limit backend: {settings.RATE_LIMIT_BACKEND}")
+
+backend = create_backend()
+
+async def sweep_idle_clients(interval: float):
+    """
+    Periodically evict idle clients from the limiter backend.
+
+    Args:
+        interval (float): Seconds between two sweeps.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        await backend.sweep()
+
+async def rate_limiter(request: Request):
     """
     Middleware to enforce a rate limit on incoming requests.
 
-    This middleware records the time of each incoming request and blocks
+    This middleware counts incoming requests per client IP and blocks
     requests that exceed the rate limit.
 
     :param request: The incoming request
     :type request: fastapi.Request
     :raises HTTPException: If the rate limit is exceeded
     """
-    client_ip = request.client.host
-    current_time = time.time()
-
-    # Remove requests older than RATE_LIMIT_PERIOD
-    request_times[client_ip] = [
-        timestamp for timestamp in request_times[client_ip]
-        if current_time - timestamp < RATE_LIMIT_PERIOD
-    ]
-
-    # Check if client has exceeded the rate limit
-    if len(request_times[client_ip]) >= RATE_LIMIT:
+    if not await backend.hit(request.client.host):
         raise HTTPException(
             status_code=status.HTTP_429_TOO_MANY_REQUESTS,
             detail="Rate limit exceeded. Try again later."
         )
-
-    # Record the new request
-    request_times[client_ip].append(current_time)
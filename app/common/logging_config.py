@@ -1,28 +1,112 @@
+import atexit
+import json
 import logging
-import logging.config
+import logging.handlers
 import os
+import queue
+import random
+from datetime import datetime, timezone
+from app.common.config import settings
 
-LOG_FILE_PATH = os.path.join(os.path.dirname(__file__), 'app.log')
+LOG_FILE_PATH = settings.LOG_FILE_PATH or os.path.join(os.path.dirname(__file__), 'app.log')
 
-logging_config = {
-    "version": 1,
-    "formatters": {
-        "default": {
-            "format": "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-        }
-    },
-    "handlers": {
-        "file": {
-            "class": "logging.FileHandler",
-            "formatter": "default",
-            "filename": LOG_FILE_PATH
+# Attributes every LogRecord has; anything else was passed through `extra`
+RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+class JsonFormatter(logging.Formatter):
+    """
+    Format records as one JSON object per line.
+
+    Fields passed through `extra` are included as top-level keys.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
         }
-    },
-    "root": {
-        "level": "INFO",
-        "handlers": ["file"]
-    }
-}
-
-logging.config.dictConfig(logging_config)
+        for key, value in vars(record).items():
+            if key not in RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep only a fraction of the records flagged with `extra={"sampled": True}`.
+
+    Rates are given per level name, e.g. `{"INFO": 0.1}` keeps one in ten
+    sampled INFO records; levels without a rate are always kept.
+    """
+
+    def __init__(self, rates: dict):
+        super().__init__()
+        self.rates = {level.upper(): rate for level, rate in rates.items()}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not getattr(record, "sampled", False):
+            return True
+        rate = self.rates.get(record.levelname)
+        return rate is None or random.random() < rate
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that enqueues records unformatted.
+
+    The stock handler merges the message arguments on the calling thread;
+    here that is left to the formatter on the listener thread, so the request
+    path only pays for the enqueue.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+def configure_logging() -> logging.handlers.QueueListener:
+    """
+    Route the root logger through a queue to a rotating JSON log file.
+
+    Returns:
+        logging.handlers.QueueListener: The started listener writing the file.
+    """
+    file_handler = logging.handlers.RotatingFileHandler(
+        LOG_FILE_PATH,
+        maxBytes=settings.LOG_MAX_BYTES,
+        backupCount=settings.LOG_BACKUP_COUNT,
+        encoding="utf-8"
+    )
+    file_handler.setFormatter(JsonFormatter())
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = LazyQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(settings.LOG_SAMPLE_RATES))
+
+    root = logging.getLogger()
+    root.setLevel(settings.LOG_LEVEL)
+    root.addHandler(queue_handler)
+
+    listener = logging.handlers.QueueListener(log_queue, file_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+def restart_listener():
+    """
+    Start a listener thread in a forked child; threads do not survive fork().
+
+    The child gets a new queue: the inherited one holds the parent's pending
+    records, and possibly the lock of the parent's listener thread.
+    """
+    log_queue = queue.SimpleQueue()
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, LazyQueueHandler):
+            handler.queue = log_queue
+    listener.queue = log_queue
+    listener._thread = None
+    listener.start()
+
+listener = configure_logging()
+os.register_at_fork(after_in_child=restart_listener)
 logger = logging.getLogger("app_logger")
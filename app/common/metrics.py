@@ -0,0 +1,382 @@
+import asyncio
+import json
+import os
+import secrets
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Minimal in-process metrics with Prometheus text exposition. Updates are a
+# dict lookup and a few additions under a lock, cheap enough for every
+# request and every query.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+FAST_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Sequence[str], values: Sequence, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    """
+    Monotonically increasing value per label combination.
+    """
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels) -> float:
+        return self._values.get(labels, 0)
+
+    def values(self) -> Dict[Tuple, float]:
+        with self._lock:
+            return dict(self._values)
+
+    def format(self, values: Dict[Tuple, float]) -> Iterable[str]:
+        for labels, value in values.items():
+            yield f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+
+    def samples(self) -> Iterable[str]:
+        return self.format(self.values())
+
+class Gauge:
+    """
+    Value that can go up and down, per label combination.
+    """
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple, float] = {}
+
+    def set(self, value: float, *labels):
+        self._values[labels] = value
+
+    def value(self, *labels) -> float:
+        return self._values.get(labels, 0)
+
+    def values(self) -> Dict[Tuple, float]:
+        return dict(self._values)
+
+    def format(self, values: Dict[Tuple, float]) -> Iterable[str]:
+        for labels, value in values.items():
+            yield f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+
+    def samples(self) -> Iterable[str]:
+        return self.format(self.values())
+
+class Histogram:
+    """
+    Distribution of observed values in cumulative buckets, per label combination.
+    """
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (last one is +Inf), sum, count]
+        self._values: Dict[Tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, *labels):
+        """
+        Observe the duration of the `with` block, in seconds.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def count(self, *labels) -> int:
+        state = self._values.get(labels)
+        return state[2] if state else 0
+
+    def values(self) -> Dict[Tuple, list]:
+        with self._lock:
+            return {labels: [list(state[0]), state[1], state[2]] for labels, state in self._values.items()}
+
+    def format(self, values: Dict[Tuple, list]) -> Iterable[str]:
+        for labels, (counts, total, count) in values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_number(bound)}"'
+                yield f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}"
+            yield f"{self.name}_count{_labels(self.labelnames, labels)} {count}"
+
+    def samples(self) -> Iterable[str]:
+        return self.format(self.values())
+
+class CallbackMetric:
+    """
+    Metric whose samples are read from a callback at exposition time, for
+    values already tracked elsewhere (e.g. cache hit counters).
+    """
+
+    def __init__(self, name: str, documentation: str, type: str, callback: Callable[[], Dict[Tuple, float]], labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.type = type
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+
+    def values(self) -> Dict[Tuple, float]:
+        return dict(self.callback())
+
+    def format(self, values: Dict[Tuple, float]) -> Iterable[str]:
+        for labels, value in values.items():
+            yield f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+
+    def samples(self) -> Iterable[str]:
+        return self.format(self.values())
+
+def _merge(type: str, current, value):
+    # Gauges (e.g. startup durations) report the highest worker's value;
+    # counters and histograms add up
+    if current is None:
+        return value
+    if type == "gauge":
+        return max(current, value)
+    if type == "histogram":
+        return [[a + b for a, b in zip(current[0], value[0])], current[1] + value[1], current[2] + value[2]]
+    return current + value
+
+class Registry:
+    def __init__(self):
+        self.metrics: List = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def snapshot(self) -> dict:
+        """
+        The values of every metric, as JSON-serializable `{name: [[labels, value], ...]}`.
+        """
+        return {metric.name: [[list(labels), value] for labels, value in metric.values().items()] for metric in self.metrics}
+
+    def render(self, snapshots: Optional[Iterable[dict]] = None) -> str:
+        """
+        Render every metric in the Prometheus text exposition format.
+
+        Args:
+            snapshots (Iterable[dict], optional): Outputs of `snapshot`, e.g.
+                one per worker process, to merge and render instead of this
+                process's own values.
+        """
+        merged: Dict[str, dict] = {}
+        types = {metric.name: metric.type for metric in self.metrics}
+        for snapshot in snapshots or ():
+            for name, values in snapshot.items():
+                if name not in types:
+                    continue
+                target = merged.setdefault(name, {})
+                for labels, value in values:
+                    labels = tuple(labels)
+                    target[labels] = _merge(types[name], target.get(labels), value)
+
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            if snapshots is None:
+                lines.extend(metric.samples())
+            else:
+                lines.extend(metric.format(merged.get(metric.name, {})))
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+def _reset_after_fork():
+    # A forked worker starts from zero rather than from its parent's values,
+    # which would otherwise be counted once per worker when merged. The locks
+    # are replaced, not taken: a thread of the parent may have held them
+    for metric in registry.metrics:
+        if hasattr(metric, "_values"):
+            metric._values = {}
+        if hasattr(metric, "_lock"):
+            metric._lock = threading.Lock()
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+http_requests_total = registry.register(Counter(
+    "http_requests_total", "HTTP requests by route and status code.", ("method", "route", "status")
+))
+http_request_duration_seconds = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route.", ("method", "route")
+))
+db_queries_total = registry.register(Counter(
+    "db_queries_total", "SQL statements sent to the database.", ("engine",)
+))
+db_query_duration_seconds = registry.register(Histogram(
+    "db_query_duration_seconds", "SQL statement execution time.", ("engine",), FAST_BUCKETS
+))
+password_hash_duration_seconds = registry.register(Histogram(
+    "password_hash_duration_seconds", "Time spent hashing or verifying passwords, including pool queueing.", ("operation",)
+))
+jwt_duration_seconds = registry.register(Histogram(
+    "jwt_duration_seconds", "Time spent encoding or decoding JWTs.", ("operation",), FAST_BUCKETS
+))
+app_startup_duration_seconds = registry.register(Gauge(
+    "app_startup_duration_seconds", "Time spent importing the app and running its startup pipeline.", ("phase",)
+))
+
+# Multi-process exposition. Each worker writes a snapshot of its metrics to
+# a shared directory; a scrape, answered by any one worker, merges them all.
+# The file of a worker that exited is kept, so that counters never go back.
+
+SNAPSHOT_SUFFIX = ".metrics.json"
+
+# pid -> snapshot file name; the random part tells apart processes that
+# reuse the pid of an earlier one
+_snapshot_names: Dict[int, str] = {}
+
+def snapshot_path(directory: str) -> str:
+    """
+    Path of the current process's snapshot file in `directory`.
+    """
+    pid = os.getpid()
+    name = _snapshot_names.get(pid)
+    if name is None:
+        name = _snapshot_names[pid] = f"{pid}-{secrets.token_hex(4)}{SNAPSHOT_SUFFIX}"
+    return os.path.join(directory, name)
+
+def write_snapshot(directory: str, registry: Registry = registry):
+    """
+    Replace the current process's snapshot file with its current values.
+    """
+    path = snapshot_path(directory)
+    partial = f"{path}.partial"
+    with open(partial, "w") as file:
+        json.dump(registry.snapshot(), file)
+    os.replace(partial, path)
+
+def read_snapshots(directory: str) -> List[dict]:
+    """
+    Read the snapshot of every process that wrote one to `directory`.
+    """
+    snapshots = []
+    for entry in os.scandir(directory):
+        if not entry.name.endswith(SNAPSHOT_SUFFIX):
+            continue
+        try:
+            with open(entry.path) as file:
+                snapshots.append(json.load(file))
+        except (OSError, ValueError):
+            # Removed or replaced while being read; picked up next time
+            continue
+    return snapshots
+
+def clear_snapshots(directory: str):
+    """
+    Remove the snapshots left by a previous run of the server.
+    """
+    for entry in os.scandir(directory):
+        if entry.name.endswith((SNAPSHOT_SUFFIX, f"{SNAPSHOT_SUFFIX}.partial")):
+            os.remove(entry.path)
+
+async def write_snapshots(directory: str, interval: float):
+    """
+    Write the current process's snapshot every `interval` seconds.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        write_snapshot(directory)
+
+def instrument_engine(engine, name: str):
+    """
+    Count and time every statement executed by a SQLAlchemy engine.
+
+    Args:
+        engine (Engine): A sync engine, or the `sync_engine` of an async one.
+        name (str): Value of the `engine` label.
+    """
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def start_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def stop_timer(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_start_time"].pop()
+        db_queries_total.inc(name)
+        db_query_duration_seconds.observe(time.perf_counter() - started, name)
+
+    @event.listens_for(engine, "handle_error")
+    def discard_timer(exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("query_start_time"):
+            connection.info["query_start_time"].pop()
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording latency and status of every HTTP request.
+
+    Requests are labelled with the path template of the matched route (e.g.
+    `/users/{user_id}`) so the number of series stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            method = scope["method"]
+            http_request_duration_seconds.observe(time.perf_counter() - started, method, path)
+            http_requests_total.inc(method, path, status_code)
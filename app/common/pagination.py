@@ -0,0 +1,42 @@
+import base64
+import binascii
+
+CURSOR_PREFIX = "id:"
+
+def encode_cursor(last_id: int) -> str:
+    """
+    Encode the last seen primary key into an opaque pagination cursor.
+
+    Args:
+        last_id (int): ID of the last row of the current page.
+
+    Returns:
+        str: URL-safe cursor to pass back as the `after` parameter.
+    """
+    raw = f"{CURSOR_PREFIX}{last_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> int:
+    """
+    Decode a cursor produced by `encode_cursor`.
+
+    Args:
+        cursor (str): The opaque cursor.
+
+    Returns:
+        int: The ID after which the next page starts.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+    except (binascii.Error, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+    if not raw.startswith(CURSOR_PREFIX):
+        raise ValueError("Invalid cursor")
+    try:
+        return int(raw[len(CURSOR_PREFIX):])
+    except ValueError:
+        raise ValueError("Invalid cursor")
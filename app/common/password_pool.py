@@ -0,0 +1,190 @@
+import asyncio
+import multiprocessing
+import os
+from typing import List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from fastapi import HTTPException, status
+from app import auth
+from app.common import hashing
+from app.common.config import settings
+from app.common.metrics import password_hash_duration_seconds
+
+# Password hashing runs in a dedicated process pool so that it neither holds the
+# GIL nor occupies the threadpool used by the rest of the API. At most
+# PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE_SIZE operations are accepted at
+# once; anything beyond that is rejected with a 503 instead of queueing. Bulk
+# jobs never take more than all workers but one, which stays free for logins.
+
+_executor = None
+_pending = 0
+_bulk_pending = 0
+
+def pool_size() -> int:
+    """
+    Return the number of worker processes, defaulting to one per CPU core.
+    """
+    return settings.PASSWORD_HASH_WORKERS or os.cpu_count() or 1
+
+def capacity() -> int:
+    """
+    Return the number of password operations accepted at once.
+    """
+    return pool_size() + settings.PASSWORD_HASH_QUEUE_SIZE
+
+def bulk_slots() -> int:
+    """
+    Return the number of workers bulk hashing may keep busy at once.
+    """
+    return max(pool_size() - 1, 1)
+
+def _hash(password: str) -> str:
+    return hashing.pwd_context.hash(password)
+
+def _hash_many(passwords: List[str]) -> List[str]:
+    return [hashing.pwd_context.hash(password) for password in passwords]
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    return auth.verify_password(plain_password, hashed_password)
+
+def _verify_and_update(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return hashing.pwd_context.verify_and_update(plain_password, hashed_password)
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # Workers start from the environment's settings; hand them the
+        # policy in effect, which startup calibration may have changed
+        _executor = ProcessPoolExecutor(
+            max_workers=pool_size(),
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=hashing.load_policy,
+            initargs=(hashing.context_options(),)
+        )
+    return _executor
+
+def _busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Server busy. Try again later.",
+        headers={"Retry-After": "1"}
+    )
+
+def _reserve(slots: int):
+    global _pending
+    if _pending + slots > capacity():
+        raise _busy()
+    _pending += slots
+
+async def _run(fn, *args):
+    global _executor
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(_get_executor(), fn, *args)
+    except BrokenProcessPool:
+        # A worker died; start a fresh pool for the next caller
+        _executor = None
+        raise
+
+async def _submit(fn, *args):
+    global _pending
+    _reserve(1)
+    try:
+        return await _run(fn, *args)
+    finally:
+        _pending -= 1
+
+async def hash_password(password: str) -> str:
+    """
+    Hash a password in the worker pool.
+
+    Args:
+        password (str): The plaintext password.
+
+    Returns:
+        str: The hash, following the current hashing policy.
+
+    Raises:
+        HTTPException: If the pool is saturated (503).
+    """
+    with password_hash_duration_seconds.time("hash"):
+        return await _submit(_hash, password)
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """
+    Verify a password against its hash in the worker pool.
+
+    Args:
+        plain_password (str): The plaintext password to verify.
+        hashed_password (str): The hashed password to compare against.
+
+    Returns:
+        bool: True if the passwords match, False otherwise.
+
+    Raises:
+        HTTPException: If the pool is saturated (503).
+    """
+    with password_hash_duration_seconds.time("verify"):
+        return await _submit(_verify, plain_password, hashed_password)
+
+async def verify_and_update(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password and, if its hash does not follow the current hashing
+    policy, rehash it, in a single worker pool call.
+
+    Args:
+        plain_password (str): The plaintext password to verify.
+        hashed_password (str): The stored hash.
+
+    Returns:
+        Tuple[bool, Optional[str]]: Whether the password matches, and the
+        replacement hash when the stored one needs an update.
+
+    Raises:
+        HTTPException: If the pool is saturated (503).
+    """
+    with password_hash_duration_seconds.time("verify"):
+        return await _submit(_verify_and_update, plain_password, hashed_password)
+
+async def hash_passwords(passwords: List[str]) -> List[str]:
+    """
+    Hash many passwords, split evenly across `bulk_slots()` worker processes.
+
+    Each chunk keeps a worker busy for as long as it takes to hash it, so
+    bulk jobs together never hold more than `bulk_slots()` workers: at least
+    one is always left to interactive logins and registrations.
+
+    Args:
+        passwords (List[str]): The plaintext passwords.
+
+    Returns:
+        List[str]: The hashes, in the same order.
+
+    Raises:
+        HTTPException: If the pool or its share for bulk jobs is saturated (503).
+    """
+    global _pending, _bulk_pending
+    if not passwords:
+        return []
+    chunk_size = -(-len(passwords) // bulk_slots())
+    chunks = [passwords[i:i + chunk_size] for i in range(0, len(passwords), chunk_size)]
+    if _bulk_pending + len(chunks) > bulk_slots():
+        raise _busy()
+    _reserve(len(chunks))
+    _bulk_pending += len(chunks)
+    try:
+        with password_hash_duration_seconds.time("hash_many"):
+            results = await asyncio.gather(*(_run(_hash_many, chunk) for chunk in chunks))
+    finally:
+        _pending -= len(chunks)
+        _bulk_pending -= len(chunks)
+    return [hashed for chunk in results for hashed in chunk]
+
+def shutdown():
+    """
+    Stop the worker processes. A new pool is started on the next call.
+    """
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
@@ -0,0 +1,87 @@
+from typing import Iterable, List, Optional, Sequence, Tuple
+from pydantic import TypeAdapter
+from typing_extensions import TypedDict
+from fastapi import Response
+
+# Precompiled JSON serializers for user reads. Rows come straight from a
+# column-only SELECT, so they are dumped as-is: validating them against
+# `UserResponse` (EmailStr in particular) costs far more than the query.
+
+class UserRow(TypedDict, total=False):
+    """
+    The fields of `users_schemas.UserResponse`, in the same order.
+
+    Not total, so that sparse fieldsets serialize only the requested fields.
+    `role` is typed as `str`: the model's role enum is a `str` subclass and is
+    dumped as its value.
+    """
+    username: str
+    email: str
+    id: int
+    role: str
+
+USER_FIELDS = tuple(UserRow.__annotations__)
+
+def parse_fields(value: Optional[str]) -> Tuple[str, ...]:
+    """
+    Parse a comma-separated sparse fieldset, e.g. `id,username`.
+
+    Args:
+        value (str, optional): The requested fields; all of `USER_FIELDS` when empty.
+
+    Returns:
+        Tuple[str, ...]: The requested fields, in the order of `USER_FIELDS`.
+
+    Raises:
+        ValueError: If a field is not one of `USER_FIELDS`.
+    """
+    if not value:
+        return USER_FIELDS
+    requested = {field.strip() for field in value.split(",") if field.strip()}
+    unknown = requested.difference(USER_FIELDS)
+    if unknown or not requested:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}" if unknown else "No fields requested")
+    return tuple(field for field in USER_FIELDS if field in requested)
+
+class UserLookupRow(TypedDict):
+    """
+    The fields of `users_schemas.UserLookupResult`.
+    """
+    users: List[UserRow]
+    missing: List[int]
+    forbidden: List[int]
+
+user_adapter = TypeAdapter(UserRow)
+user_list_adapter = TypeAdapter(List[UserRow])
+user_lookup_adapter = TypeAdapter(UserLookupRow)
+
+# Rows are zipped with `fields`, so columns selected after them (e.g. the id
+# needed for a cursor) are left out of the output.
+
+def user_json(row: Sequence, fields: Sequence[str] = USER_FIELDS) -> bytes:
+    """
+    Serialize one user row, with columns in the order of `fields`.
+    """
+    return user_adapter.dump_json(dict(zip(fields, row)))
+
+def users_json(rows: Iterable[Sequence], fields: Sequence[str] = USER_FIELDS) -> bytes:
+    """
+    Serialize user rows, with columns in the order of `fields`, as a JSON array.
+    """
+    return user_list_adapter.dump_json([dict(zip(fields, row)) for row in rows])
+
+def user_lookup_json(rows: Iterable[Sequence], missing: List[int], forbidden: List[int], fields: Sequence[str] = USER_FIELDS) -> bytes:
+    """
+    Serialize the result of a multi-get: user rows plus the ids that were not returned.
+    """
+    return user_lookup_adapter.dump_json({
+        "users": [dict(zip(fields, row)) for row in rows],
+        "missing": missing,
+        "forbidden": forbidden
+    })
+
+def json_response(content: bytes, headers: Optional[dict] = None) -> Response:
+    """
+    Wrap already serialized JSON, bypassing the response model.
+    """
+    return Response(content=content, media_type="application/json", headers=headers)
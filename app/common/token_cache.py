@@ -0,0 +1,272 @@
+import ctypes
+import multiprocessing
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional, Set
+from app.common.config import settings
+from app.common.metrics import CallbackMetric, registry
+from app.schemas.token import TokenData
+from app.models.users_models import UserRole
+
+class Principal(NamedTuple):
+    """
+    Lightweight snapshot of the authenticated user.
+    """
+    id: int
+    username: str
+    role: UserRole
+
+class UserEpochs:
+    """
+    Per-user change counters in shared memory, seen by every worker process
+    of `app.server`.
+
+    The counters are allocated when the module is imported, i.e. in the
+    server's master before it forks, so all workers share them. Workers
+    started on their own (e.g. by `uvicorn --workers`, which spawns them)
+    each get their own counters, and only the TTLs bound what they miss. Every update
+    or deletion of a user bumps the counter of the user's slot (the ID modulo
+    `slots`); cached data is stamped with that counter and is stale as soon
+    as it moves, in whichever process made the change. Users sharing a slot
+    only cost each other extra cache misses.
+
+    A global generation, bumped before any slot, tells whether a change may
+    have raced with a database read: data is only stamped if the generation
+    read before the query is still current afterwards.
+    """
+
+    def __init__(self, slots: int):
+        self.slots = max(slots, 1)
+        # One counter per slot, then the generation
+        self._counters = multiprocessing.RawArray(ctypes.c_uint64, self.slots + 1)
+        self._lock = multiprocessing.Lock()
+
+    def generation(self) -> int:
+        """
+        Read before loading user data from the database.
+        """
+        return self._counters[self.slots]
+
+    def epoch(self, user_id: int, generation: int) -> Optional[int]:
+        """
+        The counter to stamp a user's data with, loaded since `generation`.
+
+        Returns:
+            int or None: The user's counter, or None if a change may have
+            raced with the load and the data must not be cached.
+        """
+        epoch = self._counters[user_id % self.slots]
+        if self._counters[self.slots] != generation:
+            return None
+        return epoch
+
+    def is_current(self, user_id: int, epoch: int) -> bool:
+        """
+        Whether data stamped with `epoch` still reflects the user.
+        """
+        return self._counters[user_id % self.slots] == epoch
+
+    def bump(self, user_id: int):
+        """
+        Mark everything cached about a user as stale, in every process.
+        """
+        with self._lock:
+            self._counters[self.slots] += 1
+            self._counters[user_id % self.slots] += 1
+
+class CachedToken(NamedTuple):
+    expires_at: float
+    epoch: int
+    claims: TokenData
+    principal: Principal
+
+class TokenCache:
+    """
+    Bounded LRU cache of verified tokens and the principal they resolve to.
+
+    Entries expire after `ttl` seconds or at the token's `exp` claim, whichever
+    comes first, and are stale once their user's counter in `epochs` moves,
+    so an update or deletion of the user takes effect at once in every
+    worker process. The TTL only bounds changes made outside the app, e.g.
+    directly in the database or by another host.
+    """
+
+    def __init__(self, max_size: int, ttl: float, epochs: UserEpochs):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.epochs = epochs
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, CachedToken]" = OrderedDict()
+        self._tokens_by_user: Dict[int, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[CachedToken]:
+        """
+        Return the cached entry for a token, or None if absent or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.expires_at <= time.time() or not self.epochs.is_current(entry.principal.id, entry.epoch):
+                self._remove(token)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return entry
+
+    def put(self, token: str, claims: TokenData, principal: Principal, generation: int):
+        """
+        Cache a verified token, evicting the least recently used entry when full.
+
+        Args:
+            token (str): The raw token.
+            claims (TokenData): Its verified claims.
+            principal (Principal): The user it resolves to.
+            generation (int): `epochs.generation()`, read before the user was loaded.
+        """
+        if self.max_size <= 0:
+            return
+        epoch = self.epochs.epoch(principal.id, generation)
+        if epoch is None:
+            return
+        expires_at = time.time() + self.ttl
+        if claims.exp is not None:
+            expires_at = min(expires_at, claims.exp)
+        with self._lock:
+            if token in self._entries:
+                self._remove(token)
+            self._entries[token] = CachedToken(expires_at, epoch, claims, principal)
+            self._tokens_by_user.setdefault(principal.id, set()).add(token)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate_user(self, user_id: int):
+        """
+        Drop every cached token that resolves to the given user.
+        """
+        with self._lock:
+            for token in self._tokens_by_user.pop(user_id, set()):
+                self._entries.pop(token, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tokens_by_user.clear()
+
+    def stats(self) -> dict:
+        """
+        Return the hit/miss counters and the current number of entries.
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+    def _remove(self, token: str):
+        entry = self._entries.pop(token)
+        tokens = self._tokens_by_user.get(entry.principal.id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[entry.principal.id]
+
+class TokenVersion(NamedTuple):
+    version: int
+    username: Optional[str]
+
+class TokenVersions:
+    """
+    Bounded LRU map of user ID to the user's current token version.
+
+    The token version is the user row's `version`, which every update bumps;
+    an access token is only valid while its `tv` claim still matches it. The
+    username is kept alongside, so that a token of a deleted user does not
+    match a new user that reuses its ID.
+
+    Entries are read from the database on a miss and stamped with the user's
+    counter in `epochs`, so an update or deletion made by any worker process
+    makes them stale at once. They also expire after `ttl` seconds, which
+    bounds how long a change made outside the app goes unnoticed.
+    """
+
+    MISSING = TokenVersion(0, None)
+
+    def __init__(self, max_size: int, ttl: float, epochs: UserEpochs):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.epochs = epochs
+        # user ID -> (expiry time, epoch, version)
+        self._versions: "OrderedDict[int, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> Optional[TokenVersion]:
+        """
+        Return the known version of a user (`MISSING` if deleted), or None if unknown or stale.
+        """
+        with self._lock:
+            entry = self._versions.get(user_id)
+            if entry is None:
+                return None
+            if entry[0] <= time.time() or not self.epochs.is_current(user_id, entry[1]):
+                del self._versions[user_id]
+                return None
+            self._versions.move_to_end(user_id)
+            return entry[2]
+
+    def put(self, user_id: int, version: TokenVersion, generation: int):
+        """
+        Record the version just read from the database.
+
+        Args:
+            user_id (int): The user's ID.
+            version (TokenVersion): The user's version, or `MISSING`.
+            generation (int): `epochs.generation()`, read before the version was.
+        """
+        if self.max_size <= 0:
+            return
+        epoch = self.epochs.epoch(user_id, generation)
+        if epoch is None:
+            return
+        with self._lock:
+            self._versions.pop(user_id, None)
+            self._versions[user_id] = (time.time() + self.ttl, epoch, version)
+            while len(self._versions) > self.max_size:
+                self._versions.popitem(last=False)
+
+    def invalidate_user(self, user_id: int):
+        """
+        Forget a user's version, so that the next check reads it again.
+        """
+        with self._lock:
+            self._versions.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._versions.clear()
+
+    def __len__(self) -> int:
+        return len(self._versions)
+
+user_epochs = UserEpochs(settings.TOKEN_CACHE_EPOCH_SLOTS)
+token_cache = TokenCache(settings.TOKEN_CACHE_MAX_SIZE, settings.TOKEN_CACHE_TTL_SECONDS, user_epochs)
+token_versions = TokenVersions(settings.TOKEN_VERSION_CACHE_SIZE, settings.TOKEN_VERSION_TTL_SECONDS, user_epochs)
+
+def invalidate_user(user_id: int):
+    """
+    Drop what every worker process cached about a user; call after committing
+    an update or deletion of the user.
+    """
+    user_epochs.bump(user_id)
+    token_cache.invalidate_user(user_id)
+    token_versions.invalidate_user(user_id)
+
+registry.register(CallbackMetric(
+    "token_cache_lookups_total",
+    "Verified-token cache lookups by result.",
+    "counter",
+    lambda: {("hit",): token_cache.hits, ("miss",): token_cache.misses},
+    ("result",)
+))
@@ -0,0 +1,722 @@
+import secrets
+import sys
+import time
+from typing import AsyncIterable, AsyncIterator, Iterable, List, Optional, Sequence, Tuple
+from fastapi import HTTPException, status
+from pydantic import ValidationError
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.common import password_pool
+from app.common.config import settings
+from app.common.token_cache import TokenVersion, TokenVersions, invalidate_user
+from app.models import token_models, users_models
+from app.schemas import users_schemas
+
+# Async counterparts of app.crud.crud, used by the request path so that
+# database round-trips never block the event loop.
+
+# Maximum number of ids bound into a single `IN (...)` clause
+BATCH_MAX_IDS = 500
+
+def _columns(fields: Sequence[str]):
+    return [getattr(users_models.User, field) for field in fields]
+
+async def get_user(db: AsyncSession, user_id: int):
+    """
+    Return a user by their ID.
+
+    Args:
+        db (AsyncSession): Database session.
+        user_id (int): User ID.
+
+    Returns:
+        users_models.User: User model.
+    """
+    return await db.get(users_models.User, user_id)
+
+async def get_user_by_username(db: AsyncSession, username: str):
+    """
+    Retrieve a user by their username.
+
+    Args:
+        db (AsyncSession): Database session.
+        username (str): Username of the user to retrieve.
+
+    Returns:
+        users_models.User or None: User model if found, otherwise None.
+    """
+    result = await db.execute(select(users_models.User).where(users_models.User.username == username))
+    return result.scalars().first()
+
+async def get_user_by_email(db: AsyncSession, email: str):
+    """
+    Retrieve a user by their email.
+
+    Args:
+        db (AsyncSession): Database session.
+        email (str): Email of the user to retrieve.
+
+    Returns:
+        users_models.User or None: User model if found, otherwise None.
+    """
+    result = await db.execute(select(users_models.User).where(users_models.User.email == email))
+    return result.scalars().first()
+
+async def get_all_users(db: AsyncSession):
+    """
+    Retrieve all users from the database.
+
+    Args:
+        db (AsyncSession): Database session.
+
+    Returns:
+        List[users_models.User]: List of all users in the database.
+    """
+    result = await db.execute(select(users_models.User))
+    return result.scalars().all()
+
+async def get_users_page(db: AsyncSession, limit: int, after_id: Optional[int] = None):
+    """
+    Retrieve one page of users ordered by ID using keyset pagination.
+
+    Args:
+        db (AsyncSession): Database session.
+        limit (int): Maximum number of users to return.
+        after_id (int, optional): Only return users with an ID greater than this one.
+
+    Returns:
+        List[users_models.User]: Users of the requested page.
+    """
+    query = select(users_models.User)
+    if after_id is not None:
+        query = query.where(users_models.User.id > after_id)
+    result = await db.execute(query.order_by(users_models.User.id).limit(limit))
+    return result.scalars().all()
+
+async def get_user_row(db: AsyncSession, user_id: int, fields: Sequence[str]):
+    """
+    Return the given columns of a user, without building an ORM object.
+
+    Args:
+        db (AsyncSession): Database session.
+        user_id (int): User ID.
+        fields (Sequence[str]): Names of the `users_models.User` columns to select.
+
+    Returns:
+        Row or None: Column values in the order of `fields`, if the user exists.
+    """
+    result = await db.execute(select(*_columns(fields)).where(users_models.User.id == user_id))
+    return result.first()
+
+async def get_user_rows_by_ids(db: AsyncSession, user_ids: Sequence[int], fields: Sequence[str]):
+    """
+    Return the given columns of several users with a single `IN` query.
+
+    Args:
+        db (AsyncSession): Database session.
+        user_ids (Sequence[int]): IDs of the users, at most BATCH_MAX_IDS.
+        fields (Sequence[str]): Names of the `users_models.User` columns to select.
+
+    Returns:
+        List[Row]: Column values of each user found, in no particular order.
+    """
+    result = await db.execute(select(*_columns(fields)).where(users_models.User.id.in_(user_ids)))
+    return result.all()
+
+def _user_filters(filters: Optional[users_schemas.UserFilter]):
+    """
+    WHERE clauses of a users listing filter, each usable as an index range.
+    """
+    if filters is None:
+        return []
+    User = users_models.User
+    clauses = []
+    if filters.role is not None:
+        clauses.append(User.role == filters.role)
+    if filters.username_prefix:
+        prefix = filters.username_prefix
+        if ord(prefix[-1]) < sys.maxunicode:
+            # "abc" is the range ["abc", "abd"), which the username index can
+            # serve; LIKE is only indexed under case-insensitive collations
+            clauses.extend([User.username >= prefix, User.username < prefix[:-1] + chr(ord(prefix[-1]) + 1)])
+        else:
+            clauses.append(User.username.startswith(prefix, autoescape=True))
+    if filters.email_domain:
+        clauses.append(users_models.email_domain(User.email) == filters.email_domain.lower())
+    if filters.min_id is not None:
+        clauses.append(User.id >= filters.min_id)
+    if filters.max_id is not None:
+        clauses.append(User.id <= filters.max_id)
+    return clauses
+
+def users_page_query(fields: Sequence[str], limit: int, after_id: Optional[int] = None, filters: Optional[users_schemas.UserFilter] = None):
+    """
+    Build the SELECT of one filtered page of users ordered by ID.
+
+    Args:
+        fields (Sequence[str]): Names of the `users_models.User` columns to select.
+        limit (int): Maximum number of users to return.
+        after_id (int, optional): Only return users with an ID greater than this one.
+        filters (users_schemas.UserFilter, optional): Conditions the users must match.
+
+    Returns:
+        Select: The page query.
+    """
+    query = select(*_columns(fields)).where(*_user_filters(filters))
+    if after_id is not None:
+        query = query.where(users_models.User.id > after_id)
+    return query.order_by(users_models.User.id).limit(limit)
+
+async def get_user_rows_page(
+    db: AsyncSession,
+    fields: Sequence[str],
+    limit: int,
+    after_id: Optional[int] = None,
+    filters: Optional[users_schemas.UserFilter] = None
+):
+    """
+    Retrieve the given columns of one page of users ordered by ID, using keyset pagination.
+
+    Args:
+        db (AsyncSession): Database session.
+        fields (Sequence[str]): Names of the `users_models.User` columns to select.
+        limit (int): Maximum number of users to return.
+        after_id (int, optional): Only return users with an ID greater than this one.
+        filters (users_schemas.UserFilter, optional): Conditions the users must match.
+
+    Returns:
+        List[Row]: Column values of each user, in the order of `fields`.
+    """
+    result = await db.execute(users_page_query(fields, limit, after_id, filters))
+    return result.all()
+
+async def get_token_version(db: AsyncSession, user_id: int) -> TokenVersion:
+    """
+    Return the token version (the row version) and username of a user with a primary key lookup.
+
+    Args:
+        db (AsyncSession): Database session.
+        user_id (int): ID of the user.
+
+    Returns:
+        TokenVersion: The user's version and username, or `TokenVersions.MISSING` if the user does not exist.
+    """
+    row = (await db.execute(
+        select(users_models.User.version, users_models.User.username).where(users_models.User.id == user_id)
+    )).first()
+    return TokenVersions.MISSING if row is None else TokenVersion(*row)
+
+async def get_users_version(db: AsyncSession) -> int:
+    """
+    Return the change counter of the users table.
+
+    It is bumped by database triggers on every insert, update and delete of
+    users, so an unchanged value means every listing is unchanged too.
+
+    Args:
+        db (AsyncSession): Database session.
+
+    Returns:
+        int: The current version of the users collection.
+    """
+    return await db.scalar(
+        select(users_models.CollectionVersion.version).where(users_models.CollectionVersion.name == "users")
+    )
+
+def _returning_supported(db: AsyncSession, statement: str) -> bool:
+    """
+    Whether the database dialect supports `<statement> ... RETURNING`.
+    """
+    return getattr(db.get_bind().dialect, f"{statement}_returning", False)
+
+def _unique_violation(exc: IntegrityError) -> HTTPException:
+    """
+    Map a unique constraint violation on users to a 400 error.
+    """
+    message = str(exc.orig).lower()
+    if "username" in message:
+        detail = "Username already registered"
+    elif "email" in message:
+        detail = "Email already registered"
+    else:
+        detail = "Username or email already registered"
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+
+async def create_user(db: AsyncSession, user: users_schemas.UserCreate):
+    """
+    Create a new user in the database.
+
+    Uniqueness of the username and email is enforced by the unique indexes:
+    the insert is the only statement issued, and a violation becomes a 400.
+
+    Args:
+        db (AsyncSession): Database session.
+        user (users_schemas.UserCreate): User to be created.
+
+    Returns:
+        users_models.User: Created user model.
+
+    Raises:
+        HTTPException: If the username or email is already registered.
+    """
+    hashed_password = await password_pool.hash_password(user.password)
+    db_user = users_models.User(username=user.username, email=user.email, password=hashed_password, role=user.role)
+    db.add(db_user)
+    try:
+        await db.commit()
+    except IntegrityError as exc:
+        await db.rollback()
+        raise _unique_violation(exc)
+    return db_user
+
+async def update_user(db: AsyncSession, user_id: int, user: users_schemas.UserUpdate, current_user_role: users_schemas.UserRole):
+    """
+    Update a user's information in the database.
+
+    Only the provided fields are changed, with a single
+    `UPDATE ... RETURNING` statement where the dialect supports it.
+
+    Args:
+        db (AsyncSession): Database session.
+        user_id (int): ID of the user to update.
+        user (users_schemas.UserUpdate): New user data.
+        current_user_role (users_schemas.UserRole): Role of the current user performing the update.
+
+    Returns:
+        users_models.User: Updated user model.
+
+    Raises:
+        HTTPException: If the user is not found, if the current user lacks permissions
+            or if the new username or email is already registered.
+    """
+    if current_user_role != users_schemas.UserRole.admin:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions")
+
+    values = {
+        field: value
+        for field, value in (("username", user.username), ("email", user.email), ("role", user.role))
+        if value
+    }
+    if user.password:
+        values["password"] = await password_pool.hash_password(user.password)
+
+    if not values:
+        db_user = await get_user(db, user_id)
+    elif _returning_supported(db, "update"):
+        query = (
+            update(users_models.User)
+            .where(users_models.User.id == user_id)
+            .values(**values, version=users_models.User.version + 1)
+            .returning(users_models.User)
+            .execution_options(synchronize_session=False, populate_existing=True)
+        )
+        try:
+            db_user = (await db.scalars(query)).first()
+            await db.commit()
+        except IntegrityError as exc:
+            await db.rollback()
+            raise _unique_violation(exc)
+    else:
+        db_user = await get_user(db, user_id)
+        if db_user:
+            for field, value in values.items():
+                setattr(db_user, field, value)
+            db_user.version += 1
+            try:
+                await db.commit()
+            except IntegrityError as exc:
+                await db.rollback()
+                raise _unique_violation(exc)
+
+    if not db_user:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    invalidate_user(user_id)
+    return db_user
+
+async def update_password_hash(db: AsyncSession, user_id: int, old_hash: str, new_hash: str) -> bool:
+    """
+    Replace a stored password hash with a rehash of the same password.
+
+    The password itself is unchanged, so neither the user's version nor its
+    cached tokens are touched. The update only applies while the stored hash
+    is still `old_hash`, so a password changed in the meantime is kept.
+
+    Args:
+        db (AsyncSession): Database session.
+        user_id (int): ID of the user.
+        old_hash (str): The hash the new one was derived from.
+        new_hash (str): The hash following the current hashing policy.
+
+    Returns:
+        bool: True if the hash was replaced.
+    """
+    query = (
+        update(users_models.User)
+        .where(users_models.User.id == user_id, users_models.User.password == old_hash)
+        .values(password=new_hash)
+        .execution_options(synchronize_session=False)
+    )
+    result = await db.execute(query)
+    await db.commit()
+    return result.rowcount == 1
+
+async def delete_user(db: AsyncSession, user_id: int, current_user_role: users_schemas.UserRole):
+    """
+    Delete a user from the database with a single DELETE statement.
+
+    Args:
+        db (AsyncSession): Database session.
+        user_id (int): ID of the user to delete.
+        current_user_role (users_schemas.UserRole): Role of the current user performing the deletion.
+
+    Returns:
+        dict: A dictionary with a key "detail" containing the string "User deleted successfully".
+
+    Raises:
+        HTTPException: If the user is not found or if the current user lacks permissions.
+    """
+    if current_user_role != users_schemas.UserRole.admin:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions")
+
+    query = (
+        delete(users_models.User)
+        .where(users_models.User.id == user_id)
+        .execution_options(synchronize_session=False)
+    )
+    result = await db.execute(query)
+    if result.rowcount == 0:
+        await db.rollback()
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    await db.commit()
+    invalidate_user(user_id)
+    return {"detail": "User deleted successfully"}
+
+async def find_existing_users(db: AsyncSession, usernames: Iterable[str], emails: Iterable[str]):
+    """
+    Return which of the given usernames and emails are already taken.
+
+    Args:
+        db (AsyncSession): Database session.
+        usernames (Iterable[str]): Usernames to look up.
+        emails (Iterable[str]): Emails to look up.
+
+    Returns:
+        Tuple[Set[str], Set[str]]: The taken usernames and the taken emails.
+    """
+    usernames, emails = list(usernames), list(emails)
+    taken_usernames, taken_emails = set(), set()
+    if usernames:
+        result = await db.execute(select(users_models.User.username).where(users_models.User.username.in_(usernames)))
+        taken_usernames = set(result.scalars())
+    if emails:
+        result = await db.execute(select(users_models.User.email).where(users_models.User.email.in_(emails)))
+        taken_emails = set(result.scalars())
+    return taken_usernames, taken_emails
+
+async def bulk_insert_users(db: AsyncSession, rows: List[dict]):
+    """
+    Insert already-hashed users in one executemany statement and commit.
+
+    If the batch violates a unique constraint (e.g. a concurrent insert won
+    the race), the rows are retried one by one so that only the conflicting
+    ones fail.
+
+    Args:
+        db (AsyncSession): Database session.
+        rows (List[dict]): Column values (username, email, password, role) per user.
+
+    Returns:
+        List[Tuple[int, str]]: Index in `rows` and error message of every row that failed.
+    """
+    if not rows:
+        return []
+    try:
+        await db.execute(insert(users_models.User), rows)
+        await db.commit()
+        return []
+    except IntegrityError:
+        await db.rollback()
+
+    errors = []
+    for index, row in enumerate(rows):
+        try:
+            async with db.begin_nested():
+                await db.execute(insert(users_models.User), [row])
+        except IntegrityError:
+            errors.append((index, "Username or email already registered"))
+    await db.commit()
+    return errors
+
+async def import_users(db: AsyncSession, records: AsyncIterable[Tuple[int, object]], batch_size: int):
+    """
+    Validate, hash and insert a stream of user records in batches.
+
+    Every batch runs two `IN` lookups for uniqueness, hashes its passwords
+    across the worker pool's share for bulk jobs and is inserted in its own
+    transaction. Rows that fail are reported and skipped; they never abort
+    the import. That includes a batch that cannot be hashed because the pool
+    is saturated: its rows are reported, so that they can be sent again.
+
+    Args:
+        db (AsyncSession): Database session.
+        records (AsyncIterable[Tuple[int, object]]): (line number, raw record or parse error) pairs.
+        batch_size (int): Number of records per transaction.
+
+    Returns:
+        dict: The number of inserted users and the per-line errors.
+    """
+    inserted = 0
+    errors = []
+    batch = []
+
+    async def flush():
+        nonlocal inserted
+        usernames, emails, valid = set(), set(), []
+        for line, user in batch:
+            if user.username in usernames or user.email in emails:
+                errors.append({"line": line, "error": "Duplicate username or email in import"})
+                continue
+            usernames.add(user.username)
+            emails.add(user.email)
+            valid.append((line, user))
+
+        taken_usernames, taken_emails = await find_existing_users(db, usernames, emails)
+        new_users = []
+        for line, user in valid:
+            if user.username in taken_usernames:
+                errors.append({"line": line, "error": "Username already registered"})
+            elif user.email in taken_emails:
+                errors.append({"line": line, "error": "Email already registered"})
+            else:
+                new_users.append((line, user))
+
+        try:
+            hashed_passwords = await password_pool.hash_passwords([user.password for _, user in new_users])
+        except HTTPException as exc:
+            if exc.status_code != status.HTTP_503_SERVICE_UNAVAILABLE:
+                raise
+            errors.extend({"line": line, "error": "Server busy, not imported"} for line, _ in new_users)
+            batch.clear()
+            return
+        rows = [
+            {"username": user.username, "email": user.email, "password": hashed, "role": user.role}
+            for (_, user), hashed in zip(new_users, hashed_passwords)
+        ]
+        failed = await bulk_insert_users(db, rows)
+        for index, error in failed:
+            errors.append({"line": new_users[index][0], "error": error})
+        inserted += len(rows) - len(failed)
+        batch.clear()
+
+    async for line, record in records:
+        if isinstance(record, str):
+            errors.append({"line": line, "error": record})
+            continue
+        try:
+            batch.append((line, users_schemas.UserCreate.model_validate(record)))
+        except ValidationError as exc:
+            errors.append({"line": line, "error": "; ".join(
+                f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in exc.errors()
+            )})
+            continue
+        if len(batch) >= batch_size:
+            await flush()
+    if batch:
+        await flush()
+
+    errors.sort(key=lambda error: error["line"])
+    return {"inserted": inserted, "errors": errors}
+
+async def stream_user_rows(
+    db: AsyncSession,
+    fields: List[str],
+    chunk_size: int,
+    filters: Optional[users_schemas.UserFilter] = None
+) -> AsyncIterator[tuple]:
+    """
+    Stream the given user columns ordered by ID from a server-side cursor.
+
+    Only the requested columns are selected, so no ORM objects are built.
+
+    Args:
+        db (AsyncSession): Database session.
+        fields (List[str]): Names of the `users_models.User` columns to select.
+        chunk_size (int): Number of rows buffered per fetch.
+        filters (users_schemas.UserFilter, optional): Conditions the users must match.
+
+    Yields:
+        tuple: Column values of each user, in the order of `fields`.
+    """
+    query = (
+        select(*_columns(fields))
+        .where(*_user_filters(filters))
+        .order_by(users_models.User.id)
+        .execution_options(yield_per=chunk_size)
+    )
+    result = await db.stream(query)
+    async for row in result:
+        yield tuple(row)
+
+def _selection_filters(selection: users_schemas.UserSelection, ids: Optional[List[int]] = None):
+    filters = []
+    if ids is not None:
+        filters.append(users_models.User.id.in_(ids))
+    if selection.role is not None:
+        filters.append(users_models.User.role == selection.role)
+    return filters
+
+def _id_chunks(selection: users_schemas.UserSelection):
+    if selection.ids is None:
+        return [None]
+    ids = list(dict.fromkeys(selection.ids))
+    return [ids[i:i + BATCH_MAX_IDS] for i in range(0, len(ids), BATCH_MAX_IDS)]
+
+async def update_users_role(db: AsyncSession, selection: users_schemas.UserSelection, role: users_schemas.UserRole):
+    """
+    Set the role of every selected user with set-based UPDATE statements.
+
+    Long id lists are split into chunks of BATCH_MAX_IDS, all executed in a
+    single transaction.
+
+    Args:
+        db (AsyncSession): Database session.
+        selection (users_schemas.UserSelection): Which users to update.
+        role (users_schemas.UserRole): The new role.
+
+    Returns:
+        int: Number of updated users.
+    """
+    updated_ids = []
+    for ids in _id_chunks(selection):
+        filters = _selection_filters(selection, ids)
+        query = (
+            update(users_models.User)
+            .values(role=role, version=users_models.User.version + 1)
+            .execution_options(synchronize_session=False)
+        )
+        if _returning_supported(db, "update"):
+            result = await db.execute(query.where(*filters).returning(users_models.User.id))
+            updated_ids.extend(result.scalars())
+        else:
+            matched = list((await db.execute(select(users_models.User.id).where(*filters))).scalars())
+            if matched:
+                await db.execute(query.where(users_models.User.id.in_(matched)))
+            updated_ids.extend(matched)
+    await db.commit()
+    for user_id in updated_ids:
+        invalidate_user(user_id)
+    return len(updated_ids)
+
+async def delete_users(db: AsyncSession, selection: users_schemas.UserSelection):
+    """
+    Delete every selected user with set-based DELETE statements.
+
+    Long id lists are split into chunks of BATCH_MAX_IDS, all executed in a
+    single transaction.
+
+    Args:
+        db (AsyncSession): Database session.
+        selection (users_schemas.UserSelection): Which users to delete.
+
+    Returns:
+        int: Number of deleted users.
+    """
+    deleted_ids = []
+    for ids in _id_chunks(selection):
+        filters = _selection_filters(selection, ids)
+        query = delete(users_models.User).execution_options(synchronize_session=False)
+        if _returning_supported(db, "delete"):
+            result = await db.execute(query.where(*filters).returning(users_models.User.id))
+            deleted_ids.extend(result.scalars())
+        else:
+            matched = list((await db.execute(select(users_models.User.id).where(*filters))).scalars())
+            if matched:
+                await db.execute(query.where(users_models.User.id.in_(matched)))
+            deleted_ids.extend(matched)
+    await db.commit()
+    for user_id in deleted_ids:
+        invalidate_user(user_id)
+    return len(deleted_ids)
+
+def _new_refresh_token(user_id: int, family: Optional[str] = None) -> token_models.RefreshToken:
+    return token_models.RefreshToken(
+        jti=secrets.token_urlsafe(16),
+        family=family or secrets.token_urlsafe(16),
+        user_id=user_id,
+        expires_at=int(time.time()) + settings.REFRESH_TOKEN_EXPIRE_DAYS * 86400,
+        used=False
+    )
+
+async def create_refresh_token(db: AsyncSession, user_id: int):
+    """
+    Store the first refresh token of a new login session (token family).
+
+    The user's expired tokens are purged at the same time.
+
+    Args:
+        db (AsyncSession): Database session.
+        user_id (int): ID of the logged in user.
+
+    Returns:
+        token_models.RefreshToken: The stored token.
+    """
+    await db.execute(
+        delete(token_models.RefreshToken)
+        .where(token_models.RefreshToken.user_id == user_id, token_models.RefreshToken.expires_at <= int(time.time()))
+        .execution_options(synchronize_session=False)
+    )
+    refresh_token = _new_refresh_token(user_id)
+    db.add(refresh_token)
+    await db.commit()
+    return refresh_token
+
+async def rotate_refresh_token(db: AsyncSession, jti: str, user_id: int, family: str):
+    """
+    Consume a refresh token and store its successor in the same family.
+
+    The token is consumed by a conditional UPDATE, so of two concurrent
+    refreshes with the same token only one succeeds. A token that was already
+    used is being replayed: the whole family is revoked, which also logs out
+    whoever holds its latest token.
+
+    Args:
+        db (AsyncSession): Database session.
+        jti (str): ID of the presented token, from its verified claims.
+        user_id (int): ID of the token's user, from its verified claims.
+        family (str): Family of the token, from its verified claims.
+
+    Returns:
+        Tuple[users_models.User, token_models.RefreshToken]: The token's user
+        and the new refresh token.
+
+    Raises:
+        HTTPException: If the token is unknown, revoked or reused, or its user no longer exists (401).
+    """
+    RefreshToken = token_models.RefreshToken
+    result = await db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.jti == jti, RefreshToken.user_id == user_id, RefreshToken.used.is_(False))
+        .values(used=True)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 1:
+        db_user = await get_user(db, user_id)
+        if db_user is not None:
+            refresh_token = _new_refresh_token(user_id, family)
+            db.add(refresh_token)
+            await db.commit()
+            return db_user, refresh_token
+    elif await db.scalar(select(RefreshToken.used).where(RefreshToken.jti == jti)):
+        await db.execute(
+            delete(RefreshToken).where(RefreshToken.family == family).execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Refresh token reuse detected, session revoked"
+        )
+
+    await db.rollback()
+    raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token")
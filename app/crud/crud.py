@@ -1,11 +1,11 @@
 from sqlalchemy.orm import Session
-from passlib.context import CryptContext
+from typing import Optional
 from app.schemas import users_schemas
 from fastapi import HTTPException, status
 
 from app.models import users_models
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from app.common.hashing import pwd_context
+from app.common.token_cache import invalidate_user
 
 def get_user(db: Session, user_id: int):
     """
@@ -58,6 +58,36 @@ def get_all_users(db: Session):
     """
     return db.query(users_models.User).all()
 
+def get_users_page(db: Session, limit: int, after_id: Optional[int] = None):
+    """
+    Retrieve one page of users ordered by ID using keyset pagination.
+
+    Args:
+        db (Session): Database session.
+        limit (int): Maximum number of users to return.
+        after_id (int, optional): Only return users with an ID greater than this one.
+
+    Returns:
+        List[users_models.User]: Users of the requested page.
+    """
+    query = db.query(users_models.User)
+    if after_id is not None:
+        query = query.filter(users_models.User.id > after_id)
+    return query.order_by(users_models.User.id).limit(limit).all()
+
+def iter_users(db: Session, chunk_size: int):
+    """
+    Iterate over all users ordered by ID, fetching `chunk_size` rows at a time.
+
+    Args:
+        db (Session): Database session.
+        chunk_size (int): Number of rows buffered per fetch.
+
+    Returns:
+        Iterator[users_models.User]: Lazily loaded users.
+    """
+    return db.query(users_models.User).order_by(users_models.User.id).yield_per(chunk_size)
+
 def create_user(db: Session, user: users_schemas.UserCreate):
     """
     Create a new user in the database.
@@ -104,8 +134,10 @@ def update_user(db: Session, user_id: int, user: users_schemas.UserCreate, curre
     if user.password:
         db_user.password = pwd_context.hash(user.password)
     db_user.role = user.role or db_user.role
+    db_user.version += 1
 
     db.commit()
+    invalidate_user(user_id)
     db.refresh(db_user)
     return db_user
 
@@ -133,4 +165,5 @@ def delete_user(db: Session, user_id: int, current_user_role: users_schemas.User
 
     db.delete(db_user)
     db.commit()
+    invalidate_user(user_id)
     return {"detail": "User deleted successfully"}
@@ -1,10 +1,14 @@
+import hmac
 from fastapi import Depends, HTTPException, status, Request
 from app import auth
+from app.common.config import settings
 from app.common.database import get_db
 from jose import JWTError
-from sqlalchemy.orm import Session
-from app.crud import crud
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.crud import async_crud
 from app.models import users_models
+from app.schemas.token import TokenData
+from app.common.token_cache import Principal, token_cache, token_versions, user_epochs
 
 async def get_token(request: Request) -> str:
     """
@@ -29,23 +33,44 @@ async def get_token(request: Request) -> str:
 
 async def get_current_user(
     token: str = Depends(get_token),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Return the current user based on the provided token.
 
+    Verified tokens are cached together with a snapshot of the user they
+    resolve to, so repeated requests with the same token skip both the
+    signature check and the database lookup. Updating or deleting the user
+    invalidates the snapshot in every worker process of `app.server` (see
+    `UserEpochs`).
+
+    With AUTH_STATELESS, a token carrying `uid` and `tv` claims is not
+    resolved through the database either: the user is taken from its signed
+    `uid`/`sub`/`role` claims once `tv` matches the user's current version in
+    `token_versions`, which only queries the database for users it does not
+    know yet. Any update or deletion of the user changes that version, which
+    revokes the tokens issued before it in every worker process; the version
+    is checked on cache hits too. Changes made outside the app are noticed
+    within TOKEN_VERSION_TTL_SECONDS.
+
     Args:
         token (str): The access token to verify
-        db (Session): The database session
+        db (AsyncSession): The database session
 
     Returns:
-        users_models.User: The current user
+        Principal: Snapshot (id, username, role) of the current user
 
     Raises:
         HTTPException: If no token is provided
         HTTPException: If the token is invalid
         HTTPException: If the user is not found
     """
+    cached = token_cache.get(token)
+    if cached is not None:
+        if _is_stateless(cached.claims):
+            await _check_token_version(cached.claims, db)
+        return cached.principal
+
     try:
         token_data = auth.decode_access_token(token)
         if token_data.username is None:
@@ -53,29 +78,63 @@ async def get_current_user(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid credentials"
             )
-    except JWTError:
+    except (JWTError, ValueError):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials"
         )
-    
-    user = crud.get_user_by_username(db, username=token_data.username)
-    if user is None:
+
+    # Read before the user is, so that a concurrent change keeps it out of the cache
+    generation = user_epochs.generation()
+    if _is_stateless(token_data):
+        principal = _principal_from_claims(token_data)
+        await _check_token_version(token_data, db)
+    else:
+        user = await async_crud.get_user_by_username(db, username=token_data.username)
+        if user is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid credentials"
+            )
+        principal = Principal(id=user.id, username=user.username, role=user.role)
+    token_cache.put(token, token_data, principal, generation)
+    return principal
+
+def _is_stateless(token_data: TokenData) -> bool:
+    return settings.AUTH_STATELESS and token_data.user_id is not None and token_data.token_version is not None
+
+def _principal_from_claims(token_data: TokenData) -> Principal:
+    try:
+        role = users_models.UserRole(token_data.role)
+    except ValueError:
+        # Signed, but without a role this version of the app knows
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials"
         )
-    return user
+    return Principal(id=token_data.user_id, username=token_data.username, role=role)
 
-async def get_current_admin_user(current_user: users_models.User = Depends(get_current_user)):
+async def _check_token_version(token_data: TokenData, db: AsyncSession):
+    current = token_versions.get(token_data.user_id)
+    if current is None:
+        generation = user_epochs.generation()
+        current = await async_crud.get_token_version(db, token_data.user_id)
+        token_versions.put(token_data.user_id, current, generation)
+    if current.version != token_data.token_version or current.username != token_data.username:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid credentials"
+        )
+
+async def get_current_admin_user(current_user: Principal = Depends(get_current_user)):
     """
     Return the current user if it is an admin, otherwise raise a 403 exception.
 
     Args:
-        current_user (users_models.User): The current user
+        current_user (Principal): The current user
 
     Returns:
-        users_models.User: The current user
+        Principal: The current user
 
     Raises:
         HTTPException: If the user is not an admin
@@ -86,3 +145,25 @@ async def get_current_admin_user(current_user: users_models.User = Depends(get_c
             detail="Admin access required"
         )
     return current_user
+
+async def verify_metrics_access(request: Request, db: AsyncSession = Depends(get_db)):
+    """
+    Allow a request carrying METRICS_TOKEN as a bearer token, or an admin's access token.
+
+    Scrapers cannot renew short-lived access tokens, so they are given a
+    static token instead; anyone else needs to be an admin.
+
+    Args:
+        request (Request): The incoming request
+        db (AsyncSession): The database session
+
+    Raises:
+        HTTPException: If no token is provided or the token is invalid
+        HTTPException: If the user is not an admin
+    """
+    authorization = request.headers.get("Authorization", "")
+    expected = f"Bearer {settings.METRICS_TOKEN}"
+    if settings.METRICS_TOKEN and hmac.compare_digest(authorization.encode(), expected.encode()):
+        return
+    token = await get_token(request)
+    await get_current_admin_user(await get_current_user(token, db))
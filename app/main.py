@@ -1,21 +1,74 @@
+import time
+
+# Taken before the app's own imports, so the startup metric includes them
+IMPORT_STARTED = time.perf_counter()
+
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from app.common import database, init_db
-from app.models import users_models
+from app.common import hashing, init_db, limiter, metrics, password_pool
+from app.common.config import settings
+from app.common.database import async_engine, warm_pool
+from app.common.logging_config import logger
+from app.common.metrics import MetricsMiddleware, app_startup_duration_seconds
 from app.routes.users_routes import router as api_router
+from app.routes.metrics_routes import router as metrics_router
 from fastapi.security import OAuth2PasswordBearer
 
-app = FastAPI()
-
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
-users_models.Base.metadata.create_all(bind=database.engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Startup and shutdown pipeline of the application.
 
-app.include_router(api_router)
+    On startup, calibrates the password hashing cost when
+    PASSWORD_HASH_TARGET_MS is set, brings the schema up to date (a single
+    query when it already is), creates the admin user with a new schema, opens
+    the database pool's connections before the first request and starts the
+    periodic eviction of idle clients from the rate limiter and, with
+    METRICS_MULTIPROC_DIR, the periodic metrics snapshots. The time spent
+    importing the app and running these steps is exported as
+    `app_startup_duration_seconds`.
 
-@app.on_event("startup")
-def on_startup():
+    On shutdown, stops the rate limiter sweeper and backend and the password
+    hashing worker processes, writes a last metrics snapshot and closes the
+    database connections.
     """
-    FastAPI event hook for application startup.
+    started = time.perf_counter()
+    app_startup_duration_seconds.set(started - IMPORT_STARTED, "import")
 
-    Initializes the database by creating all tables and an admin user if one does not exist.
-    """
-    init_db.initialize_database()
\ No newline at end of file
+    if hashing.apply_calibration():
+        # Restart the hashing workers with the calibrated policy
+        password_pool.shutdown()
+    await init_db.initialize_database()
+    await warm_pool()
+    app.state.limiter_sweeper = asyncio.create_task(
+        limiter.sweep_idle_clients(settings.RATE_LIMIT_SWEEP_INTERVAL)
+    )
+    app.state.metrics_writer = None
+    if settings.METRICS_MULTIPROC_DIR:
+        app.state.metrics_writer = asyncio.create_task(
+            metrics.write_snapshots(settings.METRICS_MULTIPROC_DIR, settings.METRICS_SNAPSHOT_INTERVAL)
+        )
+
+    app_startup_duration_seconds.set(time.perf_counter() - started, "startup")
+    logger.info(
+        "Startup completed in %.3f s (import %.3f s)",
+        time.perf_counter() - IMPORT_STARTED, started - IMPORT_STARTED
+    )
+    yield
+
+    app.state.limiter_sweeper.cancel()
+    await limiter.backend.close()
+    password_pool.shutdown()
+    if app.state.metrics_writer is not None:
+        app.state.metrics_writer.cancel()
+        metrics.write_snapshot(settings.METRICS_MULTIPROC_DIR)
+    await async_engine.dispose()
+
+app = FastAPI(lifespan=lifespan)
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+
+app.include_router(api_router)
+app.include_router(metrics_router)
+app.add_middleware(MetricsMiddleware)
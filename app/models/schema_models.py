@@ -0,0 +1,8 @@
+from sqlalchemy import Column, Integer, String
+from app.common.database import Base
+
+class SchemaVersion(Base):
+    __tablename__ = "schema_version"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(String, nullable=False)
@@ -0,0 +1,27 @@
+from sqlalchemy import DDL, Boolean, Column, ForeignKey, Integer, String, event, false
+from app.common.database import Base
+
+class RefreshToken(Base):
+    """
+    Issued refresh tokens, one row per token.
+
+    Every refresh marks the presented token as used and issues its successor
+    in the same family. A used token presented again means it was copied, so
+    the whole family is revoked.
+    """
+    __tablename__ = "refresh_tokens"
+
+    jti = Column(String, primary_key=True)
+    family = Column(String, nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    # Unix time, the same as the token's `exp` claim
+    expires_at = Column(Integer, nullable=False)
+    used = Column(Boolean, nullable=False, default=False, server_default=false())
+
+# Deleting users revokes their refresh tokens. SQLite does not enforce the
+# foreign key's ON DELETE CASCADE unless enabled per connection, so it gets a
+# trigger instead, created like the users version triggers.
+event.listen(Base.metadata, "after_create", DDL(
+    "CREATE TRIGGER IF NOT EXISTS users_delete_refresh_tokens AFTER DELETE ON users "
+    "BEGIN DELETE FROM refresh_tokens WHERE user_id = old.id; END"
+).execute_if(dialect="sqlite"))
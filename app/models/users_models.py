@@ -1,4 +1,6 @@
-from sqlalchemy import Column, Integer, String, Enum
+from sqlalchemy import DDL, Column, Index, Integer, String, Enum, event
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
 from app.common.database import Base
 import enum
 
@@ -14,3 +16,68 @@ class User(Base):
     email = Column(String, unique=True, index=True)
     password = Column(String)
     role = Column(Enum(UserRole))
+    # Incremented by every UPDATE of the row; used in the user's ETag
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+
+class email_domain(FunctionElement):
+    """
+    Lower-cased part of an email address after the "@".
+
+    Filters must use this same expression for the database to match them
+    with the `ix_users_email_domain_id` expression index.
+    """
+    type = String()
+    name = "email_domain"
+    inherit_cache = True
+
+@compiles(email_domain)
+def _email_domain(element, compiler, **kw):
+    email = compiler.process(element.clauses, **kw)
+    return f"lower(substr({email}, instr({email}, '@') + 1))"
+
+@compiles(email_domain, "postgresql")
+def _email_domain_postgresql(element, compiler, **kw):
+    return f"lower(split_part({compiler.process(element.clauses, **kw)}, '@', 2))"
+
+# Filtered listings are paginated by id, so every filter index ends with id:
+# the filter and the keyset condition are then a single index range
+Index("ix_users_role_id", User.role, User.id)
+Index("ix_users_email_domain_id", email_domain(User.email), User.id)
+
+class CollectionVersion(Base):
+    """
+    Change counter of a whole table, used in the ETag of listings.
+
+    The `users` row is bumped by database triggers on every insert, update and
+    delete of users, so that it also covers bulk and set-based statements
+    without costing an extra round-trip.
+    """
+    __tablename__ = "collection_versions"
+
+    name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=1)
+
+event.listen(
+    CollectionVersion.__table__, "after_create",
+    DDL("INSERT INTO collection_versions (name, version) VALUES ('users', 1)")
+)
+
+BUMP_USERS_VERSION = "UPDATE collection_versions SET version = version + 1 WHERE name = 'users'"
+
+# The triggers are (re)created after every create_all rather than with the
+# users table, so that they are also added to databases created before them.
+# SQLite only has row-level triggers.
+for operation in ("INSERT", "UPDATE", "DELETE"):
+    event.listen(Base.metadata, "after_create", DDL(
+        f"CREATE TRIGGER IF NOT EXISTS users_{operation.lower()}_version AFTER {operation} ON users "
+        f"BEGIN {BUMP_USERS_VERSION}; END"
+    ).execute_if(dialect="sqlite"))
+
+event.listen(Base.metadata, "after_create", DDL(
+    "CREATE OR REPLACE FUNCTION bump_users_version() RETURNS trigger AS $$ "
+    f"BEGIN {BUMP_USERS_VERSION}; RETURN NULL; END; $$ LANGUAGE plpgsql"
+).execute_if(dialect="postgresql"))
+event.listen(Base.metadata, "after_create", DDL(
+    "CREATE OR REPLACE TRIGGER users_version AFTER INSERT OR UPDATE OR DELETE ON users "
+    "FOR EACH STATEMENT EXECUTE FUNCTION bump_users_version()"
+).execute_if(dialect="postgresql"))
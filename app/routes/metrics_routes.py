@@ -0,0 +1,28 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+from app.common import metrics
+from app.common.config import settings
+from app.common.metrics import registry
+from app.dependencies import verify_metrics_access
+
+router = APIRouter()
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False, dependencies=[Depends(verify_metrics_access)])
+async def read_metrics():
+    """
+    Exposes request, database, password hashing and JWT metrics in the
+    Prometheus text format.
+
+    With METRICS_MULTIPROC_DIR set (always under `app.server`), the metrics
+    of every worker process are merged, whichever worker answers: this
+    worker's own values are current, the others' are at most
+    METRICS_SNAPSHOT_INTERVAL seconds old.
+
+    Returns:
+        PlainTextResponse: The current value of every metric.
+    """
+    directory = settings.METRICS_MULTIPROC_DIR
+    if not directory:
+        return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+    metrics.write_snapshot(directory)
+    return PlainTextResponse(registry.render(metrics.read_snapshots(directory)), media_type="text/plain; version=0.0.4")
@@ -1,24 +1,101 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, Header, HTTPException, status, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import AsyncIterable, AsyncIterator, List, Optional, Sequence, Tuple
+from urllib.parse import urlencode
 from app import auth
+from app.common.config import settings
+from app.common import etags, exporters, importers, password_pool, serializers
 from app.common.database import get_db
 from app.common.limiter import rate_limiter
-from app.crud import crud
+from app.crud import async_crud
 from app.dependencies import get_current_user, get_current_admin_user
-from app.models import users_models
 from app.schemas import users_schemas
-from app.schemas.users_schemas import UserRole
-from app.schemas.token import Token
+from app.schemas.users_schemas import ExportFormat, UserRole
+from app.schemas.token import Token, TokenRefresh
 from app.common.logging_config import logger
+from app.common.pagination import decode_cursor, encode_cursor
+from app.common.token_cache import Principal
 
 router = APIRouter()
 
+def user_fields(
+    fields: Optional[str] = Query(None, description="Comma-separated subset of username,email,id,role to return (default: all)")
+) -> Tuple[str, ...]:
+    """
+    Parse the sparse fieldset of a user read.
+
+    Only the requested columns are selected and serialized; the password hash
+    is never loaded.
+
+    Args:
+        fields (str, optional): The requested fields, e.g. `id,username`.
+
+    Returns:
+        Tuple[str, ...]: The requested fields, in the order of `serializers.USER_FIELDS`.
+
+    Raises:
+        HTTPException: If a requested field does not exist.
+    """
+    try:
+        return serializers.parse_fields(fields)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+
+def with_columns(fields: Sequence[str], *columns: str) -> Tuple[str, ...]:
+    """
+    Append the columns needed internally (e.g. the id of a cursor) that `fields` lacks.
+    """
+    return tuple(fields) + tuple(column for column in columns if column not in fields)
+
+def issue_tokens(db_user, refresh_token) -> dict:
+    """
+    Build the token response for a user and their stored refresh token.
+
+    The access token carries the user's ID and token version, for stateless
+    authorization.
+    """
+    return {
+        "access_token": auth.create_access_token(data={
+            "sub": db_user.username, "role": db_user.role, "uid": db_user.id, "tv": db_user.version
+        }),
+        "token_type": "bearer",
+        "refresh_token": auth.create_refresh_token(
+            db_user.username, db_user.id, refresh_token.jti, refresh_token.family, refresh_token.expires_at
+        )
+    }
+
+async def stream_users_json(rows: AsyncIterable[tuple], chunk_size: int, fields: Sequence[str] = serializers.USER_FIELDS) -> AsyncIterator[bytes]:
+    """
+    Serialize user rows into a JSON array, emitting one chunk per `chunk_size` users.
+
+    Args:
+        rows (AsyncIterable[tuple]): Columns of `fields` per user, typically a `yield_per` query.
+        chunk_size (int): Number of users serialized per emitted chunk.
+        fields (Sequence[str]): Names of the columns of each row.
+
+    Yields:
+        bytes: Consecutive chunks of the JSON array.
+    """
+    yield b"["
+    chunk = []
+    first = True
+    async for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            # Strip the brackets of the serialized chunk, the array spans all chunks
+            yield (b"" if first else b",") + serializers.users_json(chunk, fields)[1:-1]
+            chunk = []
+            first = False
+    if chunk:
+        yield (b"" if first else b",") + serializers.users_json(chunk, fields)[1:-1]
+    yield b"]"
+
 @router.post("/register", response_model=users_schemas.UserResponse)
-def register_user(
+async def register_user(
     user: users_schemas.UserCreate,
-    db: Session = Depends(get_db),
-    admin_user: users_models.User = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_db),
+    admin_user: Principal = Depends(get_current_admin_user),
     token: str = Query(..., description="JWT token for authorization")
 ):
     """
@@ -26,100 +103,396 @@ def register_user(
 
     Args:
         user (users_schemas.UserCreate): The new user to be created.
-        db (Session): The database session.
-        admin_user (users_models.User): The admin user performing the registration.
+        db (AsyncSession): The database session.
+        admin_user (Principal): The admin user performing the registration.
         token (str): The JWT token for authorization.
 
     Raises:
         HTTPException: If the username or email is already registered.
     """
-    logger.info(f"Admin {admin_user.username} attempting to register a new user: {user.username}")
-    db_user = crud.get_user_by_username(db, user.username)
-    db_email = crud.get_user_by_email(db, user.email)
-
-    if db_user:
-        logger.warning(f"Registration failed: Username '{user.username}' is already registered")
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Username already registered"
-        )
-    if db_email:
-        logger.warning(f"Registration failed: Email '{user.email}' is already registered")
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already registered"
-        )
+    logger.info("Admin %s attempting to register a new user: %s", admin_user.username, user.username)
+    try:
+        db_user = await async_crud.create_user(db=db, user=user)
+    except HTTPException as exc:
+        logger.warning("Registration failed for '%s': %s", user.username, exc.detail)
+        raise
 
-    logger.info(f"User {user.username} successfully registered by admin {admin_user.username}")
-    return crud.create_user(db=db, user=user)
+    logger.info("User %s successfully registered by admin %s", user.username, admin_user.username)
+    return db_user
 
 @router.post("/login", response_model=Token)
-def login(
+async def login(
     user: users_schemas.UserLogin,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     request: Request = None
 ):
     """
     Authenticates a user using a username and password.
 
+    A password hashed with another scheme or cost than the current hashing
+    policy is rehashed and stored, so policy changes roll out as users log in.
+
     Args:
         user (users_schemas.UserLogin): The user credentials.
-        db (Session): The database session.
+        db (AsyncSession): The database session.
         request (Request): The current request.
 
     Raises:
         HTTPException: If the credentials are invalid.
 
     Returns:
-        Token: The access token for the user.
+        Token: An access token, and a refresh token to renew it through
+        `/token/refresh` without logging in again.
     """
-    rate_limiter(request)
-    logger.info(f"Login attempt for user: {user.username}")
-    db_user = crud.get_user_by_username(db, user.username)
-    if not db_user or not auth.verify_password(user.password, db_user.password):
-        logger.warning(f"Login failed for user: {user.username}")
+    await rate_limiter(request)
+    logger.info("Login attempt for user: %s", user.username)
+    db_user = await async_crud.get_user_by_username(db, user.username)
+    valid, new_hash = (False, None)
+    if db_user:
+        valid, new_hash = await password_pool.verify_and_update(user.password, db_user.password)
+    if not valid:
+        logger.warning("Login failed for user: %s", user.username)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials",
             headers={"WWW-Authenticate": "Bearer"}
         )
+    if new_hash:
+        # The stored hash predates the current hashing policy
+        await async_crud.update_password_hash(db, db_user.id, db_user.password, new_hash)
 
-    token = auth.create_access_token(data={"sub": db_user.username, "role": db_user.role})
-    logger.info(f"User {user.username} logged in successfully")
-    return {"access_token": token, "token_type": "bearer"}
+    refresh_token = await async_crud.create_refresh_token(db, db_user.id)
+    logger.info("User %s logged in successfully", user.username)
+    return issue_tokens(db_user, refresh_token)
+
+@router.post("/token/refresh", response_model=Token)
+async def refresh_access_token(body: TokenRefresh, db: AsyncSession = Depends(get_db)):
+    """
+    Exchanges a refresh token for a new access token and a new refresh token.
+
+    Costs a signature check and a few primary-key statements, with no password
+    check, so it is not rate limited like `/login`. Each refresh token can be
+    used once: presenting one again revokes every token of its login session.
+
+    Args:
+        body (TokenRefresh): The refresh token.
+        db (AsyncSession): The database session.
+
+    Raises:
+        HTTPException: If the refresh token is invalid, expired, revoked or reused.
+
+    Returns:
+        Token: The new access and refresh tokens.
+    """
+    try:
+        claims = auth.decode_refresh_token(body.refresh_token)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    db_user, refresh_token = await async_crud.rotate_refresh_token(db, claims.jti, claims.user_id, claims.family)
+    return issue_tokens(db_user, refresh_token)
+
+@router.post("/users/import", response_model=users_schemas.UserImportResult)
+async def import_users(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    admin_user: Principal = Depends(get_current_admin_user),
+    token: str = Query(..., description="JWT token for authorization")
+):
+    """
+    Creates users in bulk from a streamed NDJSON or CSV body.
+
+    The format is taken from the Content-Type header (`application/x-ndjson`
+    or `text/csv`; CSV needs a `username,email,password,role` header row).
+    Records are processed `USERS_IMPORT_BATCH_SIZE` at a time; invalid or
+    conflicting rows are reported by line number and skipped without
+    aborting the rest of the import.
+
+    Args:
+        request (Request): The incoming request, whose body is streamed.
+        db (AsyncSession): The database session.
+        admin_user (Principal): The admin user performing the import.
+        token (str): The JWT token for authorization.
+
+    Returns:
+        users_schemas.UserImportResult: The number of inserted users and the per-line errors.
+
+    Raises:
+        HTTPException: If the content type is not supported.
+    """
+    media_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if media_type in importers.NDJSON_MEDIA_TYPES:
+        records = importers.parse_ndjson(importers.iter_lines(request.stream()))
+    elif media_type in importers.CSV_MEDIA_TYPES:
+        records = importers.parse_csv(importers.iter_lines(request.stream()))
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Expected an application/x-ndjson or text/csv body"
+        )
+
+    logger.info("Admin %s attempting to import users", admin_user.username)
+    result = await async_crud.import_users(db, records, settings.USERS_IMPORT_BATCH_SIZE)
+    logger.info("Admin %s imported %d users with %d errors", admin_user.username, result["inserted"], len(result["errors"]))
+    return result
 
 @router.get("/users", response_model=List[users_schemas.UserResponse], dependencies=[Depends(get_current_admin_user)])
-def read_users(
-    db: Session = Depends(get_db),
+async def read_users(
+    db: AsyncSession = Depends(get_db),
+    token: str = Query(..., description="JWT token for authorization"),
+    limit: int = Query(settings.USERS_PAGE_DEFAULT_LIMIT, ge=1, le=settings.USERS_PAGE_MAX_LIMIT, description="Maximum number of users per page"),
+    after: Optional[str] = Query(None, description="Cursor returned in the X-Next-Cursor header of the previous page"),
+    stream: bool = Query(False, description="Stream every user as a chunked JSON array instead of paginating"),
+    role: Optional[UserRole] = Query(None, description="Only users with this role"),
+    username_prefix: Optional[str] = Query(None, min_length=1, description="Only usernames starting with this prefix (case-sensitive)"),
+    email_domain: Optional[str] = Query(None, min_length=1, description="Only emails in this domain, e.g. example.com"),
+    min_id: Optional[int] = Query(None, description="Only users with an ID greater than or equal to this one"),
+    max_id: Optional[int] = Query(None, description="Only users with an ID less than or equal to this one"),
+    fields: Tuple[str, ...] = Depends(user_fields),
+    if_none_match: Optional[str] = Header(None)
+):
+    """
+    Retrieves users from the database, one keyset-paginated page at a time,
+    optionally filtered by role, username prefix, email domain and ID range.
+    Each filter is served by an index that ends with the ID, so filtering and
+    paginating stay an index range scan.
+
+    The cursor of the next page is returned in the `X-Next-Cursor` header
+    (and as a `Link: rel="next"` header) when more users may follow. With
+    `stream=true` the whole table is streamed instead, `USERS_STREAM_CHUNK_SIZE`
+    rows at a time, so memory stays flat regardless of the table size.
+
+    Only the response columns (or the `fields` subset) are selected, and the
+    rows are serialized by the precompiled serializers in
+    `app.common.serializers` rather than validated against the response model.
+
+    Pages carry a weak ETag built from the users collection version and the
+    page, filters and fields requested. The version is read first, so a
+    matching `If-None-Match` gets a 304 without loading any rows.
+
+    Args:
+        db (AsyncSession): The database session.
+        token (str): The JWT token for authorization.
+        limit (int): Maximum number of users to return.
+        after (str, optional): Opaque cursor of the page to continue from.
+        stream (bool): Whether to stream all users instead of returning a page.
+        role (UserRole, optional): Only users with this role.
+        username_prefix (str, optional): Only usernames starting with this prefix.
+        email_domain (str, optional): Only emails in this domain, compared case-insensitively.
+        min_id (int, optional): Lowest user ID to return.
+        max_id (int, optional): Highest user ID to return.
+        fields (Tuple[str, ...]): The fields to return.
+        if_none_match (str, optional): ETags of the client's cached copies.
+
+    Returns:
+        List[users_schemas.UserResponse]: A page of users ordered by ID.
+
+    Raises:
+        HTTPException: If the cursor is invalid.
+    """
+    filters = users_schemas.UserFilter(
+        role=role, username_prefix=username_prefix, email_domain=email_domain, min_id=min_id, max_id=max_id
+    )
+    if stream:
+        return StreamingResponse(
+            stream_users_json(
+                async_crud.stream_user_rows(db, fields, settings.USERS_STREAM_CHUNK_SIZE, filters),
+                settings.USERS_STREAM_CHUNK_SIZE,
+                fields
+            ),
+            media_type="application/json"
+        )
+
+    after_id = None
+    if after is not None:
+        try:
+            after_id = decode_cursor(after)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+
+    etag = etags.make_etag("users", await async_crud.get_users_version(db), etags.variant(
+        limit=limit, after=after_id, fields=",".join(fields), **filters.model_dump(mode="json", exclude_none=True)
+    ))
+    if etags.etag_matches(if_none_match, etag):
+        return etags.not_modified(etag)
+
+    # The id is always selected, it is the cursor of the next page
+    rows = await async_crud.get_user_rows_page(db, with_columns(fields, "id"), limit=limit, after_id=after_id, filters=filters)
+    headers = {"ETag": etag}
+    if len(rows) == limit:
+        next_cursor = encode_cursor(rows[-1].id)
+        query = urlencode({**filters.model_dump(mode="json", exclude_none=True), "limit": limit, "after": next_cursor})
+        headers["X-Next-Cursor"] = next_cursor
+        headers["Link"] = f'</users?{query}>; rel="next"'
+    return serializers.json_response(serializers.users_json(rows, fields), headers)
+
+@router.get("/users/export", dependencies=[Depends(get_current_admin_user)])
+async def export_users(
+    db: AsyncSession = Depends(get_db),
+    token: str = Query(..., description="JWT token for authorization"),
+    format: ExportFormat = Query(ExportFormat.ndjson, description="Output format"),
+    gzip: bool = Query(False, description="Compress the export with gzip")
+):
+    """
+    Streams every user as NDJSON or CSV, optionally gzip-compressed.
+
+    Rows come straight from a server-side cursor and are serialized
+    `USERS_STREAM_CHUNK_SIZE` at a time, so memory use and time to first byte
+    do not depend on the number of users. The exported fields are those of
+    `users_schemas.UserResponse`.
+
+    Args:
+        db (AsyncSession): The database session.
+        token (str): The JWT token for authorization.
+        format (ExportFormat): `ndjson` or `csv`.
+        gzip (bool): Whether to compress the export.
+
+    Returns:
+        StreamingResponse: The export, as an attachment.
+    """
+    fields = list(users_schemas.UserResponse.model_fields)
+    chunk_size = settings.USERS_STREAM_CHUNK_SIZE
+    rows = async_crud.stream_user_rows(db, fields, chunk_size)
+    if format == ExportFormat.csv:
+        body, media_type = exporters.to_csv(rows, fields, chunk_size), exporters.CSV_MEDIA_TYPE
+    else:
+        body, media_type = exporters.to_ndjson(rows, fields, chunk_size), exporters.NDJSON_MEDIA_TYPE
+
+    filename = f"users.{format.value}"
+    if gzip:
+        body, media_type, filename = exporters.gzip_stream(body), "application/gzip", f"{filename}.gz"
+
+    logger.info("Exporting users as %s", filename)
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@router.post("/users/lookup", response_model=users_schemas.UserLookupResult)
+async def lookup_users(
+    lookup: users_schemas.UserLookup,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+    token: str = Query(..., description="JWT token for authorization"),
+    fields: Tuple[str, ...] = Depends(user_fields)
+):
+    """
+    Retrieves many users by ID with a single query.
+
+    The rule of `read_user` applies to every user: admins can read anyone,
+    other users only themselves. Users are returned in the order of the
+    requested IDs; IDs that do not exist are listed in `missing` and users
+    the caller may not read in `forbidden`.
+
+    Args:
+        lookup (users_schemas.UserLookup): The IDs to retrieve, at most `USER_LOOKUP_MAX_IDS`.
+        db (AsyncSession): The database session.
+        current_user (Principal): The user performing the request.
+        token (str): The JWT token for authorization.
+        fields (Tuple[str, ...]): The fields to return for each user.
+
+    Returns:
+        users_schemas.UserLookupResult: The users found and the IDs that were not returned.
+    """
+    user_ids = list(dict.fromkeys(lookup.ids))
+    rows = {row.id: row for row in await async_crud.get_user_rows_by_ids(db, user_ids, with_columns(fields, "id"))}
+    is_admin = current_user.role == UserRole.admin
+
+    users, missing, forbidden = [], [], []
+    for user_id in user_ids:
+        row = rows.get(user_id)
+        if row is None:
+            missing.append(user_id)
+        elif is_admin or user_id == current_user.id:
+            users.append(row)
+        else:
+            forbidden.append(user_id)
+
+    if forbidden:
+        logger.warning("Unauthorized access attempt by %s to %d user IDs", current_user.username, len(forbidden))
+    logger.info("User %s looked up %d users", current_user.username, len(users), extra={"sampled": True})
+    return serializers.json_response(serializers.user_lookup_json(users, missing, forbidden, fields))
+
+@router.patch("/users", response_model=users_schemas.UserBatchResult, dependencies=[Depends(get_current_admin_user)])
+async def update_users(
+    batch: users_schemas.UserBatchUpdate,
+    db: AsyncSession = Depends(get_db),
+    token: str = Query(..., description="JWT token for authorization")
+):
+    """
+    Changes the role of many users at once.
+
+    Users are selected by ids and/or current role and updated with set-based
+    `UPDATE ... WHERE` statements in a single transaction.
+
+    Args:
+        batch (users_schemas.UserBatchUpdate): The selection and the new role.
+        db (AsyncSession): The database session.
+        token (str): The JWT token for authorization.
+
+    Returns:
+        users_schemas.UserBatchResult: The number of updated users.
+    """
+    logger.info("Admin attempting to set role %s on a batch of users", batch.role.value)
+    affected = await async_crud.update_users_role(db, batch.where, batch.role)
+    logger.info("Role %s set on %d users", batch.role.value, affected)
+    return {"affected": affected}
+
+@router.post("/users/delete", response_model=users_schemas.UserBatchResult, dependencies=[Depends(get_current_admin_user)])
+async def delete_users(
+    selection: users_schemas.UserSelection,
+    db: AsyncSession = Depends(get_db),
     token: str = Query(..., description="JWT token for authorization")
 ):
     """
-    Retrieves all users from the database.
+    Deletes many users at once.
+
+    Users are selected by ids and/or role and deleted with set-based
+    `DELETE ... WHERE` statements in a single transaction.
 
     Args:
-        db (Session): The database session.
+        selection (users_schemas.UserSelection): Which users to delete.
+        db (AsyncSession): The database session.
         token (str): The JWT token for authorization.
 
     Returns:
-        List[users_schemas.UserResponse]: A list of all users in the database.
+        users_schemas.UserBatchResult: The number of deleted users.
     """
-    return crud.get_all_users(db)
+    logger.info("Admin attempting to delete a batch of users")
+    affected = await async_crud.delete_users(db, selection)
+    logger.info("%d users deleted", affected)
+    return {"affected": affected}
 
 @router.get("/users/{user_id}", response_model=users_schemas.UserResponse)
-def read_user(
+async def read_user(
     user_id: int,
-    db: Session = Depends(get_db),
-    current_user: users_schemas.UserResponse = Depends(get_current_user),
-    token: str = Query(..., description="JWT token for authorization")
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+    token: str = Query(..., description="JWT token for authorization"),
+    fields: Tuple[str, ...] = Depends(user_fields),
+    if_none_match: Optional[str] = Header(None)
 ):
     """
     Retrieves a user from the database by ID.
 
+    The response carries a weak ETag built from the row version and the
+    requested fields; a matching `If-None-Match` gets a 304 without
+    serializing the user.
+
     Args:
         user_id (int): ID of the user to retrieve.
-        db (Session): The database session.
-        current_user (users_schemas.UserResponse): The user performing the request.
+        db (AsyncSession): The database session.
+        current_user (Principal): The user performing the request.
         token (str): The JWT token for authorization.
+        fields (Tuple[str, ...]): The fields to return.
+        if_none_match (str, optional): ETags of the client's cached copies.
 
     Returns:
         users_schemas.UserResponse: The user model retrieved from the database.
@@ -128,28 +501,32 @@ def read_user(
         HTTPException: If the user is not found or if the current user lacks permissions.
     """
     
-    logger.info(f"User {current_user.username} attempting to access user ID {user_id}")
-    db_user = crud.get_user(db, user_id)
-    if db_user is None:
-        logger.warning(f"User ID {user_id} not found")
+    logger.info("User %s attempting to access user ID %s", current_user.username, user_id, extra={"sampled": True})
+    row = await async_crud.get_user_row(db, user_id, with_columns(fields, "version"))
+    if row is None:
+        logger.warning("User ID %s not found", user_id)
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
-    if db_user.id != current_user.id and current_user.role != UserRole.admin:
-        logger.warning(f"Unauthorized access attempt by {current_user.username} to user ID {user_id}")
+    if user_id != current_user.id and current_user.role != UserRole.admin:
+        logger.warning("Unauthorized access attempt by %s to user ID %s", current_user.username, user_id)
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized to access this resource"
         )
-    logger.info(f"User ID {user_id} details accessed successfully by {current_user.username}")
-    return db_user
+    etag = etags.make_etag(user_id, row.version, etags.variant(fields=",".join(fields)))
+    if etags.etag_matches(if_none_match, etag):
+        return etags.not_modified(etag)
+    logger.info("User ID %s details accessed successfully by %s", user_id, current_user.username, extra={"sampled": True})
+    return serializers.json_response(serializers.user_json(row, fields), {"ETag": etag})
 
-@router.put("/users/{user_id}", response_model=users_schemas.UserResponse, dependencies=[Depends(get_current_admin_user)])
-def update_user(
+@router.put("/users/{user_id}", response_model=users_schemas.UserResponse)
+async def update_user(
     user_id: int,
     user: users_schemas.UserUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
+    admin_user: Principal = Depends(get_current_admin_user),
     token: str = Query(..., description="JWT token for authorization")
 ):
     """
@@ -158,31 +535,31 @@ def update_user(
     Args:
         user_id (int): ID of the user to update.
         user (users_schemas.UserUpdate): The new user data.
-        db (Session): The database session.
+        db (AsyncSession): The database session.
+        admin_user (Principal): The admin user performing the update.
         token (str): The JWT token for authorization.
 
     Returns:
         users_schemas.UserResponse: The updated user model.
 
     Raises:
-        HTTPException: If the user is not found or if the current user lacks permissions.
+        HTTPException: If the user is not found, if the current user lacks permissions
+            or if the new username or email is already registered.
     """
-    logger.info(f"Admin attempting to update user ID {user_id}")
-    db_user = crud.get_user(db, user_id)
-    if db_user is None:
-        logger.warning(f"User ID {user_id} not found for update")
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
-    updated_user = crud.update_user(db, user_id=user_id, user=user, current_user_role=user.role)
-    logger.info(f"User ID {user_id} updated successfully")
+    logger.info("Admin attempting to update user ID %s", user_id)
+    try:
+        updated_user = await async_crud.update_user(db, user_id=user_id, user=user, current_user_role=admin_user.role)
+    except HTTPException as exc:
+        logger.warning("Update of user ID %s failed: %s", user_id, exc.detail)
+        raise
+    logger.info("User ID %s updated successfully", user_id)
     return updated_user
 
-@router.delete("/users/{user_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(get_current_admin_user)])
-def delete_user(
+@router.delete("/users/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_user(
     user_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
+    admin_user: Principal = Depends(get_current_admin_user),
     token: str = Query(..., description="JWT token for authorization")
 ):
     """
@@ -190,7 +567,8 @@ def delete_user(
 
     Args:
         user_id (int): ID of the user to delete.
-        db (Session): The database session.
+        db (AsyncSession): The database session.
+        admin_user (Principal): The admin user performing the deletion.
         token (str): The JWT token for authorization.
 
     Raises:
@@ -200,14 +578,11 @@ def delete_user(
         dict: A dictionary with a key "status" containing the string "success".
     """
 
-    logger.info(f"Admin attempting to delete user ID {user_id}")
-    db_user = crud.get_user(db, user_id)
-    if db_user is None:
-        logger.warning(f"User ID {user_id} not found for deletion")
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
-    crud.delete_user(db, user_id=user_id, current_user_role=db_user.role)
-    logger.info(f"User ID {user_id} deleted successfully")
+    logger.info("Admin attempting to delete user ID %s", user_id)
+    try:
+        await async_crud.delete_user(db, user_id=user_id, current_user_role=admin_user.role)
+    except HTTPException as exc:
+        logger.warning("Deletion of user ID %s failed: %s", user_id, exc.detail)
+        raise
+    logger.info("User ID %s deleted successfully", user_id)
     return {"status": "success"}
\ No newline at end of file
@@ -4,6 +4,21 @@ from typing import Optional
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+
+class TokenRefresh(BaseModel):
+    refresh_token: str
 
 class TokenData(BaseModel):
-    username: Optional[str] = None
\ No newline at end of file
+    username: Optional[str] = None
+    role: Optional[str] = None
+    exp: Optional[int] = None
+    user_id: Optional[int] = None
+    token_version: Optional[int] = None
+
+class RefreshTokenData(BaseModel):
+    username: str
+    user_id: int
+    jti: str
+    family: str
+    exp: int
\ No newline at end of file
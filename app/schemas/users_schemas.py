@@ -1,11 +1,15 @@
-from pydantic import BaseModel, EmailStr, Field, validator
+from pydantic import BaseModel, EmailStr, Field, model_validator, validator
 from enum import Enum
-from typing import Optional
+from typing import List, Optional
 
 class UserRole(str, Enum):
     admin = "admin"
     user = "user"
 
+class ExportFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
 class UserBase(BaseModel):
     username: str
     email: EmailStr
@@ -38,3 +42,60 @@ class UserLogin(BaseModel):
     username: str
     password: str
 
+class UserFilter(BaseModel):
+    role: Optional[UserRole] = None
+    username_prefix: Optional[str] = None
+    email_domain: Optional[str] = None
+    min_id: Optional[int] = None
+    max_id: Optional[int] = None
+
+class UserImportError(BaseModel):
+    line: int
+    error: str
+
+class UserImportResult(BaseModel):
+    inserted: int
+    errors: List[UserImportError]
+
+class UserSelection(BaseModel):
+    ids: Optional[List[int]] = None
+    role: Optional[UserRole] = None
+
+    @model_validator(mode="after")
+    def check_not_empty(self):
+        if self.ids is None and self.role is None:
+            raise ValueError("Select users by ids and/or role")
+        return self
+
+class UserBatchUpdate(BaseModel):
+    where: UserSelection
+    role: UserRole
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "where": {"ids": [2, 3, 4]},
+                "role": "admin"
+            }
+        }
+
+class UserBatchResult(BaseModel):
+    affected: int
+
+# One lookup is a single `IN (...)` query
+USER_LOOKUP_MAX_IDS = 500
+
+class UserLookup(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=USER_LOOKUP_MAX_IDS)
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "ids": [1, 2, 3]
+            }
+        }
+
+class UserLookupResult(BaseModel):
+    users: List[UserResponse]
+    missing: List[int]
+    forbidden: List[int]
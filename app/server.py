@@ -0,0 +1,271 @@
+"""
+Production server: pre-forked uvicorn workers sharing one listening socket.
+
+The master process binds the socket, brings the schema up to date and
+calibrates the password hashing cost once and imports the app, then forks the
+workers. Each worker serves the inherited
+socket with uvicorn on uvloop and httptools (when installed, otherwise the
+stdlib event loop and h11), and opens its database pool during startup, so it
+only accepts connections once it can serve them.
+
+Rate-limit counters are shared by the workers through a shared-memory
+segment created by the master (the `shm` limiter backend), which replaces the
+per-process `memory` backend. A Redis backend is kept as configured.
+Metrics are merged across workers on every scrape from the snapshots they
+write to METRICS_MULTIPROC_DIR, a temporary directory unless one is set.
+
+On SIGTERM or SIGINT the master asks every worker to stop: workers stop
+accepting, finish their in-flight requests for up to SERVER_GRACEFUL_TIMEOUT
+seconds and run the app's shutdown, after which the master kills stragglers
+and removes the shared-memory segment. A worker that dies while the server is
+running is replaced.
+
+Usage:
+    python -m app.server --workers 4 --port 8000
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import time
+from importlib.util import find_spec
+from app.common import hashing, metrics
+from app.common.config import settings
+from app.common.logging_config import logger
+
+# A worker that exits sooner than this after being forked is assumed to be
+# failing on startup and stops the server instead of being restarted forever
+MIN_WORKER_UPTIME = 5.0
+
+def worker_count(workers: int = 0) -> int:
+    """
+    Return the number of workers, defaulting to one per CPU core.
+    """
+    return workers or os.cpu_count() or 1
+
+def bind_socket(host: str, port: int, backlog: int) -> socket.socket:
+    """
+    Create the listening socket shared by the workers.
+
+    Args:
+        host (str): Address to bind.
+        port (int): Port to bind.
+        backlog (int): Connections queued by the kernel until a worker accepts them.
+
+    Returns:
+        socket.socket: The bound, listening socket.
+    """
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+async def prepare_database():
+    """
+    Update the schema once in the master, then close its connections so that
+    no worker inherits them.
+    """
+    from app.common import init_db
+    from app.common.database import async_engine
+
+    await init_db.initialize_database()
+    await async_engine.dispose()
+
+def exit_worker(signum, frame):
+    # uvicorn re-raises the signal that stopped it once it has shut down
+    raise SystemExit(0)
+
+def run_worker(sock: socket.socket, app, graceful_timeout: int) -> int:
+    """
+    Serve the app on the inherited socket until asked to stop.
+
+    Args:
+        sock (socket.socket): The listening socket.
+        app: The ASGI application.
+        graceful_timeout (int): Seconds in-flight requests get to finish on shutdown.
+
+    Returns:
+        int: The worker's exit code.
+    """
+    import uvicorn
+
+    config = uvicorn.Config(
+        app,
+        loop="auto",
+        http="auto",
+        lifespan="on",
+        access_log=False,
+        timeout_graceful_shutdown=graceful_timeout,
+    )
+    server = uvicorn.Server(config)
+    try:
+        server.run(sockets=[sock])
+    except SystemExit as exc:
+        return exc.code if isinstance(exc.code, int) else 1
+    except BaseException:
+        logger.exception("Worker %d crashed", os.getpid())
+        return 1
+    return 0 if server.started else 1
+
+class Master:
+    """
+    Forks the workers, restarts the ones that die and stops them on a signal.
+    """
+
+    def __init__(self, sock: socket.socket, app, workers: int, graceful_timeout: int):
+        self.sock = sock
+        self.app = app
+        self.workers = workers
+        self.graceful_timeout = graceful_timeout
+        # pid -> time the worker was forked
+        self.children = {}
+        self.stopping = False
+        self.deadline = float("inf")
+
+    def spawn(self):
+        pid = os.fork()
+        if pid:
+            self.children[pid] = time.monotonic()
+            return
+
+        # Worker: leave the terminal's process group, so that Ctrl-C reaches
+        # the master only and each worker is stopped exactly once
+        os.setpgid(0, 0)
+        signal.signal(signal.SIGTERM, exit_worker)
+        signal.signal(signal.SIGINT, exit_worker)
+        code = run_worker(self.sock, self.app, self.graceful_timeout)
+        from app.common.logging_config import listener
+        listener.stop()
+        # Skip the master's cleanup (atexit handlers, shared memory unlink)
+        os._exit(code)
+
+    def stop(self, signum=None, frame=None):
+        if not self.stopping:
+            logger.info("Stopping %d workers", len(self.children))
+        self.stopping = True
+        self.deadline = time.monotonic() + self.graceful_timeout + 5
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def reap(self) -> bool:
+        """
+        Collect exited workers and replace them unless stopping.
+
+        Returns:
+            bool: False if a worker failed on startup.
+        """
+        healthy = True
+        while self.children:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+            if not pid:
+                break
+            started = self.children.pop(pid, None)
+            if started is None or self.stopping:
+                continue
+            code = os.waitstatus_to_exitcode(status)
+            if time.monotonic() - started < MIN_WORKER_UPTIME:
+                logger.error("Worker %d exited with code %d during startup", pid, code)
+                healthy = False
+            else:
+                logger.warning("Worker %d exited with code %d, restarting it", pid, code)
+                self.spawn()
+        return healthy
+
+    def run(self) -> int:
+        """
+        Supervise the workers until they are all stopped.
+
+        Returns:
+            int: The server's exit code.
+        """
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for _ in range(self.workers):
+            self.spawn()
+
+        code = 0
+        while self.children:
+            if not self.reap() and not self.stopping:
+                code = 1
+                self.stop()
+            if self.stopping and time.monotonic() > self.deadline:
+                for pid in list(self.children):
+                    logger.warning("Worker %d did not stop in time, killing it", pid)
+                    os.kill(pid, signal.SIGKILL)
+                self.deadline = float("inf")
+            time.sleep(0.1)
+        return code
+
+def serve(host: str, port: int, workers: int, backlog: int = 2048, graceful_timeout: int = 30) -> int:
+    """
+    Run the pre-forked server until it receives SIGTERM or SIGINT.
+
+    Args:
+        host (str): Address to bind.
+        port (int): Port to bind.
+        workers (int): Number of worker processes.
+        backlog (int): Listen backlog of the shared socket.
+        graceful_timeout (int): Seconds in-flight requests get to finish on shutdown.
+
+    Returns:
+        int: The server's exit code.
+    """
+    # Must be set before the limiter module creates the backend on import
+    if settings.RATE_LIMIT_BACKEND == "memory":
+        settings.RATE_LIMIT_BACKEND = "shm"
+
+    sock = bind_socket(host, port, backlog)
+    asyncio.run(prepare_database())
+    # Calibrate once, for the workers to inherit the same hashing cost
+    hashing.apply_calibration()
+
+    from app.common import limiter
+    from app.main import app
+
+    # Read by the workers' lifespan, so it may be set after the import
+    metrics_dir = None
+    if settings.METRICS_MULTIPROC_DIR:
+        metrics.clear_snapshots(settings.METRICS_MULTIPROC_DIR)
+    else:
+        metrics_dir = settings.METRICS_MULTIPROC_DIR = tempfile.mkdtemp(prefix="metrics-")
+
+    logger.info(
+        "Serving on %s:%d with %d workers (loop %s, http %s, rate limit backend %s)",
+        host, port, workers,
+        "uvloop" if find_spec("uvloop") else "asyncio",
+        "httptools" if find_spec("httptools") else "h11",
+        settings.RATE_LIMIT_BACKEND,
+    )
+    try:
+        return Master(sock, app, workers, graceful_timeout).run()
+    finally:
+        sock.close()
+        if isinstance(limiter.backend, limiter.SharedMemoryLimiterBackend):
+            limiter.backend.unlink()
+        if metrics_dir is not None:
+            shutil.rmtree(metrics_dir, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=settings.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=settings.SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=settings.SERVER_WORKERS,
+                        help="Worker processes, 0 for one per CPU core (default: %(default)s)")
+    parser.add_argument("--backlog", type=int, default=settings.SERVER_BACKLOG)
+    parser.add_argument("--graceful-timeout", type=int, default=settings.SERVER_GRACEFUL_TIMEOUT,
+                        help="Seconds in-flight requests get to finish on shutdown (default: %(default)s)")
+    args = parser.parse_args()
+    sys.exit(serve(args.host, args.port, worker_count(args.workers), args.backlog, args.graceful_timeout))
+
+if __name__ == "__main__":
+    main()
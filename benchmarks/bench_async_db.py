@@ -0,0 +1,121 @@
+"""
+Concurrent-request throughput of an authenticated endpoint, before and after
+the async database layer.
+
+`before` reproduces the original dependency chain: an `async def` dependency
+that runs a blocking `crud.get_user_by_username` query on the event loop.
+`after` uses `app.dependencies.get_current_user`, which awaits the query on an
+`AsyncSession`.
+
+Besides throughput, the benchmark reports event-loop lag: how late a 1 ms
+ticker task wakes up while the requests are in flight. Blocking queries show
+up there even when the database is a local file and raw throughput is close.
+
+Usage:
+    python -m benchmarks.bench_async_db --requests 2000 --concurrency 50
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench.db")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+os.environ.setdefault("RATE_LIMIT_MAX_REQUESTS", "1000000")
+os.environ.setdefault("RATE_LIMIT_WINDOW", "60")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{DB_PATH}")
+
+import httpx
+from fastapi import Depends, FastAPI, HTTPException, status
+
+from app import auth
+from app.common.database import Base, SessionLocal, engine
+from app.crud import crud
+from app.dependencies import get_current_user, get_token
+from app.schemas.users_schemas import UserCreate, UserRole
+
+async def blocking_current_user(token: str = Depends(get_token)):
+    """The pre-async dependency: a sync query issued from an `async def`."""
+    token_data = auth.decode_access_token(token)
+    db = SessionLocal()
+    try:
+        user = crud.get_user_by_username(db, username=token_data.username)
+    finally:
+        db.close()
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+    return user
+
+def build_app() -> FastAPI:
+    bench_app = FastAPI()
+
+    @bench_app.get("/before")
+    async def before(user=Depends(blocking_current_user)):
+        return {"username": user.username}
+
+    @bench_app.get("/after")
+    async def after(user=Depends(get_current_user)):
+        return {"username": user.username}
+
+    return bench_app
+
+def seed() -> str:
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        user = crud.create_user(db, UserCreate(
+            username="bench", email="bench@example.com", password="bench123", role=UserRole.user
+        ))
+        return auth.create_access_token({"sub": user.username})
+    finally:
+        db.close()
+
+async def measure_lag(samples: list, stop: asyncio.Event, interval: float = 0.001):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(time.perf_counter() - started - interval)
+
+async def run(path: str, token: str, total: int, concurrency: int):
+    transport = httpx.ASGITransport(app=build_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        remaining = iter(range(total))
+
+        async def worker():
+            for _ in remaining:
+                response = await client.get(path, params={"token": token})
+                response.raise_for_status()
+
+        lag, stop = [], asyncio.Event()
+        ticker = asyncio.create_task(measure_lag(lag, stop))
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await ticker
+        lag.sort()
+        p99_lag = lag[int(len(lag) * 0.99)] if lag else 0.0
+        return total / elapsed, p99_lag
+
+async def compare(token: str, total: int, concurrency: int):
+    for path in ("/before", "/after"):
+        await run(path, token, min(total, 100), concurrency)  # warm-up
+        throughput, p99_lag = await run(path, token, total, concurrency)
+        print(
+            f"{path:8s} {throughput:10.1f} req/s  p99 loop lag {p99_lag * 1000:7.2f} ms  "
+            f"({total} requests, concurrency {concurrency})"
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    asyncio.run(compare(seed(), args.requests, args.concurrency))
+
+if __name__ == "__main__":
+    main()
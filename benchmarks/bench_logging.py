@@ -0,0 +1,89 @@
+"""
+Per-request logging latency with the old synchronous FileHandler and with the
+queue-backed JSON pipeline.
+
+Each simulated request emits the three INFO messages of GET /users/{user_id}
+(two of them sampled). `sync` is the previous setup: eager f-strings written
+by a FileHandler on the calling thread. `queue` uses LazyQueueHandler with
+lazy arguments, formatting and writing on the listener thread; it is measured
+with and without sampling of the high-volume messages.
+
+Usage:
+    python -m benchmarks.bench_logging --requests 20000
+"""
+import argparse
+import logging
+import logging.handlers
+import os
+import queue
+import tempfile
+import time
+
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+os.environ.setdefault("RATE_LIMIT_MAX_REQUESTS", "5")
+os.environ.setdefault("RATE_LIMIT_WINDOW", "60")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("LOG_FILE_PATH", os.path.join(tempfile.mkdtemp(), "app.log"))
+
+from app.common.logging_config import JsonFormatter, LazyQueueHandler, SamplingFilter
+
+def sync_logger(path: str) -> logging.Logger:
+    handler = logging.FileHandler(path)
+    handler.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
+    bench_logger = logging.getLogger("bench_sync")
+    bench_logger.propagate = False
+    bench_logger.addHandler(handler)
+    return bench_logger
+
+def queue_logger(path: str, rates: dict):
+    handler = logging.handlers.RotatingFileHandler(path, maxBytes=10485760, backupCount=5)
+    handler.setFormatter(JsonFormatter())
+    log_queue = queue.SimpleQueue()
+    queue_handler = LazyQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(rates))
+    bench_logger = logging.getLogger(f"bench_queue_{len(rates)}")
+    bench_logger.propagate = False
+    bench_logger.addHandler(queue_handler)
+    listener = logging.handlers.QueueListener(log_queue, handler)
+    listener.start()
+    return bench_logger, listener
+
+def request_sync(bench_logger, username, user_id):
+    bench_logger.info(f"User {username} attempting to access user ID {user_id}")
+    bench_logger.info(f"User ID {user_id} details accessed successfully by {username}")
+    bench_logger.info(f"User {username} logged in successfully")
+
+def request_lazy(bench_logger, username, user_id):
+    bench_logger.info("User %s attempting to access user ID %s", username, user_id, extra={"sampled": True})
+    bench_logger.info("User ID %s details accessed successfully by %s", user_id, username, extra={"sampled": True})
+    bench_logger.info("User %s logged in successfully", username)
+
+def measure(emit, bench_logger, requests: int):
+    latencies = []
+    for i in range(requests):
+        started = time.perf_counter()
+        emit(bench_logger, "alice", i)
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    return {p: latencies[int(len(latencies) * p / 100) - 1] * 1e6 for p in (50, 99)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.INFO)
+    directory = tempfile.mkdtemp()
+
+    results = {"sync": measure(request_sync, sync_logger(os.path.join(directory, "sync.log")), args.requests)}
+    for name, rates in (("queue", {}), ("queue+sampling", {"INFO": 0.1})):
+        bench_logger, listener = queue_logger(os.path.join(directory, f"{name}.log"), rates)
+        results[name] = measure(request_lazy, bench_logger, args.requests)
+        listener.stop()
+
+    for name, percentiles in results.items():
+        print(f"{name:15s} p50 {percentiles[50]:7.1f} us  p99 {percentiles[99]:7.1f} us per request")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Serialization of a users listing, before and after the precompiled serializers.
+
+`before` is what FastAPI does with `response_model=List[UserResponse]`: load
+ORM objects, validate them against the response model, then dump the models
+to JSON. `after` selects only the response columns and dumps the row tuples
+with `app.common.serializers.users_json`. Both are measured end to end from
+a seeded SQLite file (query + serialization) and for serialization alone.
+
+Usage:
+    python -m benchmarks.bench_serialization --users 10000 --repeat 5
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench.db")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+os.environ.setdefault("RATE_LIMIT_MAX_REQUESTS", "5")
+os.environ.setdefault("RATE_LIMIT_WINDOW", "60")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{DB_PATH}")
+
+from typing import List
+from pydantic import TypeAdapter
+from sqlalchemy import insert
+
+from app.common import serializers
+from app.common.database import AsyncSessionLocal, Base, async_engine, engine
+from app.crud import async_crud
+from app.models.users_models import User, UserRole
+from app.schemas.users_schemas import UserResponse
+
+RESPONSE_MODEL = TypeAdapter(List[UserResponse])
+
+def seed(users: int):
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        connection.execute(insert(User), [
+            {"username": f"user{n}", "email": f"user{n}@example.com", "password": "x", "role": UserRole.user}
+            for n in range(users)
+        ])
+
+def before_serialize(users) -> bytes:
+    return RESPONSE_MODEL.dump_json(RESPONSE_MODEL.validate_python(users, from_attributes=True))
+
+async def before(users: int) -> bytes:
+    async with AsyncSessionLocal() as db:
+        return before_serialize(await async_crud.get_users_page(db, limit=users))
+
+async def after(users: int) -> bytes:
+    async with AsyncSessionLocal() as db:
+        return serializers.users_json(await async_crud.get_user_rows_page(db, serializers.USER_FIELDS, limit=users))
+
+async def best_of(repeat: int, function, *args) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function(*args)
+        if asyncio.iscoroutine(result):
+            await result
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+async def compare(users: int, repeat: int):
+    before_body, after_body = await before(users), await after(users)
+    assert before_body == after_body, "Both paths must produce the same JSON"
+
+    async with AsyncSessionLocal() as db:
+        orm_users = await async_crud.get_users_page(db, limit=users)
+        rows = await async_crud.get_user_rows_page(db, serializers.USER_FIELDS, limit=users)
+
+    results = [
+        ("query + serialize", await best_of(repeat, before, users), await best_of(repeat, after, users)),
+        ("serialize only", await best_of(repeat, before_serialize, orm_users), await best_of(repeat, serializers.users_json, rows)),
+    ]
+    await async_engine.dispose()
+    print(f"{users} users, {len(after_body)} bytes, best of {repeat}")
+    for name, before_time, after_time in results:
+        print(f"{name:18s} before {before_time * 1000:9.2f} ms  after {after_time * 1000:8.2f} ms  "
+              f"({before_time / after_time:.1f}x)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    seed(args.users)
+    asyncio.run(compare(args.users, args.repeat))
+
+if __name__ == "__main__":
+    main()
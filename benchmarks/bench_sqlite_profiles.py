@@ -0,0 +1,113 @@
+"""
+Concurrent read/write throughput of SQLite with the default and tuned profiles.
+
+`default` uses the driver defaults (rollback journal, synchronous=FULL and
+the driver's 5 s lock timeout); `tuned` applies the SQLITE_* settings (WAL, synchronous=NORMAL,
+busy_timeout, cache and mmap sizes). Writer threads insert and commit users
+one at a time while reader threads look users up by username, each on its own
+pooled connection.
+
+Usage:
+    python -m benchmarks.bench_sqlite_profiles --writers 4 --readers 8 --seconds 5
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+os.environ.setdefault("RATE_LIMIT_MAX_REQUESTS", "5")
+os.environ.setdefault("RATE_LIMIT_WINDOW", "60")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.exc import OperationalError
+
+from app.common.config import settings
+from app.common.database import Base, configure_sqlite, engine_options
+from app.models.users_models import User, UserRole
+
+SEED_USERS = 10000
+
+def build_engine(profile: str):
+    url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), f'{profile}.db')}"
+    config = settings.model_copy(update={
+        "SQLITE_TUNING": profile == "tuned",
+        "DB_POOL_SIZE": 32,
+        "DB_MAX_OVERFLOW": 0,
+    })
+    engine = create_engine(url, **engine_options(url, config))
+    configure_sqlite(engine, config)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        connection.execute(insert(User), [
+            {"username": f"seed{i}", "email": f"seed{i}@example.com", "password": "x", "role": UserRole.user}
+            for i in range(SEED_USERS)
+        ])
+    return engine
+
+def run(profile: str, writers: int, readers: int, seconds: float):
+    engine = build_engine(profile)
+    stop = threading.Event()
+    counts = {"writes": 0, "reads": 0, "locked": 0}
+    lock = threading.Lock()
+
+    def count(key):
+        with lock:
+            counts[key] += 1
+
+    def writer(number):
+        i = 0
+        while not stop.is_set():
+            try:
+                with engine.begin() as connection:
+                    connection.execute(insert(User).values(
+                        username=f"w{number}-{i}", email=f"w{number}-{i}@example.com", password="x", role=UserRole.user
+                    ))
+                count("writes")
+            except OperationalError:
+                count("locked")
+            i += 1
+
+    def reader():
+        while not stop.is_set():
+            try:
+                with engine.connect() as connection:
+                    connection.execute(
+                        select(User.id).where(User.username == f"seed{random.randrange(SEED_USERS)}")
+                    ).first()
+                count("reads")
+            except OperationalError:
+                count("locked")
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(writers)]
+    threads += [threading.Thread(target=reader) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+    return {key: value / seconds if key != "locked" else value for key, value in counts.items()}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args()
+
+    for profile in ("default", "tuned"):
+        result = run(profile, args.writers, args.readers, args.seconds)
+        print(
+            f"{profile:8s} {result['writes']:9.1f} writes/s  {result['reads']:9.1f} reads/s  "
+            f"{result['locked']:6d} 'database is locked' errors"
+        )
+
+if __name__ == "__main__":
+    main()
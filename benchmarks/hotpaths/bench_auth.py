@@ -0,0 +1,15 @@
+"""JWT encode/decode, run on every login and every authenticated request."""
+import pytest
+
+from app import auth
+
+pytestmark = pytest.mark.benchmark(group="auth")
+
+def bench_create_access_token(benchmark):
+    token = benchmark(auth.create_access_token, {"sub": "user1", "role": "user"})
+    assert token
+
+def bench_decode_access_token(benchmark):
+    token = auth.create_access_token({"sub": "user1", "role": "user"})
+    token_data = benchmark(auth.decode_access_token, token)
+    assert token_data.username == "user1"
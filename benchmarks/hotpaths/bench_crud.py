@@ -0,0 +1,30 @@
+"""User lookups by username, the query behind login and every token check."""
+import pytest
+
+from app.crud import async_crud, crud
+
+pytestmark = pytest.mark.benchmark(group="crud")
+
+def bench_get_user_by_username(benchmark, sync_session, usernames):
+    def lookup():
+        user = crud.get_user_by_username(sync_session, usernames())
+        # Keep the identity map from turning later lookups into cache hits
+        sync_session.expunge_all()
+        return user
+    assert benchmark(lookup) is not None
+
+def bench_async_get_user_by_username(benchmark, async_session, usernames, event_loop_runner):
+    def lookup():
+        user = event_loop_runner(async_crud.get_user_by_username(async_session, usernames()))
+        async_session.expunge_all()
+        return user
+    assert benchmark(lookup) is not None
+
+def bench_get_users_page(benchmark, sync_session, user_count):
+    after_id = user_count // 2
+
+    def page():
+        users = crud.get_users_page(sync_session, limit=100, after_id=after_id)
+        sync_session.expunge_all()
+        return users
+    assert len(benchmark(page)) == min(100, user_count - after_id)
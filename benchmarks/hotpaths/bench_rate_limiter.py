@@ -0,0 +1,24 @@
+"""The per-request rate limiter dependency, with one hot client and with many clients."""
+import itertools
+
+import pytest
+from starlette.requests import Request
+
+from app.common import limiter
+
+pytestmark = pytest.mark.benchmark(group="rate_limiter")
+
+def make_request(host: str) -> Request:
+    return Request({"type": "http", "method": "POST", "path": "/login", "headers": [], "client": (host, 50000)})
+
+@pytest.fixture
+def memory_backend(monkeypatch):
+    backend = limiter.MemoryLimiterBackend(limit=10 ** 9, window=60, max_clients=100000)
+    monkeypatch.setattr(limiter, "backend", backend)
+    return backend
+
+@pytest.mark.parametrize("clients", [1, 10000])
+def bench_rate_limiter(benchmark, memory_backend, event_loop_runner, clients):
+    requests = itertools.cycle([make_request(f"10.{n >> 16 & 255}.{n >> 8 & 255}.{n & 255}") for n in range(clients)])
+    benchmark(lambda: event_loop_runner(limiter.rate_limiter(next(requests))))
+    assert 0 < len(memory_backend.limiter) <= clients
@@ -0,0 +1,30 @@
+"""Serialization of a page of users, through the response model and through the row serializers."""
+from typing import List
+
+import pytest
+from pydantic import TypeAdapter
+
+from app.common import serializers
+from app.models.users_models import User, UserRole
+from app.schemas.users_schemas import UserResponse
+
+pytestmark = pytest.mark.benchmark(group="serialization")
+
+# FastAPI validates the returned ORM objects against the response model, then dumps them
+USER_LIST = TypeAdapter(List[UserResponse])
+
+@pytest.mark.parametrize("page_size", [100, 1000])
+def bench_serialize_user_responses(benchmark, page_size):
+    users = [
+        User(id=n, username=f"user{n}", email=f"user{n}@example.com", password="x", role=UserRole.user)
+        for n in range(page_size)
+    ]
+
+    def serialize():
+        return USER_LIST.dump_json(USER_LIST.validate_python(users, from_attributes=True))
+    assert benchmark(serialize).startswith(b"[")
+
+@pytest.mark.parametrize("page_size", [100, 1000])
+def bench_serialize_user_rows(benchmark, page_size):
+    rows = [(f"user{n}", f"user{n}@example.com", n, UserRole.user) for n in range(page_size)]
+    assert benchmark(serializers.users_json, rows).startswith(b"[")
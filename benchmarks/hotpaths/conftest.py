@@ -0,0 +1,127 @@
+"""
+Fixtures for the hot-path microbenchmarks.
+
+The benchmarks run against SQLite databases seeded with 1k, 100k and 1M users
+(`--bench-sizes` picks a subset). Seeded files are cached under
+`.benchmarks/db/`, keyed by size and by a hash of the users table DDL, so they
+are only rebuilt when the schema changes.
+
+Baselines are plain pytest-benchmark JSON files:
+
+    pytest benchmarks/hotpaths --benchmark-autosave
+    pytest benchmarks/hotpaths --benchmark-compare --benchmark-compare-fail=median:15%
+
+The second command compares against the latest saved run and fails if the
+median of any benchmark got more than 15% slower.
+"""
+import asyncio
+import hashlib
+import itertools
+import os
+import tempfile
+
+import pytest
+
+DEFAULT_SIZES = "1000,100000,1000000"
+SEED_BATCH_SIZE = 50000
+CACHE_DIR = os.path.join(".benchmarks", "db")
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--bench-sizes", default=DEFAULT_SIZES,
+        help="Comma-separated user counts of the seeded databases (default: %(default)s)"
+    )
+
+def pytest_sessionstart(session):
+    # Settings are read once at import time; the seeded databases use their
+    # own engines, so these only need to satisfy the required fields.
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+    os.environ.setdefault("ALGORITHM", "HS256")
+    os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+    os.environ.setdefault("RATE_LIMIT_MAX_REQUESTS", "1000000000")
+    os.environ.setdefault("RATE_LIMIT_WINDOW", "60")
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}")
+
+def pytest_generate_tests(metafunc):
+    if "user_count" in metafunc.fixturenames:
+        sizes = [int(size) for size in metafunc.config.getoption("bench_sizes").split(",")]
+        metafunc.parametrize("user_count", sizes, scope="session")
+
+def seed_users(engine, count: int):
+    """Insert `count` users named user<N>, all sharing one precomputed hash."""
+    from sqlalchemy import insert
+    from app.common.hashing import pwd_context
+    from app.models.users_models import User, UserRole
+
+    password = pwd_context.hash("benchmark")
+    with engine.begin() as connection:
+        for start in range(0, count, SEED_BATCH_SIZE):
+            connection.execute(insert(User), [
+                {
+                    "username": f"user{n}",
+                    "email": f"user{n}@example.com",
+                    "password": password,
+                    "role": UserRole.admin if n % 100 == 0 else UserRole.user,
+                }
+                for n in range(start, min(start + SEED_BATCH_SIZE, count))
+            ])
+
+@pytest.fixture(scope="session")
+def seeded_db_path(user_count):
+    from sqlalchemy import create_engine
+    from sqlalchemy.schema import CreateTable
+    from app.common.database import Base, configure_sqlite
+    from app.models.users_models import User
+
+    schema = hashlib.sha1(str(CreateTable(User.__table__)).encode()).hexdigest()[:8]
+    path = os.path.abspath(os.path.join(CACHE_DIR, f"users_{user_count}_{schema}.db"))
+    if not os.path.exists(path):
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        partial = f"{path}.partial"
+        if os.path.exists(partial):
+            os.remove(partial)
+        engine = create_engine(f"sqlite:///{partial}")
+        configure_sqlite(engine)
+        Base.metadata.create_all(bind=engine)
+        seed_users(engine, user_count)
+        engine.dispose()
+        os.replace(partial, path)
+    return path
+
+@pytest.fixture(scope="session")
+def sync_session(seeded_db_path):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from app.common.database import configure_sqlite
+
+    engine = create_engine(f"sqlite:///{seeded_db_path}")
+    configure_sqlite(engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+@pytest.fixture(scope="session")
+def event_loop_runner():
+    """A long-lived event loop, so async benchmarks measure the call and not loop setup."""
+    loop = asyncio.new_event_loop()
+    yield loop.run_until_complete
+    loop.close()
+
+@pytest.fixture(scope="session")
+def async_session(seeded_db_path, event_loop_runner):
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from app.common.database import configure_sqlite
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{seeded_db_path}")
+    configure_sqlite(engine.sync_engine)
+    session = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)()
+    yield session
+    event_loop_runner(session.close())
+    event_loop_runner(engine.dispose())
+
+@pytest.fixture
+def usernames(user_count):
+    """Existing usernames spread over the whole table, cycled through by lookups."""
+    step = max(user_count // 1000, 1)
+    return itertools.cycle([f"user{n}" for n in range(0, user_count, step)]).__next__
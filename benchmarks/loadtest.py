@@ -0,0 +1,259 @@
+"""
+End-to-end HTTP load test of the real application under its production
+server, `python -m app.server`.
+
+The harness first builds a synthetic SQLite database of `--users` users through
+the bulk insert path (`async_crud.bulk_insert_users`). All synthetic users share
+one precomputed bcrypt hash of `loadtest`, so seeding takes seconds rather than
+hours. It then starts `app.server` against that database with `--workers`
+pre-forked worker processes, as deployed (shared-memory rate limits and token
+cache invalidation included), and drives it from an async httpx client: `--concurrency`
+workers each repeatedly pick an endpoint according to `--mix` for `--duration`
+seconds, after a `--warmup` period whose results are discarded.
+
+The report gives, per endpoint, the request count, error count, req/s and
+p50/p95/p99 latency. `--output` also writes it as JSON, together with the run
+configuration, so that runs can be compared.
+
+Any other setting (pool sizes, SQLite pragmas, hashing workers, ...) is passed
+to the server through the environment, e.g.
+
+    SQLITE_SYNCHRONOUS=FULL python -m benchmarks.loadtest --users 100000
+
+Reads and writes are issued with the admin's token, since regular users may
+only read themselves. The login rate limit is raised to `--rate-limit` so that
+`/login` is measured rather than rejected; all requests come from one address.
+
+Usage:
+    python -m benchmarks.loadtest --users 100000 --workers 4 --concurrency 64 \\
+        --duration 30 --mix get_user=60,list_users=20,login=10,register=10 --output report.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+
+WORK_DIR = tempfile.mkdtemp(prefix="loadtest-")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+os.environ.setdefault("RATE_LIMIT_WINDOW", "60")
+os.environ.setdefault("LOG_FILE_PATH", os.path.join(WORK_DIR, "app.log"))
+
+PASSWORD = "loadtest"
+ADMIN_USERNAME = "admin"
+ADMIN_PASSWORD = "strongpass123"
+ENDPOINTS = ("login", "get_user", "list_users", "register")
+DEFAULT_MIX = "get_user=60,list_users=20,login=10,register=10"
+PERCENTILES = (50, 95, 99)
+
+def parse_mix(mix: str) -> dict:
+    weights = {}
+    for item in mix.split(","):
+        name, _, weight = item.partition("=")
+        if name not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"Unknown endpoint {name!r}, expected one of {', '.join(ENDPOINTS)}")
+        weights[name] = float(weight or 1)
+    return weights
+
+async def seed(users: int, batch_size: int) -> int:
+    """Create the schema and insert `users` synthetic users, unless the database already has them."""
+    from sqlalchemy import func, select
+    from app.common.hashing import pwd_context
+    from app.common.database import AsyncSessionLocal, Base, async_engine, engine
+    from app.crud import async_crud
+    from app.models.users_models import User, UserRole
+
+    Base.metadata.create_all(bind=engine)
+    async with AsyncSessionLocal() as db:
+        existing = await db.scalar(select(func.count()).select_from(User))
+        if existing >= users:
+            return existing
+        password = pwd_context.hash(PASSWORD)
+        for start in range(existing, users, batch_size):
+            errors = await async_crud.bulk_insert_users(db, [
+                {
+                    "username": f"user{n}",
+                    "email": f"user{n}@example.com",
+                    "password": password,
+                    "role": UserRole.user,
+                }
+                for n in range(start, min(start + batch_size, users))
+            ])
+            if errors:
+                raise RuntimeError(f"Seeding failed: {errors[0][1]}")
+    await async_engine.dispose()
+    return users
+
+def start_server(port: int, workers: int, verbose: bool) -> subprocess.Popen:
+    output = None if verbose else subprocess.DEVNULL
+    return subprocess.Popen(
+        [sys.executable, "-m", "app.server", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--graceful-timeout", "5"],
+        env=os.environ.copy(), stdout=output, stderr=output
+    )
+
+async def wait_until_ready(client, server: subprocess.Popen, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Server exited with code {server.returncode}")
+        try:
+            # Any answer from the app will do, /metrics needs credentials
+            if (await client.get("/metrics")).status_code < 500:
+                return
+        except Exception:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("Server did not become ready")
+
+async def login(client, username: str, password: str) -> str:
+    response = await client.post("/login", json={"username": username, "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+class LoadGenerator:
+    """Issues the requests of the endpoint mix and records their latencies."""
+
+    def __init__(self, client, users: int, admin_token: str, seed: int):
+        from app.common.pagination import encode_cursor
+
+        self.client = client
+        self.users = users
+        self.admin_token = admin_token
+        self.random = random.Random(seed)
+        self.encode_cursor = encode_cursor
+        self.registrations = itertools.count()
+        self.run_id = uuid.uuid4().hex[:8]
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    def user_id(self) -> int:
+        return self.random.randint(1, self.users)
+
+    def request(self, endpoint: str):
+        if endpoint == "login":
+            return self.client.post("/login", json={"username": f"user{self.user_id() - 1}", "password": PASSWORD})
+        if endpoint == "get_user":
+            return self.client.get(f"/users/{self.user_id()}", params={"token": self.admin_token})
+        if endpoint == "list_users":
+            return self.client.get("/users", params={
+                "token": self.admin_token, "limit": 100, "after": self.encode_cursor(self.user_id())
+            })
+        n = next(self.registrations)
+        return self.client.post("/register", params={"token": self.admin_token}, json={
+            "username": f"load-{self.run_id}-{n}",
+            "email": f"load-{self.run_id}-{n}@example.com",
+            "password": PASSWORD,
+            "role": "user",
+        })
+
+    async def worker(self, mix: dict, deadline: float, record: bool):
+        names, weights = list(mix), list(mix.values())
+        while time.perf_counter() < deadline:
+            endpoint = self.random.choices(names, weights)[0]
+            started = time.perf_counter()
+            try:
+                status = (await self.request(endpoint)).status_code
+            except Exception as exc:
+                status = type(exc).__name__
+            if record:
+                self.latencies[endpoint].append(time.perf_counter() - started)
+                self.statuses[endpoint][status] += 1
+
+    async def run(self, mix: dict, concurrency: int, duration: float, record: bool = True) -> float:
+        started = time.perf_counter()
+        deadline = started + duration
+        await asyncio.gather(*(self.worker(mix, deadline, record) for _ in range(concurrency)))
+        return time.perf_counter() - started
+
+def percentile(sorted_values: list, pct: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))]
+
+def build_report(generator: LoadGenerator, elapsed: float) -> dict:
+    endpoints = {}
+    for endpoint, latencies in sorted(generator.latencies.items()):
+        latencies.sort()
+        statuses = generator.statuses[endpoint]
+        errors = sum(count for status, count in statuses.items() if not (isinstance(status, int) and status < 400))
+        endpoints[endpoint] = {
+            "requests": len(latencies),
+            "errors": errors,
+            "requests_per_second": len(latencies) / elapsed,
+            "mean_ms": sum(latencies) / len(latencies) * 1000,
+            **{f"p{pct}_ms": percentile(latencies, pct) * 1000 for pct in PERCENTILES},
+            "statuses": {str(status): count for status, count in statuses.items()},
+        }
+    total = sum(stats["requests"] for stats in endpoints.values())
+    return {"elapsed_seconds": elapsed, "requests_per_second": total / elapsed, "endpoints": endpoints}
+
+def print_report(report: dict):
+    print(f"{'endpoint':12s} {'requests':>9s} {'errors':>7s} {'req/s':>9s} "
+          + " ".join(f"{f'p{pct} ms':>9s}" for pct in PERCENTILES))
+    for endpoint, stats in report["endpoints"].items():
+        print(f"{endpoint:12s} {stats['requests']:9d} {stats['errors']:7d} {stats['requests_per_second']:9.1f} "
+              + " ".join(f"{stats[f'p{pct}_ms']:9.2f}" for pct in PERCENTILES))
+    print(f"{'total':12s} {'':9s} {'':7s} {report['requests_per_second']:9.1f}")
+
+async def load_test(args, mix: dict) -> dict:
+    import httpx
+
+    users = await seed(args.users, args.batch_size)
+    print(f"Database {args.db} has {users} users", flush=True)
+
+    server = start_server(args.port, args.workers, args.verbose)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", limits=limits, timeout=60) as client:
+            await wait_until_ready(client, server)
+            admin_token = await login(client, ADMIN_USERNAME, ADMIN_PASSWORD)
+            generator = LoadGenerator(client, args.users, admin_token, args.seed)
+            if args.warmup:
+                await generator.run(mix, args.concurrency, args.warmup, record=False)
+            elapsed = await generator.run(mix, args.concurrency, args.duration)
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            server.kill()
+    return build_report(generator, elapsed)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10000, help="Synthetic users in the database")
+    parser.add_argument("--db", default=os.path.join(WORK_DIR, "loadtest.db"),
+                        help="SQLite file; an existing file with enough users is reused")
+    parser.add_argument("--batch-size", type=int, default=10000, help="Users per bulk insert while seeding")
+    parser.add_argument("--workers", type=int, default=1, help="app.server worker processes")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent client connections")
+    parser.add_argument("--duration", type=float, default=30.0, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=3.0, help="Unmeasured seconds before the run")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help="Endpoint weights (default: %(default)s)")
+    parser.add_argument("--rate-limit", type=int, default=10 ** 9, help="Login requests allowed per window")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed of the request sequence")
+    parser.add_argument("--output", help="Write the report as JSON to this file")
+    parser.add_argument("--verbose", action="store_true", help="Show the server output")
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.abspath(args.db)}"
+    os.environ["RATE_LIMIT_MAX_REQUESTS"] = str(args.rate_limit)
+
+    report = asyncio.run(load_test(args, args.mix))
+    print_report(report)
+    if args.output:
+        config = {key: value for key, value in vars(args).items() if key not in ("output", "verbose")}
+        with open(args.output, "w") as f:
+            json.dump({"config": config, **report}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
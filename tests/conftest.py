@@ -1,29 +1,40 @@
+import os
+import tempfile
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import NullPool
 from typing import Generator
 
 from app.main import app
-from app.common.database import Base, get_db
+from app.common.database import Base, configure_sqlite, get_db, to_async_url
 from app.crud import crud
 from app.schemas.users_schemas import UserCreate, UserRole
 from app.auth import create_access_token
+from app.common.token_cache import token_cache, token_versions
 
-# Use in-memory SQLite for testing
-SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+# Use a throwaway SQLite file for testing, so that the sync session used by
+# fixtures and the async session used by the app see the same data
+SQLALCHEMY_DATABASE_URL = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}"
 
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
     connect_args={"check_same_thread": False},
-    poolclass=StaticPool,
 )
+configure_sqlite(engine)
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = create_async_engine(to_async_url(SQLALCHEMY_DATABASE_URL), poolclass=NullPool)
+configure_sqlite(async_engine.sync_engine)
+TestingAsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
 @pytest.fixture(scope="function")
 def db() -> Generator:
     Base.metadata.create_all(bind=engine)
+    token_cache.clear()
+    token_versions.clear()
     db = TestingSessionLocal()
     try:
         yield db
@@ -33,11 +44,9 @@ def db() -> Generator:
 
 @pytest.fixture(scope="function")
 def client(db) -> Generator:
-    def override_get_db():
-        try:
-            yield db
-        finally:
-            db.close()
+    async def override_get_db():
+        async with TestingAsyncSessionLocal() as async_db:
+            yield async_db
     
     app.dependency_overrides[get_db] = override_get_db
     with TestClient(app) as test_client:
@@ -66,4 +75,18 @@ def normal_user(db) -> dict:
     )
     db_user = crud.create_user(db, user)
     token = create_access_token({"sub": db_user.username})
-    return {"user": db_user, "token": token}
\ No newline at end of file
+    return {"user": db_user, "token": token}
+
+@pytest.fixture(scope="function")
+def sql_statements() -> Generator:
+    """
+    Collects every SQL statement the app's (async) engine sends to the database.
+    """
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(async_engine.sync_engine, "before_cursor_execute", record)
@@ -20,3 +20,31 @@ def test_decode_access_token():
 def test_decode_access_token_invalid():
     with pytest.raises(ValueError):
         decode_access_token("invalid_token")
+
+async def test_password_pool_hash_and_verify():
+    from app.common import password_pool
+    hashed = await password_pool.hash_password("secret123")
+    assert hashed != "secret123"
+    assert await password_pool.verify_password("secret123", hashed)
+    assert not await password_pool.verify_password("wrong", hashed)
+
+async def test_password_pool_bulk_leaves_a_worker_free(monkeypatch):
+    from fastapi import HTTPException
+    from app.common import password_pool
+    monkeypatch.setattr(password_pool.settings, "PASSWORD_HASH_WORKERS", 4)
+    chunks = []
+
+    async def run(fn, passwords):
+        chunks.append(passwords)
+        return passwords
+
+    monkeypatch.setattr(password_pool, "_run", run)
+    assert await password_pool.hash_passwords([str(i) for i in range(10)]) == [str(i) for i in range(10)]
+    assert len(chunks) == password_pool.bulk_slots() == 3
+
+    # Another bulk job running: no more workers for this one, but logins still fit
+    monkeypatch.setattr(password_pool, "_bulk_pending", password_pool.bulk_slots())
+    with pytest.raises(HTTPException) as exc:
+        await password_pool.hash_passwords(["a", "b"])
+    assert exc.value.status_code == 503
+    assert password_pool._pending + 1 <= password_pool.capacity()
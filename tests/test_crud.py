@@ -0,0 +1,23 @@
+from app.crud import async_crud
+from app.schemas.users_schemas import UserRole
+from tests.conftest import TestingAsyncSessionLocal
+
+async def test_bulk_insert_users_reports_conflicting_rows(db, normal_user):
+    rows = [
+        {"username": "bulk1", "email": "bulk1@example.com", "password": "x", "role": UserRole.user},
+        {"username": "testuser", "email": "bulk2@example.com", "password": "x", "role": UserRole.user},
+        {"username": "bulk3", "email": "bulk3@example.com", "password": "x", "role": UserRole.user},
+    ]
+    async with TestingAsyncSessionLocal() as async_db:
+        errors = await async_crud.bulk_insert_users(async_db, rows)
+        assert [index for index, _ in errors] == [1]
+        assert await async_crud.get_user_by_username(async_db, "bulk1") is not None
+        assert await async_crud.get_user_by_username(async_db, "bulk3") is not None
+
+async def test_find_existing_users(db, normal_user):
+    async with TestingAsyncSessionLocal() as async_db:
+        usernames, emails = await async_crud.find_existing_users(
+            async_db, ["testuser", "nobody"], ["test@example.com", "nobody@example.com"]
+        )
+    assert usernames == {"testuser"}
+    assert emails == {"test@example.com"}
@@ -1,10 +1,21 @@
+import multiprocessing
+import time
 import pytest
 from fastapi import HTTPException
+from sqlalchemy import update
+from app.auth import create_access_token
+from app.common.config import settings
+from app.common.token_cache import Principal, TokenCache, TokenVersion, TokenVersions, UserEpochs, token_cache, token_versions, user_epochs
+from app.crud import async_crud
+from app.models.users_models import User
+from app.schemas.token import TokenData
 from app.dependencies import get_current_user, get_current_admin_user
-from app.schemas.users_schemas import UserRole
+from app.schemas.users_schemas import UserRole, UserUpdate
+from tests.conftest import TestingAsyncSessionLocal
 
 async def test_get_current_user_valid_token(db, normal_user):
-    user = await get_current_user(normal_user["token"], db)
+    async with TestingAsyncSessionLocal() as async_db:
+        user = await get_current_user(normal_user["token"], async_db)
     assert user.username == normal_user["user"].username
 
 async def test_get_current_admin_user_success(db, admin_user):
@@ -14,4 +25,166 @@ async def test_get_current_admin_user_success(db, admin_user):
 async def test_get_current_admin_user_unauthorized(db, normal_user):
     with pytest.raises(HTTPException) as exc:
         await get_current_admin_user(normal_user["user"])
-    assert exc.value.status_code == 403
\ No newline at end of file
+    assert exc.value.status_code == 403
+
+async def test_get_current_user_cached(db, normal_user):
+    async with TestingAsyncSessionLocal() as async_db:
+        first = await get_current_user(normal_user["token"], async_db)
+    hits = token_cache.hits
+    # A cache hit must not touch the database at all
+    second = await get_current_user(normal_user["token"], None)
+    assert second == first
+    assert token_cache.hits == hits + 1
+
+async def test_get_current_user_cache_invalidated_on_delete(db, admin_user, normal_user):
+    async with TestingAsyncSessionLocal() as async_db:
+        await get_current_user(normal_user["token"], async_db)
+        await async_crud.delete_user(async_db, normal_user["user"].id, UserRole.admin)
+        with pytest.raises(HTTPException) as exc:
+            await get_current_user(normal_user["token"], async_db)
+    assert exc.value.status_code == 401
+
+async def test_get_current_user_invalid_token(db):
+    with pytest.raises(HTTPException) as exc:
+        await get_current_user("invalid_token", None)
+    assert exc.value.status_code == 401
+
+def test_token_cache_entry_expires_with_token():
+    epochs = UserEpochs(16)
+    cache = TokenCache(max_size=10, ttl=3600, epochs=epochs)
+    principal = Principal(id=1, username="testuser", role=UserRole.user)
+    cache.put("expired", TokenData(username="testuser", exp=int(time.time()) - 1), principal, epochs.generation())
+    assert cache.get("expired") is None
+    assert cache.stats()["misses"] == 1
+
+def test_token_cache_evicts_least_recently_used():
+    epochs = UserEpochs(16)
+    cache = TokenCache(max_size=2, ttl=3600, epochs=epochs)
+    for user_id in (1, 2):
+        cache.put(f"token{user_id}", TokenData(username=f"user{user_id}"), Principal(user_id, f"user{user_id}", UserRole.user), epochs.generation())
+    cache.get("token1")
+    cache.put("token3", TokenData(username="user3"), Principal(3, "user3", UserRole.user), epochs.generation())
+    assert cache.get("token2") is None
+    assert cache.get("token1") is not None
+
+def test_token_cache_invalidated_across_caches():
+    # Two workers' caches over the same shared counters: a change handled by
+    # one of them is seen by the other at once, not after the TTL
+    epochs = UserEpochs(16)
+    worker_a, worker_b = (TokenCache(max_size=10, ttl=3600, epochs=epochs) for _ in range(2))
+    for cache in (worker_a, worker_b):
+        cache.put("token1", TokenData(username="user1"), Principal(1, "user1", UserRole.admin), epochs.generation())
+        cache.put("token2", TokenData(username="user2"), Principal(2, "user2", UserRole.user), epochs.generation())
+
+    epochs.bump(1)
+    worker_a.invalidate_user(1)
+    assert worker_b.get("token1") is None
+    assert worker_b.get("token2") is not None
+
+def test_token_cache_skips_user_changed_during_load():
+    epochs = UserEpochs(16)
+    cache = TokenCache(max_size=10, ttl=3600, epochs=epochs)
+    generation = epochs.generation()
+    # Another worker commits a change while the user is being loaded
+    epochs.bump(5)
+    cache.put("token", TokenData(username="user1"), Principal(1, "user1", UserRole.user), generation)
+    assert cache.get("token") is None
+
+async def test_token_cache_invalidated_by_other_process(db, normal_user):
+    async with TestingAsyncSessionLocal() as async_db:
+        await get_current_user(normal_user["token"], async_db)
+    assert token_cache.get(normal_user["token"]) is not None
+
+    worker = multiprocessing.get_context("fork").Process(target=user_epochs.bump, args=(normal_user["user"].id,))
+    worker.start()
+    worker.join()
+    assert token_cache.get(normal_user["token"]) is None
+
+def _claims_token(user) -> str:
+    return create_access_token({"sub": user.username, "role": user.role, "uid": user.id, "tv": user.version})
+
+async def test_stateless_auth_skips_database(db, admin_user, monkeypatch):
+    monkeypatch.setattr(settings, "AUTH_STATELESS", True)
+    user = admin_user["user"]
+    token_versions.put(user.id, TokenVersion(user.version, user.username), user_epochs.generation())
+    # No session at all: the claims and the version map are enough
+    principal = await get_current_user(_claims_token(user), None)
+    assert principal == Principal(user.id, user.username, UserRole.admin)
+
+async def test_stateless_auth_reads_unknown_version_once(db, normal_user, monkeypatch):
+    monkeypatch.setattr(settings, "AUTH_STATELESS", True)
+    user = normal_user["user"]
+    async with TestingAsyncSessionLocal() as async_db:
+        await get_current_user(_claims_token(user), async_db)
+    assert token_versions.get(user.id) == TokenVersion(user.version, user.username)
+
+async def test_stateless_auth_revoked_by_update_and_delete(db, admin_user, normal_user, monkeypatch):
+    monkeypatch.setattr(settings, "AUTH_STATELESS", True)
+    user = normal_user["user"]
+    token = _claims_token(user)
+    async with TestingAsyncSessionLocal() as async_db:
+        await get_current_user(token, async_db)
+        await async_crud.update_user(async_db, user.id, UserUpdate(username=None, email=None, password=None, role=UserRole.admin), UserRole.admin)
+        with pytest.raises(HTTPException) as exc:
+            await get_current_user(token, async_db)
+        assert exc.value.status_code == 401
+
+        db.refresh(user)
+        token = _claims_token(user)
+        assert (await get_current_user(token, async_db)).role == UserRole.admin
+        await async_crud.delete_user(async_db, user.id, UserRole.admin)
+        with pytest.raises(HTTPException):
+            await get_current_user(token, async_db)
+
+async def test_stateless_auth_rejects_reused_user_id(db, normal_user, monkeypatch):
+    monkeypatch.setattr(settings, "AUTH_STATELESS", True)
+    user = normal_user["user"]
+    token = create_access_token({"sub": "deleted-user", "role": "admin", "uid": user.id, "tv": user.version})
+    async with TestingAsyncSessionLocal() as async_db:
+        with pytest.raises(HTTPException):
+            await get_current_user(token, async_db)
+
+async def test_stateless_auth_checks_version_on_cache_hit(db, normal_user, monkeypatch):
+    monkeypatch.setattr(settings, "AUTH_STATELESS", True)
+    user = normal_user["user"]
+    token = _claims_token(user)
+    async with TestingAsyncSessionLocal() as async_db:
+        await get_current_user(token, async_db)
+        assert token_cache.get(token) is not None
+
+        # Changed outside the app: noticed once the known version expires,
+        # even though the token itself is still cached
+        db.execute(update(User).where(User.id == user.id).values(version=User.version + 1))
+        db.commit()
+        token_versions.clear()
+        with pytest.raises(HTTPException) as exc:
+            await get_current_user(token, async_db)
+    assert exc.value.status_code == 401
+
+@pytest.mark.parametrize("role", [None, "superuser"])
+async def test_stateless_auth_rejects_invalid_role(db, normal_user, monkeypatch, role):
+    monkeypatch.setattr(settings, "AUTH_STATELESS", True)
+    user = normal_user["user"]
+    token = create_access_token({"sub": user.username, "role": role, "uid": user.id, "tv": user.version})
+    async with TestingAsyncSessionLocal() as async_db:
+        with pytest.raises(HTTPException) as exc:
+            await get_current_user(token, async_db)
+    assert exc.value.status_code == 401
+    assert exc.value.detail == "Invalid credentials"
+
+def test_token_versions_invalidated_across_workers():
+    epochs = UserEpochs(16)
+    worker_a, worker_b = (TokenVersions(max_size=10, ttl=3600, epochs=epochs) for _ in range(2))
+    for versions in (worker_a, worker_b):
+        versions.put(1, TokenVersion(1, "user1"), epochs.generation())
+
+    epochs.bump(1)
+    worker_a.invalidate_user(1)
+    assert worker_b.get(1) is None
+
+def test_token_versions_expire():
+    epochs = UserEpochs(16)
+    versions = TokenVersions(max_size=10, ttl=-1, epochs=epochs)
+    versions.put(1, TokenVersion(1, "user1"), epochs.generation())
+    assert versions.get(1) is None
+
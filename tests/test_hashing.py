@@ -0,0 +1,37 @@
+import pytest
+from passlib.context import CryptContext
+from app.common import hashing
+from app.common.config import settings
+
+def _context(**update) -> CryptContext:
+    return CryptContext(**hashing.context_options(settings.model_copy(update=update)))
+
+def test_context_options_rejects_unknown_scheme():
+    with pytest.raises(ValueError):
+        hashing.context_options(settings.model_copy(update={"PASSWORD_HASH_SCHEME": "md5"}))
+
+def test_cost_change_needs_update():
+    hashed = _context(PASSWORD_BCRYPT_ROUNDS=10).hash("secret")
+    assert _context(PASSWORD_BCRYPT_ROUNDS=11).needs_update(hashed)
+    assert not _context(PASSWORD_BCRYPT_ROUNDS=10).needs_update(hashed)
+
+def test_scheme_change_keeps_old_hashes_valid():
+    hashed = _context(PASSWORD_BCRYPT_ROUNDS=10).hash("secret")
+    argon2_context = _context(PASSWORD_HASH_SCHEME="argon2", PASSWORD_BCRYPT_ROUNDS=10)
+    assert argon2_context.verify("secret", hashed)
+    assert argon2_context.needs_update(hashed)
+
+def test_calibrate_bcrypt_rounds():
+    config = settings.model_copy(update={"PASSWORD_HASH_SCHEME": "bcrypt"})
+    fast = hashing.calibrate(1, config)["PASSWORD_BCRYPT_ROUNDS"]
+    slow = hashing.calibrate(10000, config)["PASSWORD_BCRYPT_ROUNDS"]
+    assert fast == hashing.MIN_BCRYPT_ROUNDS
+    assert slow > fast
+
+def test_apply_calibration_runs_once(monkeypatch):
+    config = settings.model_copy(update={"PASSWORD_HASH_TARGET_MS": 1})
+    monkeypatch.setattr(hashing, "load_policy", lambda options: None)
+    assert hashing.apply_calibration(config)
+    assert config.PASSWORD_BCRYPT_ROUNDS == hashing.MIN_BCRYPT_ROUNDS
+    assert config.PASSWORD_HASH_TARGET_MS == 0
+    assert not hashing.apply_calibration(config)
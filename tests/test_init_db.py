@@ -0,0 +1,76 @@
+import os
+import tempfile
+from sqlalchemy import event, func, select, text, update
+from sqlalchemy.ext.asyncio import create_async_engine
+from app.auth import pwd_context
+from app.common.config import settings
+from app.common.init_db import initialize_database
+from app.common.metrics import app_startup_duration_seconds
+from app.models.schema_models import SchemaVersion
+from app.models.users_models import CollectionVersion, User, UserRole
+
+def _engine():
+    return create_async_engine(f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(), 'init.db')}")
+
+async def _admins(engine):
+    async with engine.connect() as connection:
+        return (await connection.execute(select(User.username, User.password).where(User.role == UserRole.admin))).all()
+
+async def test_initialize_database_creates_schema_and_admin():
+    engine = _engine()
+    assert await initialize_database(engine) is True
+
+    admins = await _admins(engine)
+    assert [admin.username for admin in admins] == [settings.ADMIN_USERNAME]
+    assert admins[0].password == settings.ADMIN_PASSWORD_HASH
+    assert pwd_context.verify("strongpass123", admins[0].password)
+    await engine.dispose()
+
+async def test_initialize_database_skips_ddl_when_current():
+    engine = _engine()
+    await initialize_database(engine)
+
+    statements = []
+    event.listen(engine.sync_engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    assert await initialize_database(engine) is False
+    assert len(statements) == 1
+    assert statements[0].lstrip().upper().startswith("SELECT")
+    await engine.dispose()
+
+async def test_initialize_database_reruns_on_version_change():
+    engine = _engine()
+    await initialize_database(engine)
+    async with engine.begin() as connection:
+        await connection.execute(update(SchemaVersion).values(version="outdated"))
+
+    assert await initialize_database(engine) is True
+    assert len(await _admins(engine)) == 1
+    async with engine.connect() as connection:
+        assert await connection.scalar(select(func.count()).select_from(SchemaVersion)) == 1
+    await engine.dispose()
+
+async def test_initialize_database_upgrades_baseline_schema():
+    # The users table as created before the version column and the triggers
+    engine = _engine()
+    async with engine.begin() as connection:
+        await connection.execute(text(
+            "CREATE TABLE users (id INTEGER PRIMARY KEY, username VARCHAR, email VARCHAR, "
+            "password VARCHAR, role VARCHAR(5))"
+        ))
+        await connection.execute(text(
+            "INSERT INTO users (username, email, password, role) VALUES ('old', 'old@example.com', 'x', 'user')"
+        ))
+
+    assert await initialize_database(engine) is True
+    async with engine.begin() as connection:
+        assert await connection.scalar(select(User.version).where(User.username == "old")) == 1
+        collection_version = select(CollectionVersion.version).where(CollectionVersion.name == "users")
+        before = await connection.scalar(collection_version)
+        await connection.execute(update(User).where(User.username == "old").values(email="new@example.com"))
+        assert await connection.scalar(collection_version) == before + 1
+    await engine.dispose()
+
+def test_startup_duration_recorded(client, admin_user):
+    assert app_startup_duration_seconds.value("startup") > 0
+    assert app_startup_duration_seconds.value("import") > 0
+    assert 'app_startup_duration_seconds{phase="startup"}' in client.get("/metrics", params={"token": admin_user["token"]}).text
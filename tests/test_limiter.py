@@ -0,0 +1,99 @@
+import asyncio
+import multiprocessing
+import fakeredis
+import pytest
+from app.common.limiter import RedisLimiterBackend, SharedMemoryLimiterBackend, SlidingWindowLimiter
+
+def test_limiter_blocks_after_limit():
+    limiter = SlidingWindowLimiter(limit=3, window=60, max_clients=10)
+    assert [limiter.hit("1.1.1.1", now=0) for _ in range(4)] == [True, True, True, False]
+    assert limiter.hit("2.2.2.2", now=0)
+
+def test_limiter_weights_previous_window():
+    limiter = SlidingWindowLimiter(limit=4, window=60, max_clients=10)
+    for _ in range(4):
+        assert limiter.hit("1.1.1.1", now=59)
+    # Halfway through the next window half of the previous count still applies
+    assert limiter.hit("1.1.1.1", now=90)
+    assert limiter.hit("1.1.1.1", now=90)
+    assert not limiter.hit("1.1.1.1", now=90)
+    # Two windows later the old requests no longer count
+    assert limiter.hit("1.1.1.1", now=185)
+
+def test_limiter_caps_tracked_clients():
+    limiter = SlidingWindowLimiter(limit=1, window=60, max_clients=2)
+    limiter.hit("1.1.1.1", now=0)
+    limiter.hit("2.2.2.2", now=0)
+    limiter.hit("3.3.3.3", now=0)
+    assert len(limiter) == 2
+    # The evicted client starts from a clean slate
+    assert limiter.hit("1.1.1.1", now=0)
+
+def test_limiter_sweep_evicts_idle_clients():
+    limiter = SlidingWindowLimiter(limit=5, window=60, max_clients=10)
+    limiter.hit("idle", now=0)
+    limiter.hit("active", now=125)
+    assert limiter.sweep(now=130) == 1
+    assert len(limiter) == 1
+
+async def test_redis_backend_shares_limit_across_workers():
+    server = fakeredis.FakeServer()
+    workers = [
+        RedisLimiterBackend(fakeredis.FakeAsyncRedis(server=server), limit=3, window=60)
+        for _ in range(2)
+    ]
+    results = [await workers[i % 2].hit("1.1.1.1", now=0) for i in range(4)]
+    assert results == [True, True, True, False]
+    assert await workers[0].hit("2.2.2.2", now=0)
+
+async def test_redis_backend_weights_previous_window():
+    backend = RedisLimiterBackend(fakeredis.FakeAsyncRedis(), limit=4, window=60)
+    for _ in range(4):
+        assert await backend.hit("1.1.1.1", now=59)
+    assert await backend.hit("1.1.1.1", now=90)
+    assert await backend.hit("1.1.1.1", now=90)
+    assert not await backend.hit("1.1.1.1", now=90)
+
+@pytest.fixture
+def shm_backend():
+    backend = SharedMemoryLimiterBackend(limit=3, window=60, max_clients=64)
+    yield backend
+    backend.unlink()
+
+def _hit_in_child(backend, key, results):
+    results.put(asyncio.run(backend.hit(key, now=0)))
+
+async def test_shm_backend_shares_limit_with_forked_workers(shm_backend):
+    assert await shm_backend.hit("1.1.1.1", now=0)
+    assert await shm_backend.hit("1.1.1.1", now=0)
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    for _ in range(2):
+        worker = context.Process(target=_hit_in_child, args=(shm_backend, "1.1.1.1", results))
+        worker.start()
+        worker.join()
+    assert [results.get(), results.get()] == [True, False]
+    assert not await shm_backend.hit("1.1.1.1", now=0)
+    assert await shm_backend.hit("2.2.2.2", now=0)
+
+async def test_shm_backend_weights_previous_window():
+    backend = SharedMemoryLimiterBackend(limit=4, window=60, max_clients=64)
+    try:
+        for _ in range(4):
+            assert await backend.hit("1.1.1.1", now=59)
+        assert await backend.hit("1.1.1.1", now=90)
+        assert await backend.hit("1.1.1.1", now=90)
+        assert not await backend.hit("1.1.1.1", now=90)
+        assert await backend.hit("1.1.1.1", now=185)
+    finally:
+        backend.unlink()
+
+async def test_shm_backend_is_bounded(shm_backend):
+    # Far more clients than slots: the table evicts instead of growing
+    for n in range(1000):
+        await shm_backend.hit(f"10.0.{n // 256}.{n % 256}", now=0)
+    assert len(shm_backend._shm.buf) == 64 * SharedMemoryLimiterBackend.SLOT.size
+    # A client idle for two windows starts from a clean slate
+    for _ in range(3):
+        await shm_backend.hit("1.1.1.1", now=0)
+    assert await shm_backend.hit("1.1.1.1", now=130)
@@ -0,0 +1,46 @@
+import json
+import logging
+import logging.handlers
+import queue
+from app.common.logging_config import JsonFormatter, LazyQueueHandler, SamplingFilter
+
+def make_record(level=logging.INFO, **extra):
+    record = logging.LogRecord("app_logger", level, __file__, 1, "User %s did %s", ("alice", "things"), None)
+    for key, value in extra.items():
+        setattr(record, key, value)
+    return record
+
+def test_json_formatter():
+    entry = json.loads(JsonFormatter().format(make_record(user_id=7)))
+    assert entry["message"] == "User alice did things"
+    assert entry["level"] == "INFO"
+    assert entry["logger"] == "app_logger"
+    assert entry["user_id"] == 7
+
+def test_sampling_filter():
+    drop_info = SamplingFilter({"info": 0.0})
+    assert not drop_info.filter(make_record(sampled=True))
+    assert drop_info.filter(make_record())
+    assert drop_info.filter(make_record(level=logging.WARNING, sampled=True))
+    assert SamplingFilter({}).filter(make_record(sampled=True))
+
+def test_queue_handler_formats_on_listener(tmp_path):
+    log_queue = queue.SimpleQueue()
+    test_logger = logging.getLogger("test_queue_handler")
+    test_logger.propagate = False
+    test_logger.addHandler(LazyQueueHandler(log_queue))
+    test_logger.warning("Value %d", 42)
+
+    # The record is queued with its arguments unmerged
+    queued = log_queue.get_nowait()
+    assert queued.args == (42,)
+    log_queue.put(queued)
+
+    log_file = tmp_path / "app.log"
+    file_handler = logging.FileHandler(log_file)
+    file_handler.setFormatter(JsonFormatter())
+    listener = logging.handlers.QueueListener(log_queue, file_handler)
+    listener.start()
+    listener.stop()
+    file_handler.close()
+    assert json.loads(log_file.read_text())["message"] == "Value 42"
@@ -0,0 +1,84 @@
+import json
+import pytest
+from fastapi import status
+from app.common import metrics
+from app.common.config import settings
+from app.common.metrics import Counter, Gauge, Histogram, Registry, http_requests_total
+
+def test_histogram_exposition():
+    registry = Registry()
+    histogram = registry.register(Histogram("latency_seconds", "Latency.", ("route",), buckets=(0.1, 1.0)))
+    histogram.observe(0.05, "/a")
+    histogram.observe(0.5, "/a")
+    histogram.observe(5, "/a")
+    text = registry.render()
+    assert '# TYPE latency_seconds histogram' in text
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{route="/a",le="1.0"} 2' in text
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 3' in text
+    assert 'latency_seconds_count{route="/a"} 3' in text
+
+def test_counter_exposition():
+    registry = Registry()
+    counter = registry.register(Counter("requests_total", "Requests.", ("status",)))
+    counter.inc("200")
+    counter.inc("200")
+    assert 'requests_total{status="200"} 2' in registry.render()
+
+def test_render_merges_worker_snapshots(tmp_path):
+    # The same metrics in two worker processes
+    workers = []
+    for requests, startup in ((2, 0.5), (3, 0.25)):
+        registry = Registry()
+        counter = registry.register(Counter("requests_total", "Requests.", ("status",)))
+        histogram = registry.register(Histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0)))
+        gauge = registry.register(Gauge("startup_seconds", "Startup."))
+        for _ in range(requests):
+            counter.inc(200)
+            histogram.observe(0.05)
+        gauge.set(startup)
+        workers.append(registry)
+    for index, registry in enumerate(workers):
+        (tmp_path / f"{index}{metrics.SNAPSHOT_SUFFIX}").write_text(json.dumps(registry.snapshot()))
+
+    text = workers[0].render(metrics.read_snapshots(str(tmp_path)))
+    assert 'requests_total{status="200"} 5' in text
+    assert 'latency_seconds_bucket{le="0.1"} 5' in text
+    assert "latency_seconds_count 5" in text
+    assert "startup_seconds 0.5" in text
+
+def test_metrics_endpoint_merges_snapshots(client, admin_user, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_MULTIPROC_DIR", str(tmp_path))
+    other = Registry()
+    other.register(Counter("db_queries_total", "Queries.", ("engine",))).inc("other-worker", amount=7)
+    (tmp_path / f"other{metrics.SNAPSHOT_SUFFIX}").write_text(json.dumps(other.snapshot()))
+
+    response = client.get("/metrics", params={"token": admin_user["token"]})
+    assert 'db_queries_total{engine="other-worker"} 7' in response.text
+    # This worker's own snapshot was written for the scrape
+    assert len(metrics.read_snapshots(str(tmp_path))) == 2
+
+def test_metrics_endpoint_requires_admin(client, normal_user):
+    assert client.get("/metrics").status_code == status.HTTP_401_UNAUTHORIZED
+    response = client.get("/metrics", params={"token": normal_user["token"]})
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+@pytest.mark.parametrize("authorization, expected", [
+    ("Bearer scrape-secret", status.HTTP_200_OK),
+    ("Bearer wrong", status.HTTP_401_UNAUTHORIZED),
+])
+def test_metrics_endpoint_scrape_token(client, monkeypatch, authorization, expected):
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "scrape-secret")
+    assert client.get("/metrics", headers={"Authorization": authorization}).status_code == expected
+
+def test_metrics_endpoint_records_route_template(client, admin_user, normal_user):
+    before = http_requests_total.value("GET", "/users/{user_id}", 200)
+    client.get(f"/users/{normal_user['user'].id}", params={"token": normal_user["token"]})
+    assert http_requests_total.value("GET", "/users/{user_id}", 200) == before + 1
+
+    response = client.get("/metrics", params={"token": admin_user["token"]})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'http_request_duration_seconds_count{method="GET",route="/users/{user_id}"}' in response.text
+    assert "jwt_duration_seconds_count" in response.text
+    assert "token_cache_lookups_total" in response.text
@@ -0,0 +1,20 @@
+from typing import List
+from pydantic import TypeAdapter
+from app.common import serializers
+from app.models.users_models import User, UserRole
+from app.schemas.users_schemas import UserResponse
+
+def test_user_fields_match_response_model():
+    assert serializers.USER_FIELDS == tuple(UserResponse.model_fields)
+
+def test_users_json_matches_response_model():
+    users = [
+        User(id=1, username="alice", email="alice@example.com", password="x", role=UserRole.admin),
+        User(id=2, username="bob", email="bob@example.com", password="x", role=UserRole.user),
+    ]
+    rows = [tuple(getattr(user, field) for field in serializers.USER_FIELDS) for user in users]
+    adapter = TypeAdapter(List[UserResponse])
+
+    assert serializers.users_json(rows) == adapter.dump_json(adapter.validate_python(users, from_attributes=True))
+    assert serializers.user_json(rows[0]) == UserResponse.model_validate(users[0], from_attributes=True).model_dump_json().encode()
+    assert serializers.users_json([]) == b"[]"
@@ -0,0 +1,70 @@
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import httpx
+from app.server import worker_count
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def test_worker_count_defaults_to_cpu_count():
+    assert worker_count(0) == (os.cpu_count() or 1)
+    assert worker_count(3) == 3
+
+def test_server_shares_rate_limit_and_metrics_and_stops_gracefully():
+    work_dir = tempfile.mkdtemp()
+    port = _free_port()
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{os.path.join(work_dir, 'server.db')}",
+        "LOG_FILE_PATH": os.path.join(work_dir, "app.log"),
+        "RATE_LIMIT_BACKEND": "memory",
+        "RATE_LIMIT_MAX_REQUESTS": "3",
+        "METRICS_TOKEN": "scrape-secret",
+        "METRICS_SNAPSHOT_INTERVAL": "0.2",
+    }
+    scrape = {"Authorization": "Bearer scrape-secret"}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "app.server", "--host", "127.0.0.1", "--port", str(port), "--workers", "2"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/metrics", headers=scrape).status_code == 200:
+                    break
+            except httpx.TransportError:
+                pass
+            assert time.monotonic() < deadline, "server did not start"
+            time.sleep(0.2)
+
+        # A new connection per request, so that both workers get some of them
+        statuses = [
+            httpx.post(f"http://127.0.0.1:{port}/login", json={"username": "nobody", "password": "x"}).status_code
+            for _ in range(4)
+        ]
+        assert statuses == [401, 401, 401, 429]
+
+        # Whichever worker answers the scrape reports the requests of both
+        expected = ['http_requests_total{method="POST",route="/login",status="401"} 3',
+                    'http_requests_total{method="POST",route="/login",status="429"} 1']
+        deadline = time.monotonic() + 10
+        while True:
+            text = httpx.get(f"http://127.0.0.1:{port}/metrics", headers=scrape).text
+            if all(line in text for line in expected):
+                break
+            assert time.monotonic() < deadline, text
+            time.sleep(0.2)
+
+        server.send_signal(signal.SIGTERM)
+        assert server.wait(timeout=30) == 0
+    finally:
+        if server.poll() is None:
+            server.kill()
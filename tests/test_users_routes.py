@@ -1,5 +1,7 @@
 import pytest
 from fastapi import status
+from app.auth import create_access_token
+from app.crud import crud
 from app.schemas.users_schemas import UserCreate, UserRole
 
 def test_register_user_success(client, admin_user):
@@ -86,4 +88,571 @@ def test_get_user_unauthorized_access(client, normal_user, admin_user):
         f"/users/{admin_user['user'].id}",
         params={"token": normal_user["token"]}
     )
-    assert response.status_code == status.HTTP_403_FORBIDDEN
\ No newline at end of file
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+def _create_users(db, count):
+    from app.crud import crud
+    for i in range(count):
+        crud.create_user(db, UserCreate(
+            username=f"user{i}",
+            email=f"user{i}@example.com",
+            password="pass123",
+            role=UserRole.user
+        ))
+
+def test_get_users_keyset_pagination(client, db, admin_user):
+    _create_users(db, 4)
+    seen = []
+    params = {"token": admin_user["token"], "limit": 2}
+    while True:
+        response = client.get("/users", params=params)
+        assert response.status_code == status.HTTP_200_OK
+        page = response.json()
+        assert len(page) <= 2
+        seen.extend(user["id"] for user in page)
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+        params["after"] = cursor
+    assert seen == sorted(seen)
+    assert len(seen) == 5
+
+def test_get_users_invalid_cursor(client, admin_user):
+    response = client.get(
+        "/users",
+        params={"token": admin_user["token"], "after": "not-a-cursor"}
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+def test_get_users_stream(client, db, admin_user):
+    _create_users(db, 3)
+    response = client.get(
+        "/users",
+        params={"token": admin_user["token"], "stream": True}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert [user["username"] for user in data] == ["admin", "user0", "user1", "user2"]
+    assert all("password" not in user for user in data)
+
+def _create_filter_users(db):
+    from sqlalchemy import insert
+    from app.models.users_models import User
+    db.execute(insert(User), [
+        {"username": "alice", "email": "alice@Acme.com", "password": "x", "role": UserRole.admin},
+        {"username": "albert", "email": "albert@other.org", "password": "x", "role": UserRole.user},
+        {"username": "bob", "email": "bob@acme.com", "password": "x", "role": UserRole.user},
+        {"username": "alf", "email": "alf@acme.com", "password": "x", "role": UserRole.user},
+    ])
+    db.commit()
+
+@pytest.mark.parametrize("filters, expected", [
+    ({"role": "admin"}, ["admin", "alice"]),
+    ({"username_prefix": "al"}, ["alice", "albert", "alf"]),
+    ({"email_domain": "ACME.com"}, ["alice", "bob", "alf"]),
+    ({"email_domain": "acme.com", "role": "user"}, ["bob", "alf"]),
+    ({"min_id": 3, "max_id": 4}, ["albert", "bob"]),
+])
+def test_get_users_filters(client, db, admin_user, filters, expected):
+    _create_filter_users(db)
+    response = client.get("/users", params={"token": admin_user["token"], **filters})
+    assert response.status_code == status.HTTP_200_OK
+    assert [user["username"] for user in response.json()] == expected
+
+    response = client.get("/users", params={"token": admin_user["token"], "stream": True, **filters})
+    assert [user["username"] for user in response.json()] == expected
+
+def test_get_users_filters_paginate(client, db, admin_user):
+    _create_filter_users(db)
+    response = client.get("/users", params={"token": admin_user["token"], "email_domain": "acme.com", "limit": 2})
+    assert [user["username"] for user in response.json()] == ["alice", "bob"]
+    assert "email_domain=acme.com" in response.headers["Link"]
+
+    response = client.get("/users", params={
+        "token": admin_user["token"], "email_domain": "acme.com", "limit": 2, "after": response.headers["X-Next-Cursor"]
+    })
+    assert [user["username"] for user in response.json()] == ["alf"]
+
+@pytest.mark.parametrize("filters, index", [
+    ({"role": "admin"}, "ix_users_role_id"),
+    ({"username_prefix": "al"}, "ix_users_username"),
+    ({"email_domain": "acme.com"}, "ix_users_email_domain_id"),
+    ({"min_id": 2, "max_id": 10}, "INTEGER PRIMARY KEY"),
+])
+def test_get_users_filters_use_index(db, filters, index):
+    from sqlalchemy import text
+    from sqlalchemy.dialects import sqlite
+    from app.common.serializers import USER_FIELDS
+    from app.crud.async_crud import users_page_query
+    from app.schemas.users_schemas import UserFilter
+
+    query = users_page_query(USER_FIELDS, 100, after_id=1, filters=UserFilter(**filters))
+    sql = str(query.compile(dialect=sqlite.dialect(), compile_kwargs={"literal_binds": True}))
+    plan = " ".join(row[-1] for row in db.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+    assert index in plan
+    assert "SCAN" not in plan
+
+def test_login_password_pool_saturated(client, normal_user, monkeypatch):
+    from app.common import password_pool
+    monkeypatch.setattr(password_pool, "_pending", password_pool.capacity())
+    response = client.post(
+        "/login",
+        json={
+            "username": "testuser",
+            "password": "test123"
+        }
+    )
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response.headers["Retry-After"] == "1"
+
+def test_login_rate_limited(client, monkeypatch):
+    from app.common import limiter
+    monkeypatch.setattr(limiter, "backend", limiter.MemoryLimiterBackend(limit=2, window=60, max_clients=10))
+    statuses = [
+        client.post("/login", json={"username": "nobody", "password": "wrong"}).status_code
+        for _ in range(3)
+    ]
+    assert statuses == [
+        status.HTTP_401_UNAUTHORIZED,
+        status.HTTP_401_UNAUTHORIZED,
+        status.HTTP_429_TOO_MANY_REQUESTS
+    ]
+
+def test_import_users_ndjson(client, admin_user, normal_user):
+    body = "\n".join([
+        '{"username": "bulk1", "email": "bulk1@example.com", "password": "pass123", "role": "user"}',
+        '{"username": "bulk2", "email": "bulk2@example.com", "password": "pass123", "role": "admin"}',
+        '{"username": "testuser", "email": "other@example.com", "password": "pass123", "role": "user"}',
+        '{"username": "bulk1", "email": "bulk1b@example.com", "password": "pass123", "role": "user"}',
+        '{"username": "bulk3", "email": "not-an-email", "password": "pass123", "role": "user"}',
+        'not json',
+    ])
+    response = client.post(
+        "/users/import",
+        content=body,
+        headers={"Content-Type": "application/x-ndjson"},
+        params={"token": admin_user["token"]}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["inserted"] == 2
+    assert [error["line"] for error in data["errors"]] == [3, 4, 5, 6]
+
+    response = client.get("/users", params={"token": admin_user["token"]})
+    assert {"bulk1", "bulk2"} <= {user["username"] for user in response.json()}
+
+def test_import_users_csv(client, admin_user):
+    body = "username,email,password,role\nbulk1,bulk1@example.com,pass123,user\nbulk2,bulk2@example.com,pass123\n"
+    response = client.post(
+        "/users/import",
+        content=body,
+        headers={"Content-Type": "text/csv"},
+        params={"token": admin_user["token"]}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {
+        "inserted": 1,
+        "errors": [{"line": 3, "error": "Expected 4 fields, got 3"}]
+    }
+
+def test_import_users_reports_rows_when_pool_busy(client, admin_user, monkeypatch):
+    from app.common import password_pool
+    monkeypatch.setattr(password_pool, "_bulk_pending", password_pool.bulk_slots())
+    body = "username,email,password,role\nbulk1,bulk1@example.com,pass123,user\nbulk2,bulk2@example.com,pass123,user\n"
+    response = client.post(
+        "/users/import",
+        content=body,
+        headers={"Content-Type": "text/csv"},
+        params={"token": admin_user["token"]}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {
+        "inserted": 0,
+        "errors": [{"line": 2, "error": "Server busy, not imported"}, {"line": 3, "error": "Server busy, not imported"}]
+    }
+
+def test_import_users_unsupported_media_type(client, admin_user):
+    response = client.post(
+        "/users/import",
+        content="[]",
+        headers={"Content-Type": "application/json"},
+        params={"token": admin_user["token"]}
+    )
+    assert response.status_code == status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+
+def test_import_users_requires_admin(client, normal_user):
+    response = client.post(
+        "/users/import",
+        content="",
+        headers={"Content-Type": "text/csv"},
+        params={"token": normal_user["token"]}
+    )
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+def test_export_users_ndjson(client, admin_user, normal_user):
+    import json
+    response = client.get("/users/export", params={"token": admin_user["token"]})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["username"] for row in rows] == ["admin", "testuser"]
+    assert set(rows[0]) == {"id", "username", "email", "role"}
+
+def test_export_users_csv_gzip(client, admin_user, normal_user):
+    import gzip
+    response = client.get(
+        "/users/export",
+        params={"token": admin_user["token"], "format": "csv", "gzip": True}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert 'filename="users.csv.gz"' in response.headers["content-disposition"]
+    lines = gzip.decompress(response.content).decode().splitlines()
+    assert lines[0] == "username,email,id,role"
+    assert lines[2].startswith("testuser,test@example.com,")
+
+def test_export_users_requires_admin(client, normal_user):
+    response = client.get("/users/export", params={"token": normal_user["token"]})
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+def test_batch_update_users_role(client, db, admin_user):
+    _create_users(db, 3)
+    response = client.get("/users", params={"token": admin_user["token"]})
+    ids = [user["id"] for user in response.json() if user["username"] in ("user0", "user1")]
+    response = client.patch(
+        "/users",
+        json={"where": {"ids": ids}, "role": "admin"},
+        params={"token": admin_user["token"]}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"affected": 2}
+    roles = {user["username"]: user["role"] for user in client.get("/users", params={"token": admin_user["token"]}).json()}
+    assert roles == {"admin": "admin", "user0": "admin", "user1": "admin", "user2": "user"}
+
+def test_batch_update_requires_selection(client, admin_user):
+    response = client.patch(
+        "/users",
+        json={"where": {}, "role": "admin"},
+        params={"token": admin_user["token"]}
+    )
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+def test_batch_delete_users_by_role(client, db, admin_user):
+    _create_users(db, 3)
+    response = client.post(
+        "/users/delete",
+        json={"role": "user"},
+        params={"token": admin_user["token"]}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"affected": 3}
+    usernames = [user["username"] for user in client.get("/users", params={"token": admin_user["token"]}).json()]
+    assert usernames == ["admin"]
+
+def test_batch_delete_revokes_cached_tokens(client, admin_user, normal_user):
+    assert client.get(f"/users/{normal_user['user'].id}", params={"token": normal_user["token"]}).status_code == status.HTTP_200_OK
+    client.post("/users/delete", json={"ids": [normal_user["user"].id]}, params={"token": admin_user["token"]})
+    response = client.get(f"/users/{normal_user['user'].id}", params={"token": normal_user["token"]})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+def test_batch_delete_revokes_every_cached_token(client, db, admin_user):
+    _create_users(db, 3)
+    users = [crud.get_user_by_username(db, f"user{i}") for i in range(3)]
+    tokens = {user.id: create_access_token({"sub": user.username, "role": user.role}) for user in users}
+    for user_id, token in tokens.items():
+        assert client.get(f"/users/{user_id}", params={"token": token}).status_code == status.HTTP_200_OK
+
+    response = client.post("/users/delete", json={"ids": list(tokens)}, params={"token": admin_user["token"]})
+    assert response.json() == {"affected": 3}
+    for user_id, token in tokens.items():
+        response = client.get(f"/users/{user_id}", params={"token": token})
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED, user_id
+
+def test_batch_delete_no_match(client, admin_user):
+    response = client.post("/users/delete", json={"ids": [9999]}, params={"token": admin_user["token"]})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"affected": 0}
+
+def _warm_token_cache(client, token):
+    client.get("/users", params={"token": token, "limit": 1})
+
+def test_register_user_statement_count(client, admin_user, sql_statements):
+    _warm_token_cache(client, admin_user["token"])
+    sql_statements.clear()
+    response = client.post(
+        "/register",
+        json={"username": "newuser", "email": "new@example.com", "password": "newpass123", "role": "user"},
+        params={"token": admin_user["token"]}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert len(sql_statements) == 1
+    assert sql_statements[0].startswith("INSERT")
+
+def test_register_user_duplicate_email(client, admin_user, normal_user, sql_statements):
+    _warm_token_cache(client, admin_user["token"])
+    sql_statements.clear()
+    response = client.post(
+        "/register",
+        json={"username": "other", "email": normal_user["user"].email, "password": "newpass123", "role": "user"},
+        params={"token": admin_user["token"]}
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()["detail"] == "Email already registered"
+    assert len(sql_statements) == 1
+
+def test_update_user_statement_count(client, admin_user, normal_user, sql_statements):
+    _warm_token_cache(client, admin_user["token"])
+    sql_statements.clear()
+    response = client.put(
+        f"/users/{normal_user['user'].id}",
+        json={"username": None, "email": "changed@example.com", "password": None, "role": "user"},
+        params={"token": admin_user["token"]}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["email"] == "changed@example.com"
+    assert response.json()["username"] == normal_user["user"].username
+    assert len(sql_statements) == 1
+    assert sql_statements[0].startswith("UPDATE")
+
+def test_update_user_not_found(client, admin_user):
+    response = client.put(
+        "/users/999",
+        json={"username": None, "email": None, "password": None, "role": "user"},
+        params={"token": admin_user["token"]}
+    )
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+def test_delete_user_statement_count(client, admin_user, normal_user, sql_statements):
+    _warm_token_cache(client, admin_user["token"])
+    sql_statements.clear()
+    response = client.delete(f"/users/{normal_user['user'].id}", params={"token": admin_user["token"]})
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    assert len(sql_statements) == 1
+    assert sql_statements[0].startswith("DELETE")
+
+    response = client.delete(f"/users/{normal_user['user'].id}", params={"token": admin_user["token"]})
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+def test_get_user_etag(client, admin_user, normal_user):
+    url = f"/users/{normal_user['user'].id}"
+    params = {"token": admin_user["token"]}
+    response = client.get(url, params=params)
+    etag = response.headers["ETag"]
+    assert etag.startswith('W/"')
+
+    response = client.get(url, params=params, headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response.headers["ETag"] == etag
+    assert response.content == b""
+
+    client.put(url, json={"username": None, "email": "changed@example.com", "password": None, "role": None}, params=params)
+    response = client.get(url, params=params, headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["ETag"] != etag
+
+def test_get_users_etag_skips_rows(client, db, admin_user, sql_statements):
+    _create_users(db, 3)
+    params = {"token": admin_user["token"]}
+    etag = client.get("/users", params=params).headers["ETag"]
+
+    _warm_token_cache(client, admin_user["token"])
+    sql_statements.clear()
+    response = client.get("/users", params=params, headers={"If-None-Match": f'"other", {etag}'})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert len(sql_statements) == 1
+    assert "collection_versions" in sql_statements[0]
+
+@pytest.mark.parametrize("change", ["register", "batch_update", "delete"])
+def test_get_users_etag_changes_on_write(client, db, admin_user, normal_user, change):
+    params = {"token": admin_user["token"]}
+    etag = client.get("/users", params=params).headers["ETag"]
+    if change == "register":
+        client.post("/register", json={"username": "new", "email": "new@example.com", "password": "pass1234", "role": "user"}, params=params)
+    elif change == "batch_update":
+        client.patch("/users", json={"where": {"ids": [normal_user["user"].id]}, "role": "admin"}, params=params)
+    else:
+        client.delete(f"/users/{normal_user['user'].id}", params=params)
+
+    response = client.get("/users", params=params, headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["ETag"] != etag
+
+def test_get_users_etag_depends_on_query(client, db, admin_user):
+    _create_users(db, 3)
+    params = {"token": admin_user["token"], "limit": 2}
+    first = client.get("/users", params=params)
+    etag = first.headers["ETag"]
+
+    for query in (
+        {"after": first.headers["X-Next-Cursor"]},
+        {"limit": 3},
+        {"role": "user"},
+        {"fields": "username"}
+    ):
+        response = client.get("/users", params={**params, **query}, headers={"If-None-Match": etag})
+        assert response.status_code == status.HTTP_200_OK, query
+        assert response.headers["ETag"] != etag
+
+def test_get_user_etag_depends_on_fields(client, admin_user, normal_user):
+    url = f"/users/{normal_user['user'].id}"
+    params = {"token": admin_user["token"]}
+    etag = client.get(url, params={**params, "fields": "username"}).headers["ETag"]
+
+    response = client.get(url, params=params, headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert set(response.json()) == {"username", "email", "id", "role"}
+    # The same fieldset, listed differently, is the same representation
+    response = client.get(url, params={**params, "fields": " username,"}, headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+def test_lookup_users_admin(client, db, admin_user, normal_user, sql_statements):
+    _warm_token_cache(client, admin_user["token"])
+    sql_statements.clear()
+    ids = [normal_user["user"].id, 999, admin_user["user"].id, normal_user["user"].id]
+    response = client.post("/users/lookup", json={"ids": ids}, params={"token": admin_user["token"]})
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert [user["id"] for user in data["users"]] == [normal_user["user"].id, admin_user["user"].id]
+    assert data["missing"] == [999]
+    assert data["forbidden"] == []
+    assert len(sql_statements) == 1
+    assert " IN " in sql_statements[0]
+
+def test_lookup_users_self_only(client, admin_user, normal_user):
+    ids = [normal_user["user"].id, admin_user["user"].id, 999]
+    response = client.post("/users/lookup", json={"ids": ids}, params={"token": normal_user["token"]})
+    data = response.json()
+    assert [user["username"] for user in data["users"]] == [normal_user["user"].username]
+    assert data["forbidden"] == [admin_user["user"].id]
+    assert data["missing"] == [999]
+
+def test_lookup_users_batch_size_capped(client, admin_user):
+    from app.schemas.users_schemas import USER_LOOKUP_MAX_IDS
+    ids = list(range(1, USER_LOOKUP_MAX_IDS + 2))
+    response = client.post("/users/lookup", json={"ids": ids}, params={"token": admin_user["token"]})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+
+def test_sparse_fieldsets(client, db, admin_user, normal_user, sql_statements):
+    params = {"token": admin_user["token"], "fields": "username,id"}
+    _warm_token_cache(client, admin_user["token"])
+    sql_statements.clear()
+    response = client.get(f"/users/{normal_user['user'].id}", params=params)
+    assert response.json() == {"username": normal_user["user"].username, "id": normal_user["user"].id}
+    assert "password" not in sql_statements[-1]
+    assert "email" not in sql_statements[-1]
+
+    response = client.get("/users", params=params)
+    assert response.json() == [
+        {"username": "admin", "id": admin_user["user"].id},
+        {"username": normal_user["user"].username, "id": normal_user["user"].id},
+    ]
+    assert client.get("/users", params={**params, "stream": True}).json() == response.json()
+
+    response = client.post("/users/lookup", json={"ids": [normal_user["user"].id]}, params={**params, "fields": "email"})
+    assert response.json()["users"] == [{"email": normal_user["user"].email}]
+
+def test_sparse_fieldsets_paginate_without_id(client, db, admin_user):
+    _create_users(db, 2)
+    response = client.get("/users", params={"token": admin_user["token"], "fields": "username", "limit": 2})
+    assert response.json() == [{"username": "admin"}, {"username": "user0"}]
+    response = client.get("/users", params={
+        "token": admin_user["token"], "fields": "username", "limit": 2, "after": response.headers["X-Next-Cursor"]
+    })
+    assert response.json() == [{"username": "user1"}]
+
+def test_sparse_fieldsets_unknown_field(client, admin_user):
+    response = client.get("/users", params={"token": admin_user["token"], "fields": "id,password"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()["detail"] == "Unknown fields: password"
+
+@pytest.fixture
+def bcrypt_rounds(monkeypatch):
+    """
+    Switches the hashing policy, in this process and the hashing workers, to another bcrypt cost.
+    """
+    from app.common import hashing, password_pool
+    from app.common.config import settings
+
+    def apply(rounds):
+        monkeypatch.setattr(settings, "PASSWORD_BCRYPT_ROUNDS", rounds)
+        hashing.load_policy(hashing.context_options())
+        password_pool.shutdown()
+
+    yield apply
+    monkeypatch.undo()
+    hashing.load_policy(hashing.context_options())
+    password_pool.shutdown()
+
+def test_login_rehashes_password_to_current_policy(client, db, normal_user, bcrypt_rounds, login_limit):
+    assert normal_user["user"].password.startswith("$2b$12$")
+    bcrypt_rounds(10)
+    credentials = {"username": "testuser", "password": "test123"}
+    assert client.post("/login", json=credentials).status_code == status.HTTP_200_OK
+    db.refresh(normal_user["user"])
+    rehashed = normal_user["user"].password
+    assert rehashed.startswith("$2b$10$")
+
+    # Already current: the hash is left alone
+    assert client.post("/login", json=credentials).status_code == status.HTTP_200_OK
+    db.refresh(normal_user["user"])
+    assert normal_user["user"].password == rehashed
+
+@pytest.fixture
+def login_limit(monkeypatch):
+    """
+    Gives the test its own login rate limit, so that it can log in several times.
+    """
+    from app.common import limiter
+    monkeypatch.setattr(limiter, "backend", limiter.MemoryLimiterBackend(limit=10, window=60, max_clients=10))
+
+def _login(client, username="testuser", password="test123") -> dict:
+    response = client.post("/login", json={"username": username, "password": password})
+    assert response.status_code == status.HTTP_200_OK
+    return response.json()
+
+def test_refresh_token_rotation(client, normal_user, login_limit, monkeypatch):
+    from app.common import password_pool
+    tokens = _login(client)
+
+    async def no_password_check(*args):
+        raise AssertionError("refresh must not check the password")
+
+    monkeypatch.setattr(password_pool, "verify_and_update", no_password_check)
+    response = client.post("/token/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == status.HTTP_200_OK
+    refreshed = response.json()
+    assert refreshed["refresh_token"] != tokens["refresh_token"]
+    user_id = normal_user["user"].id
+    response = client.get(f"/users/{user_id}", params={"token": refreshed["access_token"]})
+    assert response.status_code == status.HTTP_200_OK
+
+    response = client.post("/token/refresh", json={"refresh_token": refreshed["refresh_token"]})
+    assert response.status_code == status.HTTP_200_OK
+
+def test_refresh_token_reuse_revokes_session(client, normal_user, login_limit):
+    tokens = _login(client)
+    other_session = _login(client)
+    refreshed = client.post("/token/refresh", json={"refresh_token": tokens["refresh_token"]}).json()
+
+    response = client.post("/token/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    assert response.json()["detail"] == "Refresh token reuse detected, session revoked"
+    # The whole family is revoked, other login sessions are not
+    response = client.post("/token/refresh", json={"refresh_token": refreshed["refresh_token"]})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    response = client.post("/token/refresh", json={"refresh_token": other_session["refresh_token"]})
+    assert response.status_code == status.HTTP_200_OK
+
+def test_refresh_token_is_not_an_access_token(client, normal_user, login_limit):
+    tokens = _login(client)
+    response = client.get(f"/users/{normal_user['user'].id}", params={"token": tokens["refresh_token"]})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    response = client.post("/token/refresh", json={"refresh_token": tokens["access_token"]})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+def test_refresh_token_revoked_with_user(client, db, admin_user, normal_user, login_limit):
+    from app.models.token_models import RefreshToken
+    tokens = _login(client)
+    client.delete(f"/users/{normal_user['user'].id}", params={"token": admin_user["token"]})
+    assert db.query(RefreshToken).count() == 0
+    response = client.post("/token/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED